@@ -0,0 +1,51 @@
+# This script compares the parsing throughput (lines per second) of the line by line readers against the bulk parser.
+# The smartphone format is measured over a temporary file holding the fixes of the logger sample.
+import os
+import tempfile
+from time import perf_counter
+
+from csv_readers import logger_gps_csv_reader, smartphone_gps_csv_reader, bulk_gps_csv_reader
+
+sample_input_trajectory = os.path.join(os.path.dirname(__file__), '..', 'sample_data', 'trajectory-2-base.csv')
+
+
+def measure(label, amount, fun, reference_time=None):
+    start = perf_counter()
+    fun()
+    elapsed = perf_counter() - start
+    speedup = '' if reference_time is None else '{:.1f}'.format(reference_time / elapsed)
+    print('{},{},{:.0f},{}'.format(label, amount, amount / elapsed, speedup))
+    return elapsed
+
+
+def write_smartphone_file(fixes, file_path):
+    with open(file_path, 'w', encoding='utf-8') as file:
+        file.write('latitude,longitude,timestamp,accuracy,altitude,speed,batteryLevel,detectedActivity\n')
+        for fix in fixes:
+            file.write('{},{},{},{},{},{},{},{}\n'.format(fix.latitude, fix.longitude,
+                                                          fix.timestamp.strftime('%Y-%m-%d %H:%M:%S'), 10.0,
+                                                          fix.altitude, fix.speed, 0.5, 3))
+
+
+if __name__ == '__main__':
+    fixes = logger_gps_csv_reader.read(sample_input_trajectory)
+    lines = len(fixes)
+
+    print('reader,lines,lines_per_second,speedup')
+    reference = measure('logger_read', lines, lambda: logger_gps_csv_reader.read(sample_input_trajectory))
+    measure('logger_bulk_fixes', lines, lambda: bulk_gps_csv_reader.read_logger_fixes(sample_input_trajectory),
+            reference)
+    measure('logger_bulk_columns', lines, lambda: bulk_gps_csv_reader.read_logger(sample_input_trajectory),
+            reference)
+
+    smartphone_file, smartphone_path = tempfile.mkstemp(suffix='.csv')
+    os.close(smartphone_file)
+    try:
+        write_smartphone_file(fixes, smartphone_path)
+        reference = measure('smartphone_read', lines, lambda: smartphone_gps_csv_reader.read(smartphone_path))
+        measure('smartphone_bulk_fixes', lines, lambda: bulk_gps_csv_reader.read_smartphone_fixes(smartphone_path),
+                reference)
+        measure('smartphone_bulk_columns', lines, lambda: bulk_gps_csv_reader.read_smartphone(smartphone_path),
+                reference)
+    finally:
+        os.remove(smartphone_path)
@@ -0,0 +1,60 @@
+# This script compares reading the sample trajectory every n seconds with LogicGpsReader.get_fix_in_n_seconds against
+# resampling its columns with fix_resampler, at the rates the ground truth is compared with, and resampling all of them
+# at once from a single load. It also resamples at random target times against LogicGpsReader.get_fix_at. Every
+# resampled row must be equal to the fix the reader delivers, which is checked field by field.
+import os
+from time import perf_counter
+
+import numpy as np
+
+from csv_readers import fix_resampler
+from csv_readers.LogicGpsReader import LogicGpsReader
+from entities.FixArray import FixArray, datetime_to_epoch, epoch_to_datetime
+
+sample_input_trajectory = os.path.join(os.path.dirname(__file__), '..', 'sample_data', 'trajectory-2-base.csv')
+PERIODS = (1, 5, 30, 60)
+
+
+def read_every(reader: LogicGpsReader, period):
+    reader.reset_position()
+    fixes = []
+    fix = reader.get_fix_in_n_seconds(0)
+    while fix is not None:
+        fixes.append(fix)
+        fix = reader.get_fix_in_n_seconds(period)
+    return fixes
+
+
+def same_fixes(fixes, fix_array: FixArray) -> bool:
+    expected = FixArray.from_fixes(fixes)
+    return len(expected) == len(fix_array) and all(np.array_equal(getattr(expected, c), getattr(fix_array, c))
+                                                   for c in FixArray.COLUMNS)
+
+
+if __name__ == '__main__':
+    reader = LogicGpsReader(sample_input_trajectory)
+    fix_array = reader.get_read_fixes_as_array()
+
+    print('period,fixes,reader_seconds,resampler_seconds,speedup,same_result')
+    for period in PERIODS:
+        start = perf_counter()
+        fixes = read_every(reader, period)
+        reader_seconds = perf_counter() - start
+        start = perf_counter()
+        resampled = fix_resampler.resample(fix_array, period)
+        resampler_seconds = perf_counter() - start
+        print('{},{},{:.3f},{:.3f},{:.1f},{}'.format(period, len(fixes), reader_seconds, resampler_seconds,
+                                                     reader_seconds / resampler_seconds, same_fixes(fixes, resampled)))
+
+    start = perf_counter()
+    all_rates = reader.read_whole_file_at_rates(PERIODS)
+    print('all rates from a single load: {:.3f} s, {} fixes'.format(perf_counter() - start,
+                                                                    sum(len(f) for f in all_rates.values())))
+
+    random = np.random.RandomState(17)
+    first, last = datetime_to_epoch(reader.first_fix.timestamp), datetime_to_epoch(reader.last_fix.timestamp)
+    targets = np.sort(np.round(random.uniform(first - 3600, last + 3600, 20000)))
+    expected = [fix for fix in (reader.get_fix_at(epoch_to_datetime(t)) for t in targets) if fix is not None]
+    print('random targets: {} fixes, same_result {}'.format(len(expected),
+                                                            same_fixes(expected,
+                                                                       fix_resampler.resample_at(fix_array, targets))))
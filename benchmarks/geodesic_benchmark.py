@@ -0,0 +1,48 @@
+# This script compares the throughput of the scalar distance port against the vectorized kernel.
+# It also reports the largest disagreement between both, which should stay under a millimetre.
+import os
+from time import perf_counter
+
+import numpy as np
+
+from csv_readers import logger_gps_csv_reader
+from entities import geodesic
+
+sample_input_trajectory = os.path.join(os.path.dirname(__file__), '..', 'sample_data', 'trajectory-2-base.csv')
+
+
+def measure(label, amount, scalar_fun, batched_fun):
+    start = perf_counter()
+    scalar_result = scalar_fun()
+    scalar_time = perf_counter() - start
+
+    start = perf_counter()
+    batched_result = batched_fun()
+    batched_time = perf_counter() - start
+
+    max_error = float(np.max(np.abs(np.asarray(scalar_result) - batched_result))) if amount > 0 else 0.0
+    print('{},{},{:.0f},{:.0f},{:.1f},{:.2e}'.format(label, amount, amount / scalar_time, amount / batched_time,
+                                                     scalar_time / batched_time, max_error))
+
+
+if __name__ == '__main__':
+    fixes = logger_gps_csv_reader.read(sample_input_trajectory)
+    latitudes = np.array([fix.latitude for fix in fixes])
+    longitudes = np.array([fix.longitude for fix in fixes])
+    size = len(fixes)
+    origin = fixes[0]
+
+    print('mode,pairs,scalar_pairs_per_second,batched_pairs_per_second,speedup,max_abs_error_m')
+    measure('one_to_many', size,
+            lambda: [geodesic.distance(origin.latitude, origin.longitude, lat, lon)
+                     for lat, lon in zip(latitudes, longitudes)],
+            lambda: geodesic.distances_to_point(origin.latitude, origin.longitude, latitudes, longitudes))
+    measure('along_sequence', size - 1,
+            lambda: [fixes[i].distance_to(fixes[i + 1]) for i in range(0, size - 1)],
+            lambda: geodesic.distances_along(latitudes, longitudes))
+
+    shuffled = np.random.RandomState(3).permutation(size)
+    measure('element_wise', size,
+            lambda: [geodesic.distance(latitudes[i], longitudes[i], latitudes[j], longitudes[j])
+                     for i, j in zip(range(0, size), shuffled)],
+            lambda: geodesic.distances(latitudes, longitudes, latitudes[shuffled], longitudes[shuffled]))
@@ -0,0 +1,66 @@
+# This script scores many candidate trajectories (a day of the sample trajectory read every n seconds, starting at
+# different times) against the same 1 Hz ground truth: with a TrajectoryComparator per candidate, and with a single
+# GroundTruthIndex, in this process and across a pool of processes sharing the index. The distance sums must be the
+# ones of TrajectoryComparator (up to floating point rounding) and the amounts of fixes exactly the same.
+import argparse
+import contextlib
+import os
+from time import perf_counter
+
+import numpy as np
+
+from csv_readers import fix_resampler
+from csv_readers.LogicGpsReader import LogicGpsReader
+from pac.mobility_analyzer.GroundTruthIndex import GroundTruthIndex
+from pac.mobility_analyzer.Trajectory import Trajectory
+from pac.mobility_analyzer.TrajectoryComparator import TrajectoryComparator
+
+sample_input_trajectory = os.path.join(os.path.dirname(__file__), '..', 'sample_data', 'trajectory-2-base.csv')
+SECONDS_OF_GROUND_TRUTH = 24 * 60 * 60
+
+
+def same_results(rows, expected) -> bool:
+    return all(row["mapped_fixes"] == mapped_fixes and np.isclose(row["distance_sum"], distance_sum, rtol=1e-9) and
+               row["fixes"] == fixes and np.isclose(row["sampled_distance_sum"], sampled_distance_sum, rtol=1e-9)
+               for row, (distance_sum, mapped_fixes, sampled_distance_sum, fixes) in zip(rows, expected))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Scores many candidates against the same ground truth')
+    parser.add_argument('--candidates', type=int, default=48, help='The amount of candidates')
+    parser.add_argument('--workers', type=int, default=2, help='The processes of the pool')
+    args = parser.parse_args()
+
+    ground_truth = fix_resampler.resample(LogicGpsReader(sample_input_trajectory).get_read_fixes_as_array(), 1)
+    ground_truth = ground_truth[:SECONDS_OF_GROUND_TRUTH]
+    periods = (5, 15, 30, 60, 120, 300)
+    candidates = {}
+    for i in range(args.candidates):
+        period = periods[i % len(periods)]
+        start = ground_truth.timestamp[0] + (i // len(periods)) * 7
+        candidates['every-{}s-from-{}'.format(period, i // len(periods))] = fix_resampler.resample(ground_truth,
+                                                                                                  period, start)
+
+    start = perf_counter()
+    ground_truth_trajectory = Trajectory(ground_truth.to_fixes())
+    expected = []
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        for candidate in candidates.values():
+            comparator = TrajectoryComparator(ground_truth_trajectory, Trajectory(candidate.to_fixes()))
+            expected.append(comparator.compare_synchronized() + comparator.compare_synchronized_no_interpolation())
+    print('comparator per candidate: {:.3f} s'.format(perf_counter() - start))
+
+    start = perf_counter()
+    index = GroundTruthIndex(ground_truth)
+    rows = index.score_all(candidates)
+    print('shared index: {:.3f} s, same_result {}'.format(perf_counter() - start, same_results(rows, expected)))
+
+    start = perf_counter()
+    rows = index.score_all(candidates, workers=args.workers)
+    print('shared index, {} processes: {:.3f} s, same_result {}'.format(args.workers, perf_counter() - start,
+                                                                        same_results(rows, expected)))
+
+    print('candidate,fixes,mapped_fixes,mean_error,p50_error,p90_error,p99_error,max_error')
+    for row in rows[:len(periods)]:
+        print('{candidate},{fixes},{mapped_fixes},{mean_error:.2f},{p50_error:.2f},{p90_error:.2f},{p99_error:.2f},'
+              '{max_error:.2f}'.format(**row))
@@ -0,0 +1,81 @@
+# This script load tests the LiveIngestionService: many simulated devices, multiplexed over a few connections, replay
+# different parts of the sample trajectory at the same time, each one sending its next fix as soon as it gets the reply
+# of the previous one, after the seconds of trajectory the reply asks for. It reports the sustained fixes per second
+# and the latency (from sending a fix to receiving its reply) percentiles. The service runs in the same process, so
+# the figures include the cost of the clients.
+import argparse
+import asyncio
+import os
+import tempfile
+from bisect import bisect_left
+from datetime import timedelta
+from time import perf_counter
+from typing import List
+
+import numpy as np
+
+from csv_readers import bulk_gps_csv_reader
+from entities.GpsFix import GpsFix
+from pac.live.LiveClient import LiveClient
+from pac.live.LiveIngestionService import LiveIngestionService
+
+sample_input_trajectory = os.path.join(os.path.dirname(__file__), '..', 'sample_data', 'trajectory-2-base.csv')
+
+
+async def simulate_device(client: LiveClient, device_id: str, fixes: List[GpsFix], timestamps, first: int,
+                          amount: int, latencies: List[float]):
+    position = first
+    for _ in range(amount):
+        if position >= len(fixes):
+            return
+        fix = fixes[position]
+        start = perf_counter()
+        reply = await client.send_fix(device_id, fix)
+        latencies.append(perf_counter() - start)
+        if "error" in reply:
+            raise RuntimeError(reply["error"])
+        position = bisect_left(timestamps, fix.timestamp + timedelta(seconds=max(reply["next_sampling"], 1)),
+                               position + 1)
+
+
+async def load_test(fixes: List[GpsFix], devices: int, fixes_per_device: int, connections: int, state_dir: str,
+                    idle_seconds: float):
+    timestamps = [fix.timestamp for fix in fixes]
+    service = LiveIngestionService(state_dir=state_dir, idle_seconds=idle_seconds)
+    socket_path = os.path.join(state_dir, 'service.sock')
+    await service.start_unix(socket_path)
+    clients = [await LiveClient.connect_unix(socket_path) for _ in range(connections)]
+
+    latencies = []
+    step = max(len(fixes) // devices, 1)
+    start = perf_counter()
+    await asyncio.gather(*[simulate_device(clients[i % connections], 'device-{}'.format(i), fixes, timestamps,
+                                           (i * step) % len(fixes), fixes_per_device, latencies)
+                           for i in range(devices)])
+    elapsed = perf_counter() - start
+
+    for client in clients:
+        await client.close()
+    await service.close()
+
+    latencies = np.array(latencies) * 1000
+    print('{},{},{},{:.0f},{:.2f},{:.2f},{:.2f},{},{}'.format(devices, connections, len(latencies),
+                                                           len(latencies) / elapsed, np.percentile(latencies, 50),
+                                                           np.percentile(latencies, 99), latencies.max(),
+                                                           service.evictions, service.restorations))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Load tests the live ingestion service')
+    parser.add_argument('--devices', type=int, nargs='+', default=[10, 100, 1000], help='The amounts of devices')
+    parser.add_argument('--fixes-per-device', type=int, default=100, help='The fixes each device sends')
+    parser.add_argument('--connections', type=int, default=20, help='The connections the devices share')
+    parser.add_argument('--idle-seconds', type=float, default=300, help='The seconds before evicting a device')
+    args = parser.parse_args()
+
+    sample_fixes = bulk_gps_csv_reader.read_logger_fixes(sample_input_trajectory)
+    print('devices,connections,fixes,fixes_per_second,p50_ms,p99_ms,max_ms,evictions,restorations')
+    for amount_of_devices in args.devices:
+        with tempfile.TemporaryDirectory() as directory:
+            asyncio.run(load_test(sample_fixes, amount_of_devices, args.fixes_per_device,
+                                  min(args.connections, amount_of_devices), directory, args.idle_seconds))
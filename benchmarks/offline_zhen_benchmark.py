@@ -0,0 +1,59 @@
+# This script compares the stay points detection over the whole sample trajectory: StreamedZhen fed fix by fix (as the
+# PAC does), StreamedZhen.analyze_locations, and OfflineZhen over the columns of the trajectory. It is run over the
+# fixes of the file and over the fixes read every second (as SmartPac reads them). Every detector must find the same
+# stay points, which is checked field by field.
+import os
+from time import perf_counter
+
+from csv_readers.LogicGpsReader import LogicGpsReader
+from entities.FixArray import FixArray
+from pac.stay_point_detectors.OfflineZhen import OfflineZhen
+from pac.stay_point_detectors.StreamedZhen import StreamedZhen
+
+sample_input_trajectory = os.path.join(os.path.dirname(__file__), '..', 'sample_data', 'trajectory-2-base.csv')
+
+
+def streamed_fix_by_fix(fixes, _):
+    spd = StreamedZhen(45 * 60, 500)
+    stay_points = []
+    for fix in fixes:
+        stay_point, _ = spd.analyze_location(fix)
+        if stay_point is not None:
+            stay_points.append(stay_point)
+    stay_point, _ = spd.analyze_last_part()
+    return stay_points if stay_point is None else stay_points + [stay_point]
+
+
+def streamed_batch(fixes, _):
+    spd = StreamedZhen(45 * 60, 500)
+    stay_points = [stay_point for stay_point, _ in spd.analyze_locations(fixes)]
+    stay_point, _ = spd.analyze_last_part()
+    return stay_points if stay_point is None else stay_points + [stay_point]
+
+
+def offline(_, fix_array):
+    return OfflineZhen(45 * 60, 500).analyze_fix_array(fix_array)
+
+
+def as_tuples(stay_points):
+    return [(sp.latitude, sp.longitude, sp.arrival_time, sp.departure_time, sp.amount_of_fixes) for sp in stay_points]
+
+
+if __name__ == '__main__':
+    reader = LogicGpsReader(sample_input_trajectory)
+    inputs = (('file', [fix for fix in reader.get_read_fixes() if fix.is_valid]),
+              ('one_second', [fix for fix in reader.read_whole_file_with_one_second() if fix.is_valid]))
+
+    print('input,fixes,detector,stay_points,seconds,speedup,same_result')
+    for label, fixes in inputs:
+        fix_array = FixArray.from_fixes(fixes)
+        reference, reference_time = None, None
+        for name, detector in (('streamed', streamed_fix_by_fix), ('streamed_batch', streamed_batch),
+                               ('offline', offline)):
+            start = perf_counter()
+            stay_points = as_tuples(detector(fixes, fix_array))
+            elapsed = perf_counter() - start
+            if reference is None:
+                reference, reference_time = stay_points, elapsed
+            print('{},{},{},{},{:.3f},{:.1f},{}'.format(label, len(fixes), name, len(stay_points), elapsed,
+                                                        reference_time / elapsed, stay_points == reference))
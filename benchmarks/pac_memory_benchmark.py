@@ -0,0 +1,51 @@
+# This script measures the peak memory of SmartPac over a streamed reader with each retention policy, for growing
+# parts of the sample trajectory. Every policy must obtain the same stay points and visits.
+import contextlib
+import io
+import os
+import tempfile
+import tracemalloc
+from itertools import islice
+from time import perf_counter
+
+from csv_readers.LogicGpsReaderStreamed import LogicGpsReaderStreamed
+from pac.PacEngine import PacEngine
+from pac.SmartPac import SmartPac
+from pac.mobility_analyzer.WindowedGeoFencing import WindowedGeoFencing
+from pac.stay_point_detectors.StreamedZhen import StreamedZhen
+
+sample_input_trajectory = os.path.join(os.path.dirname(__file__), '..', 'sample_data', 'trajectory-2-base.csv')
+
+
+def write_part(lines, file_path):
+    with open(sample_input_trajectory, encoding='utf-8') as source, open(file_path, 'w', encoding='utf-8') as file:
+        file.writelines(islice(source, lines + 1))
+
+
+def measure(file_path, retention):
+    pac = SmartPac(StreamedZhen(45 * 60, 500), WindowedGeoFencing(250, 3), LogicGpsReaderStreamed(file_path), 500,
+                   adapt_sampling=False, base_sampling=1, retention=retention)
+    tracemalloc.start()
+    start = perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        pac.start_main_loop()
+    elapsed = perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    result = ([str(x) for x in pac.get_obtained_stay_points()], [str(x) for x in pac.get_obtained_visits()])
+    return peak, elapsed, pac.fixes_read, result
+
+
+if __name__ == '__main__':
+    print('lines,retention,fixes_read,peak_mb,seconds,same_result')
+    with tempfile.TemporaryDirectory() as directory:
+        for lines in (1000, 2000, 4000):
+            file_path = os.path.join(directory, 'part.csv')
+            write_part(lines, file_path)
+            reference = None
+            for retention in (PacEngine.RETAIN_ALL, PacEngine.RETAIN_RING, PacEngine.RETAIN_SUMMARIES,
+                              PacEngine.RETAIN_NONE):
+                peak, elapsed, fixes_read, result = measure(file_path, retention)
+                reference = result if reference is None else reference
+                print('{},{},{},{:.1f},{:.1f},{}'.format(lines, retention, fixes_read, peak / 1e6, elapsed,
+                                                         result == reference))
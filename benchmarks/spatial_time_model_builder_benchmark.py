@@ -0,0 +1,105 @@
+# This script measures the build time of the spatial time model against the number of transitions.
+# It compares the indexed builder against the former approach, which traversed the whole tree on each insert.
+import random
+from datetime import datetime, time, timedelta
+from time import perf_counter
+from typing import List
+
+from entities.SimpleVisit import SimpleVisit
+from stm.SpatialTimeModel import SpatialTimeModel
+from stm.SpatialTimeModelBuilder import SpatialTimeModelBuilder
+from stm.SpatialTimeModelNode import SpatialTimeModelNode
+from stm.TransitionMatrixBuilder import TransitionMatrixBuilder
+
+delta_time_minutes = 30
+t_fusion_mode = 0
+amount_stay_points = 12
+transitions_to_test = [250, 500, 1000, 2000, 4000, 8000, 16000]
+legacy_limit = 2000
+
+
+class TraversalSpatialTimeModelBuilder(SpatialTimeModelBuilder):
+    """
+    Builder that looks for target and parent nodes traversing the whole tree, as it was done before indexing
+    """
+
+    def _search_target_node(self, node: SpatialTimeModelNode) -> SpatialTimeModelNode:
+        for current_node in SpatialTimeModel(self._root_node).bread_first_traversal_recursive():
+            if node.is_equivalent_to(current_node, self._delta_t_minutes):
+                return current_node
+        return None
+
+    def _find_closest_parent(self, node: SpatialTimeModelNode) -> SpatialTimeModelNode:
+        import Utils
+        possible_parents = [n for n in SpatialTimeModel(self._root_node).bread_first_traversal_recursive()
+                            if n.id_sp_destination == node.id_sp_origin]
+        possible_parents.sort(key=lambda n: Utils.minutes_difference(n.consolidated_t_out_dest,
+                                                                     node.consolidated_t_out_origin))
+        return possible_parents[0] if len(possible_parents) > 0 else None
+
+
+def generate_weekly_visits(amount_transitions: int, seed=7) -> List[List[SimpleVisit]]:
+    """
+    Generates a synthetic stream of visits, split into weeks
+    :param amount_transitions: The amount of transitions (consecutive visits pairs) to generate
+    :param seed: The seed for the random generator
+    :return: A list of weeks, each of them a list of SimpleVisit
+    """
+    generator = random.Random(seed)
+    current_time = datetime(2017, 1, 2, 7, 0, 0)
+    weeks = []
+    current_week = []
+    week_end = current_time + timedelta(days=7)
+    for i in range(0, amount_transitions + 1):
+        stay_point = 1 if i % 3 == 0 else generator.randint(2, amount_stay_points)
+        stay_time = timedelta(minutes=generator.randint(20, 9 * 60))
+        visit = SimpleVisit(i + 1, stay_point, current_time, current_time + stay_time)
+        if visit.arrival_time > week_end:
+            weeks.append(current_week)
+            current_week = []
+            week_end += timedelta(days=7)
+        current_week.append(visit)
+        current_time = visit.departure_time + timedelta(minutes=generator.randint(5, 90))
+
+    weeks.append(current_week)
+    return weeks
+
+
+def same_parent_on_truncated_tie() -> bool:
+    """
+    Checks the parent chosen when the difference of two candidates only ties once the seconds are dropped: X comes
+    first in BFS order but is farther from the departure (10:01:42 and 09:59:36 against 10:00:06)
+    """
+    any_time = time(8, 0, 0)
+    node_x = SpatialTimeModelNode(None, 5, 1, any_time, any_time, any_time, time(10, 1, 42))
+    node_a = SpatialTimeModelNode(node_x, 1, 1, any_time, any_time, any_time, time(9, 59, 36))
+    node_x.add_child(node_a)
+    query = SpatialTimeModelNode(None, 1, 7, any_time, time(10, 0, 6), any_time, any_time)
+
+    parents = []
+    for builder_class in (SpatialTimeModelBuilder, TraversalSpatialTimeModelBuilder):
+        builder = builder_class([], delta_time_minutes, t_fusion_mode, SpatialTimeModel(node_x))
+        parents.append(builder._find_closest_parent(query))
+    return parents[0] is parents[1]
+
+
+def time_build(builder_class, transition_matrices):
+    start = perf_counter()
+    model = builder_class(transition_matrices, delta_time_minutes, t_fusion_mode).build_expanded_spatial_time_model()
+    return perf_counter() - start, model
+
+
+if __name__ == '__main__':
+    print('same_parent_on_truncated_tie,{}'.format(same_parent_on_truncated_tie()))
+    print('transitions,nodes,indexed_seconds,traversal_seconds,same_tree')
+    for amount in transitions_to_test:
+        matrices = [TransitionMatrixBuilder(week).build_matrix() for week in generate_weekly_visits(amount)]
+        indexed_time, indexed_model = time_build(SpatialTimeModelBuilder, matrices)
+        nodes = len(indexed_model.bread_first_traversal_recursive())
+
+        if amount <= legacy_limit:
+            traversal_time, traversal_model = time_build(TraversalSpatialTimeModelBuilder, matrices)
+            same_tree = str(indexed_model) == str(traversal_model)
+            print('{},{},{:.4f},{:.4f},{}'.format(amount, nodes, indexed_time, traversal_time, same_tree))
+        else:
+            print('{},{},{:.4f},,'.format(amount, nodes, indexed_time))
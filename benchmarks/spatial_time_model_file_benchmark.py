@@ -0,0 +1,65 @@
+# This script builds the spatial time models of a fleet of synthetic users, writes them with spatial_time_model_file
+# and compares the time of loading them back (only mapping the files, and traversing every node) against building them
+# again from the visits. Every loaded model must be equal to the built one, node by node.
+import contextlib
+import os
+import tempfile
+from time import perf_counter
+
+from benchmarks.spatial_time_model_builder_benchmark import generate_weekly_visits
+from stm import spatial_time_model_file
+from stm.SpatialTimeModelBuilder import SpatialTimeModelBuilder
+from stm.TransitionMatrixBuilder import TransitionMatrixBuilder
+
+amount_of_users = 50
+transitions_per_user = 2000
+delta_time_minutes = 30
+t_fusion_mode = 0
+
+
+def build_model(weeks):
+    matrices = [TransitionMatrixBuilder(week).build_matrix() for week in weeks]
+    return SpatialTimeModelBuilder(matrices, delta_time_minutes, t_fusion_mode).build_expanded_spatial_time_model()
+
+
+def node_values(model):
+    return [(node.id_sp_origin, node.id_sp_destination, node.consolidated_t_in_origin, node.consolidated_t_out_origin,
+             node.consolidated_t_in_dest, node.consolidated_t_out_dest, node.use_counter, node.tods_in_origin,
+             node.tods_out_origin, node.tods_in_dest, node.tods_out_dest,
+             None if node.parent is None else (node.parent.id_sp_origin, node.parent.consolidated_t_out_origin),
+             len(node.children)) for node in model.bread_first_traversal_recursive()]
+
+
+if __name__ == '__main__':
+    fleet = [generate_weekly_visits(transitions_per_user, seed=user) for user in range(0, amount_of_users)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        # The builder prints the nodes it cannot allocate
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            start = perf_counter()
+            models = [build_model(weeks) for weeks in fleet]
+            build_time = perf_counter() - start
+
+        paths = [os.path.join(directory, 'user-{}'.format(user) + spatial_time_model_file.FILE_SUFFIX)
+                 for user in range(0, amount_of_users)]
+        start = perf_counter()
+        for model, path in zip(models, paths):
+            spatial_time_model_file.save(model, path)
+        save_time = perf_counter() - start
+        file_size = sum(os.path.getsize(path) for path in paths) / amount_of_users
+
+        start = perf_counter()
+        loaded_models = [spatial_time_model_file.load(path) for path in paths]
+        load_time = perf_counter() - start
+
+        start = perf_counter()
+        loaded_values = [node_values(model) for model in loaded_models]
+        traversal_time = perf_counter() - start
+
+        same_models = all(values == node_values(model) for values, model in zip(loaded_values, models))
+        nodes = sum(len(values) for values in loaded_values) / amount_of_users
+        print('users,nodes_per_user,bytes_per_user,build_ms_per_user,save_ms_per_user,load_ms_per_user,'
+              'load_and_traverse_ms_per_user,same_models')
+        print('{},{:.0f},{:.0f},{:.2f},{:.2f},{:.3f},{:.2f},{}'.format(
+            amount_of_users, nodes, file_size, build_time * 1000 / amount_of_users, save_time * 1000 / amount_of_users,
+            load_time * 1000 / amount_of_users, (load_time + traversal_time) * 1000 / amount_of_users, same_models))
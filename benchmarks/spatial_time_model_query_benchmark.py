@@ -0,0 +1,101 @@
+# This script measures next place queries ("the user is at a stay point at a time of day, where next and when?")
+# answered by SpatialTimeModelQueryIndex, one by one and batched, against scanning the nodes of the traversal of the
+# model for each query. Both answers must be the same. It also traverses a model as deep as the amount of transitions
+# with the iterative breadth first and depth first traversals.
+import contextlib
+import os
+import random
+from datetime import time
+from time import perf_counter
+
+from benchmarks.spatial_time_model_builder_benchmark import generate_weekly_visits
+from benchmarks.spatial_time_model_file_benchmark import build_model
+from stm.SpatialTimeModel import SpatialTimeModel
+from stm.SpatialTimeModelNode import SpatialTimeModelNode
+from stm.SpatialTimeModelQueryIndex import MICROSECONDS_PER_DAY, SpatialTimeModelQueryIndex
+from stm.spatial_time_model_file import microseconds_to_time, time_to_microseconds
+
+transitions_to_test = [2000, 8000, 32000]
+amount_of_queries = 5000
+horizons_minutes = [None, 90]
+k = 3
+chain_depth = 100000
+
+
+def scan_next_places(model: SpatialTimeModel, id_sp_origin: int, tod: time, horizon_minutes):
+    """
+    Answers a query looking at every node of the model
+    :return: The (destination, use counter, departure) of the top k destinations
+    """
+    horizon = MICROSECONDS_PER_DAY if horizon_minutes is None else horizon_minutes * 60000000
+    destinations = {}
+    for position, node in enumerate(model.bread_first_traversal_recursive()):
+        if node.id_sp_origin != id_sp_origin:
+            continue
+        gap = (time_to_microseconds(node.consolidated_t_out_origin) - time_to_microseconds(tod)) % MICROSECONDS_PER_DAY
+        if gap >= horizon:
+            continue
+        uses, first_departure = destinations.get(node.id_sp_destination, (0, (MICROSECONDS_PER_DAY, 0, None)))
+        destinations[node.id_sp_destination] = (uses + node.use_counter,
+                                                min(first_departure, (gap, position, node.consolidated_t_out_origin)))
+
+    ranking = sorted(destinations.items(), key=lambda item: (-item[1][0], item[1][1][0], item[0]))
+    return [(destination, uses, departure[2]) for destination, (uses, departure) in ranking[:k]]
+
+
+def answers(next_places):
+    return [(place.id_sp_destination, place.use_counter, place.departure_time) for place in next_places]
+
+
+def build_chain(depth: int) -> SpatialTimeModel:
+    root = SpatialTimeModelNode(None, 0, 1, time(8), time(9), time(10), time(11))
+    node = root
+    for i in range(1, depth):
+        child = SpatialTimeModelNode(node, i, i + 1, time(8), time(9), time(10), time(11))
+        node.add_child(child)
+        node = child
+    return SpatialTimeModel(root)
+
+
+if __name__ == '__main__':
+    generator = random.Random(3)
+    print('transitions,nodes,horizon_minutes,index_build_ms,scan_us_per_query,index_us_per_query,'
+          'batched_index_us_per_query,same_answers')
+    for amount in transitions_to_test:
+        # The builder prints the nodes it cannot allocate
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            model = build_model(generate_weekly_visits(amount))
+        nodes = model.bread_first_traversal_recursive()
+        stay_points = sorted({node.id_sp_origin for node in nodes})
+        queries = [(generator.choice(stay_points), microseconds_to_time(generator.randrange(0, MICROSECONDS_PER_DAY)))
+                   for _ in range(0, amount_of_queries)]
+
+        start = perf_counter()
+        index = SpatialTimeModelQueryIndex(model)
+        build_time = perf_counter() - start
+
+        for horizon in horizons_minutes:
+            scanned_queries = queries[:amount_of_queries // 50]
+            start = perf_counter()
+            scanned = [scan_next_places(model, origin, tod, horizon) for origin, tod in scanned_queries]
+            scan_time = (perf_counter() - start) / len(scanned_queries)
+
+            start = perf_counter()
+            single = [answers(index.get_next_places(origin, tod, k, horizon)) for origin, tod in queries]
+            single_time = (perf_counter() - start) / amount_of_queries
+
+            start = perf_counter()
+            batched = [answers(places) for places in index.get_next_places_many(queries, k, horizon)]
+            batched_time = (perf_counter() - start) / amount_of_queries
+
+            same_answers = scanned == single[:len(scanned)] and single == batched
+            print('{},{},{},{:.2f},{:.1f},{:.1f},{:.1f},{}'.format(
+                amount, len(nodes), horizon, build_time * 1000, scan_time * 1e6, single_time * 1e6,
+                batched_time * 1e6, same_answers))
+
+    chain = build_chain(chain_depth)
+    start = perf_counter()
+    breadth_first = sum(1 for _ in chain.breadth_first_traversal())
+    depth_first = sum(1 for _ in chain.depth_first_traversal())
+    print('chain_depth,traversed_breadth_first,traversed_depth_first,seconds')
+    print('{},{},{},{:.3f}'.format(chain_depth, breadth_first, depth_first, perf_counter() - start))
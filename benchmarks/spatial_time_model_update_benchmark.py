@@ -0,0 +1,73 @@
+# This script simulates the daily maintenance of a spatial time model: a history of transition matrices is built and
+# written with spatial_time_model_file, and then each new matrix is added to it. Adding a matrix by loading the model,
+# allocating only its transitions and writing it again, or by keeping the builder in memory and only allocating its
+# transitions, is compared against building the model again from the whole history. The models must be equal, node by
+# node.
+import contextlib
+import os
+import tempfile
+from time import perf_counter
+
+from benchmarks.spatial_time_model_builder_benchmark import generate_weekly_visits
+from benchmarks.spatial_time_model_file_benchmark import node_values
+from stm import spatial_time_model_file
+from stm.SpatialTimeModelBuilder import SpatialTimeModelBuilder
+from stm.TransitionMatrixBuilder import TransitionMatrixBuilder
+
+history_transitions = [2000, 8000, 32000]
+new_matrices = 5
+delta_time_minutes = 30
+t_fusion_mode = 0
+
+
+def rebuild(matrices):
+    return SpatialTimeModelBuilder(matrices, delta_time_minutes, t_fusion_mode).build_expanded_spatial_time_model()
+
+
+def update(file_path, matrix):
+    model = spatial_time_model_file.load(file_path)
+    model = SpatialTimeModelBuilder([], delta_time_minutes, t_fusion_mode, model).update_spatial_time_model([matrix])
+    spatial_time_model_file.save(model, file_path)
+    return model
+
+
+if __name__ == '__main__':
+    print('history_transitions,nodes,rebuild_ms_per_matrix,file_update_ms_per_matrix,memory_update_ms_per_matrix,'
+          'same_models')
+    for amount in history_transitions:
+        matrices = [TransitionMatrixBuilder(week).build_matrix() for week in generate_weekly_visits(amount)]
+        history, new = matrices[:-new_matrices], matrices[-new_matrices:]
+
+        # The builders print the nodes they cannot allocate
+        with tempfile.TemporaryDirectory() as directory, open(os.devnull, 'w') as devnull, \
+                contextlib.redirect_stdout(devnull):
+            file_path = os.path.join(directory, 'user' + spatial_time_model_file.FILE_SUFFIX)
+            spatial_time_model_file.save(rebuild(history), file_path)
+            builder = SpatialTimeModelBuilder(history, delta_time_minutes, t_fusion_mode)
+            builder.build_expanded_spatial_time_model()
+
+            rebuild_time = 0
+            update_time = 0
+            memory_update_time = 0
+            same_models = True
+            for i in range(0, new_matrices):
+                start = perf_counter()
+                rebuilt_model = rebuild(history + new[:i + 1])
+                rebuild_time += perf_counter() - start
+
+                start = perf_counter()
+                updated_model = update(file_path, new[i])
+                update_time += perf_counter() - start
+
+                start = perf_counter()
+                memory_model = builder.update_spatial_time_model([new[i]])
+                memory_update_time += perf_counter() - start
+
+                rebuilt_values = node_values(rebuilt_model)
+                same_models = (same_models and rebuilt_values == node_values(updated_model) and
+                               rebuilt_values == node_values(memory_model))
+
+        nodes = len(rebuilt_model.bread_first_traversal_recursive())
+        print('{},{},{:.2f},{:.2f},{:.2f},{}'.format(amount, nodes, rebuild_time * 1000 / new_matrices,
+                                                     update_time * 1000 / new_matrices,
+                                                     memory_update_time * 1000 / new_matrices, same_models))
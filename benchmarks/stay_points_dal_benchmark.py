@@ -0,0 +1,43 @@
+# This script compares adding stay points to the grid indexed StayPointsDal against scanning every known stay point,
+# as the repository did before the index. Both must accept exactly the same stay points.
+import random
+from time import perf_counter
+
+from entities.StayPoint import StayPoint
+from pac.persistence.StayPointsDal import StayPointsDal
+
+
+class ScanningStayPointsDal(StayPointsDal):
+    """
+    The former StayPointsDal behaviour, the distance to every known stay point is computed
+    """
+
+    def stay_point_already_exists(self, stay_point) -> bool:
+        distances = list(map(lambda x: stay_point.distance_to(x), self.stay_points))
+        return len(distances) > 0 and min(distances) < self.distance_radio
+
+
+def generate_stay_points(amount, seed=7):
+    """
+    Generates stay points spread over a city sized area (about 40 x 40 km)
+    """
+    rnd = random.Random(seed)
+    return [StayPoint(0, 23.5 + rnd.uniform(0, 0.36), -99.3 + rnd.uniform(0, 0.39)) for _ in range(0, amount)]
+
+
+def measure(dal, stay_points):
+    start = perf_counter()
+    added = dal.add_all(stay_points)
+    return perf_counter() - start, [(x.latitude, x.longitude) for x in added]
+
+
+if __name__ == '__main__':
+    distance_radio = 50
+    print('stay_points,added,scan_seconds,grid_seconds,speedup,same_result')
+    for amount in (100, 1000, 3000):
+        stay_points = generate_stay_points(amount)
+        scan_time, scan_added = measure(ScanningStayPointsDal(distance_radio), stay_points)
+        stay_points = generate_stay_points(amount)
+        grid_time, grid_added = measure(StayPointsDal(distance_radio), stay_points)
+        print('{},{},{:.3f},{:.3f},{:.1f},{}'.format(amount, len(grid_added), scan_time, grid_time,
+                                                     scan_time / grid_time, scan_added == grid_added))
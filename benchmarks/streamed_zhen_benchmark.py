@@ -0,0 +1,57 @@
+# This script measures StreamedZhen over a long stay (fixes at 1 Hz around a point, then a departure), buffering the
+# fixes of the candidate against keeping running sums of them. It reports the time per fix (generating the fixes
+# included), the peak memory and the error of the latitude of the stay point with respect to the mean of math.fsum.
+import math
+import random
+import tracemalloc
+from datetime import datetime, timedelta
+from time import perf_counter
+
+from entities.GpsFix import GpsFix
+from pac.stay_point_detectors.StreamedZhen import StreamedZhen
+
+
+def generate_stay(hours: float):
+    """
+    Generates the fixes as a reader would, so that only the ones kept by StreamedZhen stay in memory
+    """
+    random.seed(hours)
+    start = datetime(2017, 1, 1)
+    seconds = int(hours * 3600)
+    for i in range(seconds):
+        yield GpsFix(23.7205 + random.uniform(-0.001, 0.001), -99.0777 + random.uniform(-0.001, 0.001),
+                     start + timedelta(seconds=i), accuracy=10)
+    yield GpsFix(23.8, -99.0777, start + timedelta(seconds=seconds), accuracy=10)
+
+
+def run(hours: float, keep_fixes: bool):
+    spd = StreamedZhen(45 * 60, 500, keep_fixes=keep_fixes)
+    stay_point = None
+    for fix in generate_stay(hours):
+        found, _ = spd.analyze_location(fix)
+        stay_point = found if found is not None else stay_point
+    return stay_point
+
+
+def measure(hours: float, keep_fixes: bool):
+    start = perf_counter()
+    stay_point = run(hours, keep_fixes)
+    elapsed = perf_counter() - start
+
+    tracemalloc.start()
+    run(hours, keep_fixes)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak, stay_point
+
+
+if __name__ == '__main__':
+    print('hours,fixes,mode,us_per_fix,peak_kb,latitude_error')
+    for stay_hours in (1, 4, 8):
+        latitudes = [fix.latitude for fix in generate_stay(stay_hours)]
+        exact_latitude = math.fsum(latitudes) / len(latitudes)
+        for mode, keep in (('buffer', True), ('sums', False)):
+            seconds, peak_memory, live_stay_point = measure(stay_hours, keep)
+            print('{},{},{},{:.2f},{:.0f},{:.1e}'.format(stay_hours, len(latitudes), mode,
+                                                         seconds * 1e6 / len(latitudes), peak_memory / 1e3,
+                                                         abs(live_stay_point.latitude - exact_latitude)))
@@ -0,0 +1,48 @@
+# This script compares a day of the sample trajectory read every second (the ground truth) with the same day read
+# every n seconds, with TrajectoryComparator and with VectorizedTrajectoryComparator. Both must find the same amount of
+# fixes and the same distance sums (up to floating point rounding, the batched distances differ from the scalar ones
+# in the nanometers). The percentiles of the errors of each fix are reported as well.
+import contextlib
+import os
+from time import perf_counter
+
+import numpy as np
+
+from csv_readers import fix_resampler
+from csv_readers.LogicGpsReader import LogicGpsReader
+from pac.mobility_analyzer.Trajectory import Trajectory
+from pac.mobility_analyzer.TrajectoryComparator import TrajectoryComparator
+from pac.mobility_analyzer.VectorizedTrajectoryComparator import VectorizedTrajectoryComparator
+
+sample_input_trajectory = os.path.join(os.path.dirname(__file__), '..', 'sample_data', 'trajectory-2-base.csv')
+PERIODS = (30, 60, 300)
+SECONDS_OF_GROUND_TRUTH = 24 * 60 * 60
+
+
+def timed(function):
+    start = perf_counter()
+    result = function()
+    return result, perf_counter() - start
+
+
+if __name__ == '__main__':
+    ground_truth = fix_resampler.resample(LogicGpsReader(sample_input_trajectory).get_read_fixes_as_array(), 1)
+    ground_truth = ground_truth[:SECONDS_OF_GROUND_TRUTH]
+    ground_truth_fixes = ground_truth.to_fixes()
+
+    print('method,period,fixes,seconds,vectorized_seconds,speedup,same_result,p50_m,p90_m,p99_m')
+    for period in PERIODS:
+        sub_sampled = fix_resampler.resample(ground_truth, period)
+        comparator = TrajectoryComparator(Trajectory(ground_truth_fixes), Trajectory(sub_sampled.to_fixes()))
+        vectorized = VectorizedTrajectoryComparator(ground_truth, sub_sampled)
+
+        for method in ('compare_synchronized', 'compare_synchronized_no_interpolation'):
+            # compare_synchronized_no_interpolation prints the distances over 200 meters
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                expected, seconds = timed(getattr(comparator, method))
+            (distance_sum, amount, errors), vectorized_seconds = timed(
+                lambda: getattr(vectorized, method)(with_errors=True))
+            same_result = amount == expected[1] and bool(np.isclose(distance_sum, expected[0], rtol=1e-9))
+            print('{},{},{},{:.3f},{:.4f},{:.1f},{},{:.2f},{:.2f},{:.2f}'.format(
+                method, period, amount, seconds, vectorized_seconds, seconds / vectorized_seconds, same_result,
+                *np.percentile(errors, [50, 90, 99])))
@@ -0,0 +1,69 @@
+# This script measures the build time and memory of the transition matrix against the number of visits. It compares
+# the sparse matrix against the former dense one (a cell per pair of visits, with stay points found by linear
+# search), which must flatten to the same entries in the same order.
+import tracemalloc
+from time import perf_counter
+from typing import List
+
+from Utils import obtain_ordered_stay_points_from_visit_list
+from benchmarks.spatial_time_model_builder_benchmark import generate_weekly_visits
+from entities.SimpleVisit import SimpleVisit
+from stm.TransitionMatrixBuilder import TransitionMatrixBuilder
+from stm.TransitionMatrixEntry import TransitionMatrixEntry
+
+visits_to_test = [1000, 2000, 4000, 10000, 100000]
+legacy_limit = 4000
+
+
+def build_dense_flat_visits(visits: List[SimpleVisit]) -> List[TransitionMatrixEntry]:
+    """
+    Builds the matrix as it was done before the sparse one, and flattens it
+    """
+    ordered_stay_points = obtain_ordered_stay_points_from_visit_list(visits)
+    matrix = [[None for _ in range(0, len(visits))] for _ in range(0, len(visits))]
+    for i in range(0, len(visits) - 1):
+        origin, dest = visits[i], visits[i + 1]
+        position_from = ordered_stay_points.index(origin.id_stay_point)
+        position_to = ordered_stay_points.index(dest.id_stay_point)
+        entry = TransitionMatrixEntry(origin.id_stay_point, dest.id_stay_point, origin.arrival_time,
+                                      origin.departure_time, dest.arrival_time, dest.departure_time)
+        if matrix[position_from][position_to] is None:
+            matrix[position_from][position_to] = []
+        matrix[position_from][position_to].append(entry)
+
+    return [entry for row in matrix[:len(ordered_stay_points)] for cell in row[:len(ordered_stay_points)]
+            if cell is not None for entry in cell]
+
+
+def as_tuples(entries: List[TransitionMatrixEntry]):
+    return [(e.id_sp_origin, e.id_sp_destination, e.arrival_time_sp_origin, e.departure_time_sp_origin,
+             e.arrival_time_sp_dest, e.departure_time_sp_dest) for e in entries]
+
+
+def measure(build):
+    tracemalloc.start()
+    start = perf_counter()
+    result = build()
+    elapsed = perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+if __name__ == '__main__':
+    print('visits,stay_points,sparse_seconds,sparse_peak_mb,dense_seconds,dense_peak_mb,same_entries')
+    for amount in visits_to_test:
+        visits = [visit for week in generate_weekly_visits(amount - 1) for visit in week]
+        matrix, sparse_time, sparse_peak = measure(lambda: TransitionMatrixBuilder(visits).build_matrix())
+        sparse_entries = as_tuples(matrix.flat_visits())
+        assert matrix.count_matrix().sum() == len(visits) - 1
+
+        line = '{},{},{:.4f},{:.2f}'.format(amount, len(matrix.ordered_stay_points), sparse_time,
+                                           sparse_peak / 1024 / 1024)
+        if amount <= legacy_limit:
+            dense_entries, dense_time, dense_peak = measure(lambda: build_dense_flat_visits(visits))
+            line += ',{:.4f},{:.2f},{}'.format(dense_time, dense_peak / 1024 / 1024,
+                                               as_tuples(dense_entries) == sparse_entries)
+        else:
+            line += ',,,'
+        print(line)
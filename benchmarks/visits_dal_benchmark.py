@@ -0,0 +1,79 @@
+# This script replays the arrivals and departures the PAC records in VisitsDal: each arrival adds a visit and looks for
+# the oracle visit of its stay point (its first one), and each departure closes the last visit of the stay point. The
+# lookups of the stay point index are compared against scanning the visits, as the PAC did before it, and the running
+# stay time aggregates against computing them from the visits. Both must give the same results.
+import random
+import statistics
+from datetime import datetime, timedelta
+from time import perf_counter
+
+from entities.GpsFix import GpsFix
+from entities.Visit import Visit
+from pac.persistence.VisitsDal import VisitsDal
+
+amount_stay_points = 50
+visits_to_test = [1000, 5000, 10000]
+
+
+def generate_events(amount_visits, seed=5):
+    """
+    Generates (stay point, arrival fix, departure fix) tuples, one per visit, in chronological order
+    """
+    generator = random.Random(seed)
+    current_time = datetime(2017, 1, 2, 7, 0, 0)
+    events = []
+    for _ in range(0, amount_visits):
+        id_stay_point = generator.randint(1, amount_stay_points)
+        departure_time = current_time + timedelta(seconds=generator.randint(20 * 60, 9 * 60 * 60))
+        events.append((id_stay_point, GpsFix(0, 0, current_time), GpsFix(0, 0, departure_time)))
+        current_time = departure_time + timedelta(minutes=generator.randint(5, 90))
+    return events
+
+
+def scan_first_visit(dal, id_stay_point):
+    for v in dal.visits:
+        if v.id_stay_point == id_stay_point:
+            return v
+
+
+def scan_last_visit_position(dal, id_stay_point):
+    for i, v in reversed(list(enumerate(dal.visits))):
+        if v.id_stay_point == id_stay_point:
+            return i
+
+
+def replay(events, first_visit, last_visit_position):
+    dal = VisitsDal()
+    oracle_ids = []
+    start = perf_counter()
+    for id_stay_point, arrival_fix, departure_fix in events:
+        dal.add(Visit(0, id_stay_point, arrival_fix, arrival_fix, arrival_fix, arrival_fix))
+        oracle_ids.append(first_visit(dal, id_stay_point).id_visit)
+        dal.update_visit(last_visit_position(dal, id_stay_point), departure_fix, departure_fix)
+    return perf_counter() - start, dal, oracle_ids
+
+
+def aggregates_match(dal):
+    for id_stay_point in range(1, amount_stay_points + 1):
+        stay_times = [v.stay_time for v in dal.visits if v.id_stay_point == id_stay_point]
+        if len(stay_times) == 0:
+            continue
+        if (dal.get_visit_count(id_stay_point) != len(stay_times) or
+                dal.get_total_stay_time(id_stay_point) != sum(stay_times) or
+                dal.get_mean_stay_time(id_stay_point) != sum(stay_times) / len(stay_times) or
+                dal.get_median_stay_time(id_stay_point) != statistics.median(stay_times)):
+            return False
+    return True
+
+
+if __name__ == '__main__':
+    print('visits,scan_seconds,index_seconds,speedup,same_visits,same_aggregates')
+    for amount in visits_to_test:
+        events = generate_events(amount)
+        scan_time, scan_dal, scan_oracles = replay(events, scan_first_visit, scan_last_visit_position)
+        index_time, index_dal, index_oracles = replay(events, VisitsDal.get_first_visit,
+                                                      VisitsDal.get_last_visit_position)
+        same_visits = scan_oracles == index_oracles and [str(v) for v in scan_dal.visits] == \
+            [str(v) for v in index_dal.visits]
+        print('{},{:.4f},{:.4f},{:.1f},{},{}'.format(amount, scan_time, index_time, scan_time / index_time,
+                                                     same_visits, aggregates_match(index_dal)))
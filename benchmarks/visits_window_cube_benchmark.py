@@ -0,0 +1,43 @@
+# This script splits a stream of visits for every day of the week and several hour bands: with a VisitsStreamSplitter
+# per window, and with a single VisitsWindowCube, at once and as the visits stream in. Every window must hold the same
+# visits. Hour bands that trespass midnight are not compared, VisitsStreamSplitter fails to project them.
+from collections import defaultdict
+from time import perf_counter
+
+from benchmarks.spatial_time_model_builder_benchmark import generate_weekly_visits
+from stm.VisitsStreamSplitter import VisitsStreamSplitter
+from stm.VisitsWindowCube import VisitsWindowCube
+
+visits_to_test = [1000, 10000, 100000]
+hour_bands = [(0, 5), (6, 11), (12, 17), (18, 23), (7, 9), (17, 20)]
+
+
+def as_ids(visit_windows):
+    return [[visit.id_visit for visit in window] for window in visit_windows]
+
+
+if __name__ == '__main__':
+    print('visits,windows,splitters_seconds,cube_seconds,stream_seconds,speedup,same_windows')
+    for amount in visits_to_test:
+        visits = [visit for week in generate_weekly_visits(amount - 1) for visit in week]
+        cube = VisitsWindowCube(hour_bands)
+
+        start = perf_counter()
+        expected = {window: VisitsStreamSplitter(window[0], window[1], window[2], visits).split_visits()
+                    for window in cube.windows}
+        splitters_time = perf_counter() - start
+
+        start = perf_counter()
+        split = cube.split_visits(visits)
+        cube_time = perf_counter() - start
+
+        start = perf_counter()
+        streamed = defaultdict(list)
+        for window, window_visits in cube.stream_visits(iter(visits)):
+            streamed[window].append(window_visits)
+        stream_time = perf_counter() - start
+
+        same_windows = all(as_ids(split[window]) == as_ids(expected[window]) == as_ids(streamed[window])
+                           for window in cube.windows)
+        print('{},{},{:.3f},{:.3f},{:.3f},{:.1f},{}'.format(amount, len(cube.windows), splitters_time, cube_time,
+                                                             stream_time, splitters_time / cube_time, same_windows))
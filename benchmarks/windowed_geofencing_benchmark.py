@@ -0,0 +1,269 @@
+# This script measures the cost per fix of WindowedGeoFencing as the number of stay points grows. The ring buffers and
+# rolling counters, without and with the stay points prefilter, are compared against the former implementation (per
+# stay point lists, sub-windows summed on each fix). All of them must take the same decisions.
+import random
+from datetime import datetime, timedelta
+from math import floor
+from time import perf_counter
+from typing import Tuple
+
+import numpy as np
+
+from entities import geodesic
+from entities.GpsFix import GpsFix
+from entities.StayPoint import StayPoint
+from pac.mobility_analyzer.GeoFencingOutcome import GeoFencingOutcome as gfo
+from pac.mobility_analyzer.WindowedGeoFencing import WindowedGeoFencing
+
+
+class ListWindowedGeoFencing(object):
+    """
+    The former WindowedGeoFencing, it keeps a list of distances per stay point and sums the sub-windows on each fix
+    """
+
+    def __init__(self, radio_distance, window_size, batch_distances=False):
+        """
+        Basic constructor
+        :param radio_distance: The distance for considering when a fix is inside a stay point 
+        :param window_size: The size of the window to employ
+        :param batch_distances: Compute the distances to all of the stay points with the vectorized kernel
+        """
+        self.radio_distance = radio_distance
+        self.window_size = window_size
+        self.fixes_window = []
+        self.distances = {}
+        self.distances_as_boolean = {}
+        self.stay_points = []
+        self.pivot = floor(window_size / 2.0)  # Ok, validated
+        self.trimmed_once = False
+        self.current_sp = None
+        self.batch_distances = batch_distances
+        self._stay_points_latitudes = np.empty(0)
+        self._stay_points_longitudes = np.empty(0)
+
+    def analyze_location(self, gps_fix: GpsFix, pivot=-1):
+        self.fixes_window.append(gps_fix)
+        self.update_distances(gps_fix)
+        self.trim_window_if_needed()
+        return self.check_mobility_changes(gps_fix, self.pivot if pivot < 0 else pivot)
+
+    def update_distances(self, gps_fix):
+        if self.batch_distances and len(self.stay_points) > 0:
+            distances = geodesic.distances_to_point(gps_fix.latitude, gps_fix.longitude,
+                                                    self._stay_points_latitudes, self._stay_points_longitudes).tolist()
+        else:
+            distances = [stay_point.distance_to(gps_fix) for stay_point in self.stay_points]
+
+        for stay_point, distance in zip(self.stay_points, distances):
+            distance_as_boolean = self.radio_distance > distance
+            stay_point_distances = self.distances[stay_point.id_stay_point]
+            stay_point_distances.append(distance)
+            stay_point_distances_as_boolean = self.distances_as_boolean[stay_point.id_stay_point]
+            stay_point_distances_as_boolean.append(distance_as_boolean)
+
+    def trim_window_if_needed(self):
+        if len(self.fixes_window) > self.window_size:
+            self.trimmed_once = True
+            self.fixes_window.pop(0)
+            for stay_point in self.stay_points:
+                stay_point_distances = self.distances[stay_point.id_stay_point]
+                del stay_point_distances[0]
+                stay_point_distances_as_boolean = self.distances_as_boolean[stay_point.id_stay_point]
+                del stay_point_distances_as_boolean[0]
+
+    def check_mobility_changes(self, gps_fix, pivot):
+        decision = None
+        if len(self.stay_points) > 0 and len(self.fixes_window) > pivot:
+            decision = self.obtain_decision(gps_fix, pivot)
+        return decision
+
+    def obtain_decision(self, gps_fix, pivot):
+        """
+        Identifies the mobility change
+        :type pivot: int
+        :type gps_fix: GpsFix
+        :param gps_fix: The latest received fix 
+        :param pivot: The index of pivot in window
+        :return: A GFO object or None if no changes are identified
+        """
+        # Count fixes inside stay point in oldest-newer sub-windows
+        results = {}
+        for sp in self.stay_points:
+            distances_as_boolean = self.distances_as_boolean[sp.id_stay_point]
+            results[sp.id_stay_point] = {
+                # oldest stuff. Structure is: count of fixes inside, sub-window length
+                "old_window": (sum(distances_as_boolean[:pivot]), pivot),
+                # newer stuff
+                "new_window": (sum(distances_as_boolean[(pivot + 1):]), len(distances_as_boolean[(pivot + 1):])),
+                "pivot": (distances_as_boolean[pivot], 1)}
+
+        is_user_arriving, metadata_arrival = self._check_for_arrival(gps_fix, results, pivot)
+        is_user_leaving, metadata_departure = self._check_for_departure(gps_fix, results, pivot)
+        if is_user_arriving and is_user_leaving:
+            # Departure and arrival
+            outcome = gfo(gfo.TYPE_LEAVING_AND_ARRIVING, metadata_departure.stay_point,
+                          metadata_arrival.event_fix, metadata_arrival.stay_point,
+                          metadata_arrival.detection_fix)
+            self.current_sp = outcome.stay_point_2  # The arrived stay point
+        elif is_user_arriving:
+            outcome = metadata_arrival
+            self.current_sp = outcome.stay_point
+        elif is_user_leaving:
+            outcome = metadata_departure
+            self.current_sp = None
+        else:
+            # outcome = gfo(gfo.TYPE_NO_CHANGE, self.current_sp, gps_fix.timestamp, None, gps_fix.timestamp)
+            # TODO the call to watchdog would be here, basically, it would try to ensure that if
+            # TODO the distance to current stay point is way too large, then a leaving notification must be generated
+
+            if self.current_sp is not None and self.distance_watchdog_barks(pivot):
+                outcome = gfo(gfo.TYPE_LEAVING_STAY_POINT, self.current_sp, self.fixes_window[pivot], None, gps_fix)
+                self.current_sp = None
+            else:
+                outcome = gfo(gfo.TYPE_NO_CHANGE, self.current_sp, self.fixes_window[pivot], None, gps_fix)
+
+        return outcome
+
+    def it_is_the_same_current_stay_point(self, stay_point) -> bool:
+        """
+        Finds out whether the specified stay point is the same current stay point where user is
+        :param stay_point: The stay point to compare
+        :return: True if it is the same stay point, false otherwise
+        """
+        return self.current_sp is not None and self.current_sp.id_stay_point == stay_point.id_stay_point
+
+    def introduce_new_stay_point(self, stay_point):
+        self.stay_points.append(stay_point)
+        self._stay_points_latitudes = np.append(self._stay_points_latitudes, stay_point.latitude)
+        self._stay_points_longitudes = np.append(self._stay_points_longitudes, stay_point.longitude)
+        distances_new_stay_point = []
+        distances_as_boolean_new_stay_point = []
+        for fix in self.fixes_window:
+            distance = stay_point.distance_to(fix)
+            distances_new_stay_point.append(distance)
+
+            distance_as_boolean = self.radio_distance > distance
+            distances_as_boolean_new_stay_point.append(distance_as_boolean)
+
+        self.distances[stay_point.id_stay_point] = distances_new_stay_point
+        self.distances_as_boolean[stay_point.id_stay_point] = distances_as_boolean_new_stay_point
+
+    def _check_for_arrival(self, fix, results, pivot) -> Tuple[bool, gfo]:
+        for sp in self.stay_points:
+            vote_value = results[sp.id_stay_point]
+            inside_fixes_old_window, total_old_fixes = vote_value["old_window"]
+            inside_fixes_new_window, total_new_fixes = vote_value["new_window"]
+            pivot_inside, count = vote_value["pivot"]
+
+            outside_fixes_old_window = total_old_fixes - inside_fixes_old_window
+            voting_threshold = floor(self.window_size / 2.0)
+
+            if pivot_inside:
+                if outside_fixes_old_window >= voting_threshold and inside_fixes_new_window >= voting_threshold:
+                    if not self.it_is_the_same_current_stay_point(sp):
+                        metadata = gfo(gfo.TYPE_ARRIVING_STAY_POINT, sp, self.fixes_window[pivot], None, fix)
+                        return True, metadata
+                    else:
+                        # Nothing to report, the stay point where user is arriving is the "same" where she is
+                        pass
+
+                elif inside_fixes_old_window >= voting_threshold and not self.trimmed_once:
+                    # Case added for when testing PAC without SPD and trajectory starts right inside a know SP
+                    if not self.it_is_the_same_current_stay_point(sp):
+                        metadata = gfo(gfo.TYPE_ARRIVING_STAY_POINT, sp, self.fixes_window[0], None, fix)
+                        return True, metadata
+                    else:
+                        # Nothing to report, the stay point where user is arriving is the "same" where she is
+                        pass
+
+        return False, None
+
+    def _check_for_departure(self, fix, results, pivot) -> Tuple[bool, gfo]:
+        for sp in self.stay_points:
+            vote_value = results[sp.id_stay_point]
+            inside_fixes_old_window, total_old_fixes = vote_value["old_window"]
+            inside_fixes_new_window, total_new_fixes = vote_value["new_window"]
+            pivot_inside, count = vote_value["pivot"]
+
+            outside_fixes_new_window = total_new_fixes - inside_fixes_new_window
+            voting_threshold = floor(self.window_size / 2.0)  # in winSize=5, 1 means a 50% of error tolerance
+
+            if pivot_inside is False:
+                if inside_fixes_old_window >= voting_threshold and outside_fixes_new_window >= voting_threshold:
+                    if self.current_sp is not None:  # if not self.it_is_the_same_current_stay_point(sp):  # if self.current_sp is not None:
+                        # Why? because there are orphan departures without arrival if user passes by quickly:
+                        # For instance: FFTTF, FTTFF, and TTFFF
+                        metadata = gfo(gfo.TYPE_LEAVING_STAY_POINT, sp, self.fixes_window[pivot], None, fix)
+                        self.current_sp = None
+                        return True, metadata
+
+        return False, None
+
+    def distance_watchdog_barks(self, pivot):
+        distances_as_boolean = self.distances_as_boolean[self.current_sp.id_stay_point]
+        if not distances_as_boolean[pivot]:
+            votes, length = (sum(distances_as_boolean[(pivot + 1):]), len(distances_as_boolean[(pivot + 1):]))
+            if votes == 0:
+                if self.distances[self.current_sp.id_stay_point][-1] > self.radio_distance:
+                    # Bark!
+                    return True
+
+        return False
+
+
+def generate_fixes(amount, seed=11):
+    """
+    Generates a trajectory moving back and forth between two places, 150 m apart
+    """
+    rnd = random.Random(seed)
+    start = datetime(2017, 1, 9, 8, 0, 0)
+    fixes = []
+    for i in range(0, amount):
+        place_latitude = 23.72 if (i // 60) % 2 == 0 else 23.7213
+        fixes.append(GpsFix(place_latitude + rnd.gauss(0, 0.0001), -99.07 + rnd.gauss(0, 0.0001),
+                            start + timedelta(seconds=i), 0, 0, 0, 0, 0))
+    return fixes
+
+
+def generate_stay_points(amount, seed=13):
+    """
+    Generates the two visited places followed by stay points spread over a city sized area
+    """
+    rnd = random.Random(seed)
+    stay_points = [StayPoint(1, 23.72, -99.07), StayPoint(2, 23.7213, -99.07)]
+    for id_stay_point in range(3, amount + 1):
+        stay_points.append(StayPoint(id_stay_point, 23.5 + rnd.uniform(0, 0.36), -99.3 + rnd.uniform(0, 0.39)))
+    return stay_points
+
+
+def run(geo_fencing, stay_points, fixes):
+    for stay_point in stay_points:
+        geo_fencing.introduce_new_stay_point(stay_point)
+
+    start = perf_counter()
+    outcomes = []
+    for fix in fixes:
+        outcome = geo_fencing.analyze_location(fix)
+        outcomes.append(None if outcome is None else (outcome.event_type, outcome.stay_point is not None and
+                                                      outcome.stay_point.id_stay_point))
+    return perf_counter() - start, outcomes
+
+
+if __name__ == '__main__':
+    window_size = 11
+    fixes = generate_fixes(300)
+    print('stay_points,window_size,lists_ms_per_fix,ring_buffers_ms_per_fix,prefiltered_ms_per_fix,speedup,'
+          'same_decisions')
+    for amount in (10, 100, 1000, 10000):
+        stay_points = generate_stay_points(amount)
+        lists_time, lists_outcomes = run(ListWindowedGeoFencing(50, window_size, batch_distances=True),
+                                         stay_points, fixes)
+        ring_time, ring_outcomes = run(WindowedGeoFencing(50, window_size, batch_distances=True,
+                                                          prefilter_stay_points=False), stay_points, fixes)
+        prefiltered_time, prefiltered_outcomes = run(WindowedGeoFencing(50, window_size, batch_distances=True),
+                                                     stay_points, fixes)
+        print('{},{},{:.3f},{:.3f},{:.3f},{:.1f},{}'.format(amount, window_size, 1000 * lists_time / len(fixes),
+                                                            1000 * ring_time / len(fixes),
+                                                            1000 * prefiltered_time / len(fixes),
+                                                            lists_time / prefiltered_time,
+                                                            lists_outcomes == ring_outcomes == prefiltered_outcomes))
@@ -0,0 +1,51 @@
+from typing import Iterable, Iterator, Sequence, Union
+
+from entities.GpsFix import GpsFix
+
+
+class IterableGpsReader(object):
+    """
+    Delivers the fixes of a list, or of any other iterable (a generator, a stream of a file...), one after the other,
+    no matter the seconds requested, as the PAC does when there is no cognitive action.
+    The first and last fixes are known up front only for sequences, otherwise last_fix is the latest delivered fix.
+    """
+
+    def __init__(self, fixes: Iterable[GpsFix]):
+        """
+        Basic constructor
+        :param fixes: The fixes to deliver, in chronological order
+        """
+        self._fixes = fixes
+        self._is_sequence = isinstance(fixes, Sequence)
+        self.first_fix = None
+        self.last_fix = None
+        self._iterator = None  # type: Iterator[GpsFix]
+
+        self._reset_attribute_values()
+
+    def _reset_attribute_values(self):
+        if self._is_sequence and len(self._fixes) > 0:
+            self.first_fix = self._fixes[0]
+            self.last_fix = self._fixes[-1]
+        self._iterator = iter(self._fixes)
+
+    def get_fix_in_n_seconds(self, n_seconds: int) -> Union[GpsFix, None]:
+        """
+        Delivers the next fix
+        :param n_seconds: Ignored, every fix is delivered
+        :return: The next GpsFix, None once the fixes are over
+        """
+        fix = next(self._iterator, None)
+        if fix is not None and not self._is_sequence:
+            if self.first_fix is None:
+                self.first_fix = fix
+            self.last_fix = fix
+        return fix
+
+    def reset_position(self):
+        """
+        Starts delivering the fixes from the first one again, only for sequences
+        """
+        if not self._is_sequence:
+            raise ValueError('Only the fixes of a sequence can be delivered again')
+        self._reset_attribute_values()
@@ -1,20 +1,29 @@
-from copy import deepcopy
-from datetime import timedelta
+from datetime import datetime, timedelta
 
-from typing import List, Union
+from typing import Dict, Iterable, List, Union
 
-from csv_readers import logger_gps_csv_reader
+from csv_readers import epoch_search, fix_resampler, logger_gps_csv_reader
+from entities.FixArray import FixArray
 from entities.GpsFix import GpsFix
 
 
 class LogicGpsReader(object):
     """
     This class tries to read a file of gps fixes according to specifications of time in each reading.
-    All file content is put on RAM, so, proceed with caution
+    All file content is put on RAM, so, proceed with caution.
+    The timestamps are also kept as epoch seconds, so the fix of a time is found with a galloping search
     """
 
-    def __init__(self, csv_file_path: str):
+    def __init__(self, csv_file_path: str, use_cache=False):
+        """
+        Reads the whole file
+        :param csv_file_path: The path of the file to read
+        :param use_cache: Whether to load the fixes from (or save them into) a binary cache next to the file, so
+        that later readers of the same (unchanged) file do not parse it again
+        """
         self._fixes = []  # type: List[GpsFix]
+        self._csv_file_path = csv_file_path
+        self._use_cache = use_cache
         self._read_logger_file(csv_file_path)
         self.first_fix = None
         self.last_fix = None
@@ -22,9 +31,25 @@ class LogicGpsReader(object):
         self.amount_fixes = -1
         self._time_pointer = None
         self._index_pointer = -1
+        self._epochs = None  # type: List[float]
 
         self._reset_attribute_values()
 
+    @staticmethod
+    def from_fixes(fixes: List[GpsFix]) -> 'LogicGpsReader':
+        """
+        Builds a reader over fixes that are already in memory, instead of reading a file
+        :param fixes: The fixes, in chronological order. They are not copied, and the reader does not modify them
+        :return: A reader positioned at the first fix
+        """
+        reader = LogicGpsReader.__new__(LogicGpsReader)
+        reader._fixes = fixes
+        reader._csv_file_path = None
+        reader._use_cache = False
+        reader._epochs = None
+        reader._reset_attribute_values()
+        return reader
+
     def _reset_attribute_values(self):
         self.first_fix = self._fixes[0]
         self.last_fix = self._fixes[-1]
@@ -32,6 +57,8 @@ class LogicGpsReader(object):
         self.amount_fixes = len(self._fixes)
         self._time_pointer = self.first_fix.timestamp
         self._index_pointer = 0
+        if self._epochs is None:
+            self._epochs = epoch_search.epochs_of(self._fixes)
 
     def get_fix_in_n_seconds(self, n_seconds: int) -> Union[GpsFix, None]:
         """
@@ -45,20 +72,44 @@ class LogicGpsReader(object):
         target_time = self._time_pointer + timedelta(seconds=n_seconds)
 
         # Need to advance until we reach 'that' time
-        while self._fixes[self._index_pointer].timestamp < target_time:
-            self._index_pointer += 1
-            if self._index_pointer == self.amount_fixes:
-                return None
+        self._index_pointer = epoch_search.find_first_not_before(self._epochs, target_time, self._index_pointer)
+        if self._index_pointer == self.amount_fixes:
+            return None
 
         self._time_pointer = target_time
-        if (self._fixes[self._index_pointer].timestamp - target_time).total_seconds() == 0:
+        return self._deliver(self._index_pointer, target_time)
+
+    def get_fix_at(self, timestamp: datetime) -> Union[GpsFix, None]:
+        """
+        Obtains the fix of any time, as get_fix_in_n_seconds would deliver it, without moving the reader
+        :param timestamp: The time of the desired GpsFix
+        :return: The GpsFix of that time, None if it is before the first fix or after the last one
+        """
+        if timestamp < self.first_fix.timestamp:
+            return None
+
+        index = epoch_search.find_first_not_before(self._epochs, timestamp)
+        if index == self.amount_fixes:
+            return None
+        return self._deliver(index, timestamp)
+
+    def seek(self, timestamp: datetime):
+        """
+        Moves the reader to any time (backwards too), so the next get_fix_in_n_seconds counts from there. Times
+        before the first fix move the reader to the first fix
+        :param timestamp: The time to move to, get_fix_in_n_seconds(0) then delivers the GpsFix of that time
+        """
+        timestamp = max(timestamp, self.first_fix.timestamp)
+        self._index_pointer = epoch_search.find_first_not_before(self._epochs, timestamp)
+        self._time_pointer = timestamp
+
+    def _deliver(self, index: int, target_time: datetime) -> GpsFix:
+        if self._fixes[index].timestamp == target_time:
             # this is the one!
-            return self._fixes[self._index_pointer]
+            return self._fixes[index]
         else:
             # need to report the previous fix (spatial information) but with the requested timestamp
-            previous_fix = deepcopy(self._fixes[self._index_pointer - 1])
-            previous_fix.timestamp = target_time
-            return previous_fix
+            return self._fixes[index - 1].with_timestamp(target_time)
 
     def read_whole_file_with_one_second(self):
         fix = self.get_fix_in_n_seconds(0)
@@ -69,11 +120,26 @@ class LogicGpsReader(object):
 
         return fixes_one_hert
 
+    def read_whole_file_at_rates(self, periods: Iterable) -> Dict[object, FixArray]:
+        """
+        Reads the whole file every period seconds, from the first fix, for each one of the periods at once. The reader
+        is not moved
+        :param periods: The seconds between readings of each rate
+        :return: The fixes read_whole_file_with_one_second would deliver with each period, as a FixArray keyed by
+        the period
+        """
+        return fix_resampler.resample_many(self.get_read_fixes_as_array(), periods)
+
     def _read_logger_file(self, csv_file_path):
-        self._fixes = logger_gps_csv_reader.read(csv_file_path)
+        self._fixes = logger_gps_csv_reader.read(csv_file_path, use_cache=self._use_cache)
 
     def get_read_fixes(self) -> List[GpsFix]:
         return self._fixes
 
+    def get_read_fixes_as_array(self) -> FixArray:
+        if self._use_cache:
+            return logger_gps_csv_reader.read_fix_array(self._csv_file_path, use_cache=True)
+        return FixArray.from_fixes(self._fixes)
+
     def reset_position(self):
         self._reset_attribute_values()
@@ -1,9 +1,8 @@
-from datetime import timedelta
+from datetime import datetime, timedelta
 from typing import Union, List
 
-from copy import deepcopy
-
-from csv_readers import smartphone_gps_csv_reader
+from csv_readers import epoch_search, smartphone_gps_csv_reader
+from entities.FixArray import FixArray
 from entities.GpsFix import GpsFix
 
 
@@ -11,10 +10,19 @@ class LogicGpsReaderSparse(object):
     """
     This class tries to read a sparse sampling file and deliver samplings close in time to the requests.
     All content is loaded to RAM so proceed with caution.
+    The timestamps are also kept as epoch seconds, so the fix of a time is found with a galloping search
     """
 
-    def __init__(self, csv_file_path: str):
+    def __init__(self, csv_file_path: str, use_cache=False):
+        """
+        Reads the whole file
+        :param csv_file_path: The path of the file to read
+        :param use_cache: Whether to load the fixes from (or save them into) a binary cache next to the file, so
+        that later readers of the same (unchanged) file do not parse it again
+        """
         self._fixes = []  # type: List[GpsFix]
+        self._csv_file_path = csv_file_path
+        self._use_cache = use_cache
         self._read_smartphone_file(csv_file_path)
         self.first_fix = None
         self.last_fix = None
@@ -22,9 +30,25 @@ class LogicGpsReaderSparse(object):
         self.amount_fixes = -1
         self._time_pointer = None
         self._index_pointer = -1
+        self._epochs = None  # type: List[float]
 
         self._reset_attribute_values()
 
+    @staticmethod
+    def from_fixes(fixes: List[GpsFix]) -> 'LogicGpsReaderSparse':
+        """
+        Builds a reader over fixes that are already in memory, instead of reading a file
+        :param fixes: The fixes, in chronological order. They are not copied, and the reader does not modify them
+        :return: A reader positioned at the first fix
+        """
+        reader = LogicGpsReaderSparse.__new__(LogicGpsReaderSparse)
+        reader._fixes = fixes
+        reader._csv_file_path = None
+        reader._use_cache = False
+        reader._epochs = None
+        reader._reset_attribute_values()
+        return reader
+
     def _reset_attribute_values(self):
         self.first_fix = self._fixes[0]
         self.last_fix = self._fixes[-1]
@@ -32,6 +56,8 @@ class LogicGpsReaderSparse(object):
         self.amount_fixes = len(self._fixes)
         self._time_pointer = self.first_fix.timestamp
         self._index_pointer = 0
+        if self._epochs is None:
+            self._epochs = epoch_search.epochs_of(self._fixes)
 
     def get_fix_in_n_seconds(self, n_seconds: int) -> Union[GpsFix, None]:
         """
@@ -45,14 +71,33 @@ class LogicGpsReaderSparse(object):
         target_time = self._time_pointer + timedelta(seconds=n_seconds)
 
         # Need to advance until we reach 'that' time
-        while self._fixes[self._index_pointer].timestamp < target_time:
-            self._index_pointer += 1
-            if self._index_pointer == self.amount_fixes:
-                return None
+        self._index_pointer = epoch_search.find_first_not_before(self._epochs, target_time, self._index_pointer)
+        if self._index_pointer == self.amount_fixes:
+            return None
 
         self._time_pointer = target_time
         return self._fixes[self._index_pointer]
 
+    def get_fix_at(self, timestamp: datetime) -> Union[GpsFix, None]:
+        """
+        Obtains the fix of any time, as get_fix_in_n_seconds would deliver it (the first one at or after that
+        time), without moving the reader
+        :param timestamp: The time of the desired GpsFix
+        :return: The GpsFix of that time, None if it is after the last fix
+        """
+        index = epoch_search.find_first_not_before(self._epochs, timestamp)
+        if index == self.amount_fixes:
+            return None
+        return self._fixes[index]
+
+    def seek(self, timestamp: datetime):
+        """
+        Moves the reader to any time (backwards too), so the next get_fix_in_n_seconds counts from there
+        :param timestamp: The time to move to, get_fix_in_n_seconds(0) then delivers the GpsFix of that time
+        """
+        self._index_pointer = epoch_search.find_first_not_before(self._epochs, timestamp)
+        self._time_pointer = timestamp
+
     def read_whole_file_with_one_second(self):
         fix = self.get_fix_in_n_seconds(0)
         fixes_one_hert = []
@@ -63,10 +108,15 @@ class LogicGpsReaderSparse(object):
         return fixes_one_hert
 
     def _read_smartphone_file(self, csv_file_path):
-        self._fixes = smartphone_gps_csv_reader.read(csv_file_path)
+        self._fixes = smartphone_gps_csv_reader.read(csv_file_path, use_cache=self._use_cache)
 
     def get_read_fixes(self) -> List[GpsFix]:
         return self._fixes
 
+    def get_read_fixes_as_array(self) -> FixArray:
+        if self._use_cache:
+            return smartphone_gps_csv_reader.read_fix_array(self._csv_file_path, use_cache=True)
+        return FixArray.from_fixes(self._fixes)
+
     def reset_position(self):
         self._reset_attribute_values()
@@ -0,0 +1,21 @@
+from typing import Iterator
+
+from csv_readers import smartphone_gps_csv_reader
+from csv_readers.LogicGpsReaderStreamed import LogicGpsReaderStreamed
+from entities.GpsFix import GpsFix
+
+
+class LogicGpsReaderSparseStreamed(LogicGpsReaderStreamed):
+    """
+    Streaming version of LogicGpsReaderSparse, with the same get_fix_in_n_seconds contract: it delivers the closest
+    next fix to the request. Only the current fix of the file is kept in memory.
+    """
+
+    def _read_file_edges(self):
+        self.first_fix, self.last_fix = smartphone_gps_csv_reader.read_first_and_last_fix(self._csv_file_path)
+
+    def _open_stream(self) -> Iterator[GpsFix]:
+        return smartphone_gps_csv_reader.read_line_by_line(self._csv_file_path)
+
+    def _deliver(self, target_time) -> GpsFix:
+        return self._current_fix
@@ -0,0 +1,99 @@
+from datetime import timedelta
+from typing import Union, Iterator
+
+from csv_readers import logger_gps_csv_reader
+from entities.GpsFix import GpsFix
+
+
+class LogicGpsReaderStreamed(object):
+    """
+    Streaming version of LogicGpsReader, with the same get_fix_in_n_seconds contract.
+    The file is read forward lazily and only the fix previous to the current one is kept, so memory does not depend
+    on the length of the file. First and last fixes are obtained seeking to the edges of the file.
+    The amount of fixes is unknown until the whole file is read, so amount_fixes is kept as -1.
+    """
+
+    def __init__(self, csv_file_path: str):
+        self._csv_file_path = csv_file_path
+        self.first_fix = None
+        self.last_fix = None
+        self.time_length = -1
+        self.amount_fixes = -1
+        self._time_pointer = None
+        self._stream = None  # type: Iterator[GpsFix]
+        self._current_fix = None  # type: GpsFix
+        self._previous_fix = None  # type: GpsFix
+
+        self._read_file_edges()
+        self._reset_attribute_values()
+
+    def _read_file_edges(self):
+        self.first_fix, self.last_fix = logger_gps_csv_reader.read_first_and_last_fix(self._csv_file_path)
+
+    def _open_stream(self) -> Iterator[GpsFix]:
+        return logger_gps_csv_reader.read_line_by_line(self._csv_file_path)
+
+    def _reset_attribute_values(self):
+        self.time_length = (self.last_fix.timestamp - self.first_fix.timestamp).total_seconds()
+        self._close_stream()
+        self._stream = self._open_stream()
+        self._current_fix = next(self._stream, None)
+        self._previous_fix = None
+        self._time_pointer = self.first_fix.timestamp
+
+    def _close_stream(self):
+        if self._stream is not None:
+            self._stream.close()
+            self._stream = None
+
+    def _advance(self) -> bool:
+        """
+        Moves one fix forward in the file
+        :return: True if there was a fix to move to, False if the file is over
+        """
+        self._previous_fix = self._current_fix
+        self._current_fix = next(self._stream, None)
+        if self._current_fix is None:
+            self._close_stream()
+            return False
+        return True
+
+    def get_fix_in_n_seconds(self, n_seconds: int) -> Union[GpsFix, None]:
+        """
+        Note, call it when you need future dates, otherwise it will behave weird, W-E-I-R-D
+        :param n_seconds: the seconds in the future of the desired GpsFix
+        :return: The GpsFix collected @ n_seconds from previous delivered fix
+        """
+        if self._current_fix is None:
+            return None
+
+        target_time = self._time_pointer + timedelta(seconds=n_seconds)
+
+        # Need to advance until we reach 'that' time
+        while self._current_fix.timestamp < target_time:
+            if not self._advance():
+                return None
+
+        self._time_pointer = target_time
+        return self._deliver(target_time)
+
+    def _deliver(self, target_time) -> GpsFix:
+        if (self._current_fix.timestamp - target_time).total_seconds() == 0:
+            # this is the one!
+            return self._current_fix
+        else:
+            # need to report the previous fix (spatial information) but with the requested timestamp
+            previous_fix = self._previous_fix if self._previous_fix is not None else self.last_fix
+            return previous_fix.with_timestamp(target_time)
+
+    def read_whole_file_with_one_second(self):
+        fix = self.get_fix_in_n_seconds(0)
+        fixes_one_hert = []
+        while fix is not None:
+            fixes_one_hert.append(fix)
+            fix = self.get_fix_in_n_seconds(1)
+
+        return fixes_one_hert
+
+    def reset_position(self):
+        self._reset_attribute_values()
@@ -0,0 +1,243 @@
+import csv
+from datetime import datetime, timedelta
+from itertools import islice
+from typing import List, Iterator, Dict, Callable
+
+import numpy as np
+
+from entities.FixArray import FixArray, datetime_to_epoch, EPOCH
+from entities.GpsFix import GpsFix
+
+LOGGER_DATE_FORMAT = '%Y/%m/%d %H:%M:%S'
+DEFAULT_CHUNK_SIZE = 100000
+
+
+def read_logger(file_path: str, date_format=LOGGER_DATE_FORMAT) -> FixArray:
+    """
+    Parses a whole logger csv file into a columnar trajectory, with the same fixes logger_gps_csv_reader.read
+    delivers
+    :param file_path: The path of file to read
+    :param date_format: The date format to use
+    :return: A FixArray with the fixes of the file
+    """
+    return _concatenate(list(iter_logger_chunks(file_path, date_format)))
+
+
+def read_logger_fixes(file_path: str, date_format=LOGGER_DATE_FORMAT) -> List[GpsFix]:
+    """
+    Parses a whole logger csv file into a list of GpsFix, equal to the one logger_gps_csv_reader.read returns
+    :param file_path: The path of file to read
+    :param date_format: The date format to use
+    :return: A list of GpsFix
+    """
+    results = []
+    for columns in _iter_parsed_chunks(file_path, lambda raw: parse_logger_columns(raw, date_format)):
+        results.extend(build_fixes(columns))
+    return results
+
+
+def read_logger_columns(file_path: str, date_format=LOGGER_DATE_FORMAT) -> Dict[str, np.ndarray]:
+    """
+    Parses a whole logger csv file into full precision columns
+    :param file_path: The path of file to read
+    :param date_format: The date format to use
+    :return: The columns of the file, keyed as FixArray.COLUMNS
+    """
+    return _concatenate_columns(list(_iter_parsed_chunks(file_path,
+                                                         lambda raw: parse_logger_columns(raw, date_format))))
+
+
+def iter_logger_chunks(file_path: str, date_format=LOGGER_DATE_FORMAT,
+                       chunk_size=DEFAULT_CHUNK_SIZE) -> Iterator[FixArray]:
+    """
+    Parses a logger csv file in chunks of lines, so that only a chunk of raw lines is in memory at any time
+    :param file_path: The path of file to read
+    :param date_format: The date format to use
+    :param chunk_size: The amount of lines per chunk
+    :return: A FixArray per chunk of lines
+    """
+    for columns in _iter_parsed_chunks(file_path, lambda raw: parse_logger_columns(raw, date_format), chunk_size):
+        yield FixArray(**columns)
+
+
+def parse_logger_columns(raw_columns: Dict[str, tuple], date_format=LOGGER_DATE_FORMAT) -> Dict[str, np.ndarray]:
+    """
+    Converts the raw columns of a chunk of logger lines, applying the same rules of
+    logger_gps_csv_reader.build_fix_from_line over whole columns
+    :param raw_columns: The string values of the chunk, keyed by header name
+    :param date_format: The date format to use
+    :return: The float64 columns of the chunk, keyed as FixArray.COLUMNS
+    """
+    if date_format == LOGGER_DATE_FORMAT:
+        timestamps = _parse_logger_dates(raw_columns["UTC DATE"]) + _parse_clock_times(raw_columns["UTC TIME"])
+    else:
+        timestamps = np.array([datetime_to_epoch(datetime.strptime(date + ' ' + time, date_format))
+                               for date, time in zip(raw_columns["UTC DATE"], raw_columns["UTC TIME"])],
+                              dtype=np.float64)
+    timestamps -= np.where(_is_summer_time(timestamps), 5 * 3600, 6 * 3600)
+
+    latitude = np.array(raw_columns["LATITUDE"], dtype=np.float64)
+    latitude[np.array(raw_columns["N/S"]) == "S"] *= -1
+    longitude = np.array(raw_columns["LONGITUDE"], dtype=np.float64)
+    longitude[np.array(raw_columns["E/W"]) == "W"] *= -1
+
+    zeros = np.zeros(len(latitude))
+    return {'latitude': latitude, 'longitude': longitude, 'timestamp': timestamps,
+            'altitude': np.array(raw_columns["ALTITUDE"], dtype=np.float64), 'accuracy': zeros,
+            'speed': np.array(raw_columns["SPEED"], dtype=np.float64), 'battery_level': zeros,
+            'detected_activity': zeros}
+
+
+def read_smartphone(file_path: str) -> FixArray:
+    """
+    Parses a whole smartphone csv file into a columnar trajectory, with the same fixes
+    smartphone_gps_csv_reader.read delivers
+    :param file_path: The path of file to read
+    :return: A FixArray with the fixes of the file
+    """
+    return _concatenate(list(iter_smartphone_chunks(file_path)))
+
+
+def read_smartphone_fixes(file_path: str) -> List[GpsFix]:
+    """
+    Parses a whole smartphone csv file into a list of GpsFix, equal to the one smartphone_gps_csv_reader.read
+    returns
+    :param file_path: The path of file to read
+    :return: A list of GpsFix
+    """
+    results = []
+    for columns in _iter_parsed_chunks(file_path, parse_smartphone_columns):
+        results.extend(build_fixes(columns))
+    return results
+
+
+def read_smartphone_columns(file_path: str) -> Dict[str, np.ndarray]:
+    """
+    Parses a whole smartphone csv file into full precision columns
+    :param file_path: The path of file to read
+    :return: The columns of the file, keyed as FixArray.COLUMNS
+    """
+    return _concatenate_columns(list(_iter_parsed_chunks(file_path, parse_smartphone_columns)))
+
+
+def iter_smartphone_chunks(file_path: str, chunk_size=DEFAULT_CHUNK_SIZE) -> Iterator[FixArray]:
+    """
+    Parses a smartphone csv file in chunks of lines, so that only a chunk of raw lines is in memory at any time
+    :param file_path: The path of file to read
+    :param chunk_size: The amount of lines per chunk
+    :return: A FixArray per chunk of lines
+    """
+    for columns in _iter_parsed_chunks(file_path, parse_smartphone_columns, chunk_size):
+        yield FixArray(**columns)
+
+
+def parse_smartphone_columns(raw_columns: Dict[str, tuple]) -> Dict[str, np.ndarray]:
+    """
+    Converts the raw columns of a chunk of smartphone lines, applying the same rules of
+    smartphone_gps_csv_reader.build_fix_from_line over whole columns
+    :param raw_columns: The string values of the chunk, keyed by header name
+    :return: The columns of the chunk, keyed as FixArray.COLUMNS
+    """
+    # The fixed 'YYYY-MM-DD HH:MM:SS' format is parsed natively by numpy
+    timestamps = np.array(raw_columns["timestamp"], dtype='datetime64[s]').astype(np.int64).astype(np.float64)
+    return {'latitude': np.array(raw_columns["latitude"], dtype=np.float64),
+            'longitude': np.array(raw_columns["longitude"], dtype=np.float64),
+            'timestamp': timestamps,
+            'altitude': np.array(raw_columns["altitude"], dtype=np.float64),
+            'accuracy': np.array(raw_columns["accuracy"], dtype=np.float64),
+            'speed': np.array(raw_columns["speed"], dtype=np.float64),
+            'battery_level': np.array(raw_columns["batteryLevel"], dtype=np.float64),
+            'detected_activity': np.array(raw_columns["detectedActivity"], dtype=np.int64)}
+
+
+def _iter_parsed_chunks(file_path: str, parse_columns: Callable[[Dict[str, tuple]], Dict[str, np.ndarray]],
+                        chunk_size=DEFAULT_CHUNK_SIZE) -> Iterator[Dict[str, np.ndarray]]:
+    with open(file_path, 'r', newline='', encoding='utf-8') as file:
+        reader = csv.reader(file, delimiter=',')
+        header = next(reader, None)
+        if header is None:
+            return
+        for raw_columns in _iter_column_chunks(reader, header, chunk_size):
+            yield parse_columns(raw_columns)
+
+
+def build_fixes(columns: Dict[str, np.ndarray]) -> List[GpsFix]:
+    """
+    Builds GpsFix objects straight from the parsed columns, keeping their full precision
+    """
+    timestamps = [EPOCH + timedelta(seconds=seconds) for seconds in columns['timestamp'].tolist()]
+    values = [columns[c].tolist() for c in ('latitude', 'longitude', 'altitude', 'accuracy', 'speed',
+                                            'battery_level', 'detected_activity')]
+    return [GpsFix(latitude=latitude, longitude=longitude, timestamp=timestamp, altitude=altitude,
+                   accuracy=accuracy, speed=speed, battery_level=battery_level,
+                   detected_activity=int(detected_activity))
+            for timestamp, latitude, longitude, altitude, accuracy, speed, battery_level, detected_activity
+            in zip(timestamps, *values)]
+
+
+def _iter_column_chunks(reader, header: List[str], chunk_size: int) -> Iterator[Dict[str, tuple]]:
+    """
+    Transposes the rows of a csv reader into columns, chunk by chunk
+    :param reader: The csv reader, already past the header
+    :param header: The names of the columns
+    :param chunk_size: The amount of lines per chunk
+    :return: A dictionary of column name to tuple of raw values, per chunk
+    """
+    while True:
+        rows = [row for row in islice(reader, chunk_size) if len(row) > 0]
+        if len(rows) == 0:
+            return
+        yield dict(zip(header, zip(*rows)))
+
+
+def _parse_logger_dates(dates: tuple) -> np.ndarray:
+    """
+    Converts logger dates ('Y/M/D', not zero padded) into seconds since the epoch at midnight.
+    Each distinct date is parsed once, as they are repeated along the file.
+    """
+    parsed = {}
+    for date in set(dates):
+        year, month, day = date.split('/')
+        parsed[date] = datetime_to_epoch(datetime(int(year), int(month), int(day)))
+    return np.array([parsed[date] for date in dates], dtype=np.float64)
+
+
+def _parse_clock_times(times: tuple) -> np.ndarray:
+    """
+    Converts 'H:M:S' clock times into seconds since midnight
+    """
+    split_times = np.array([time.split(':') for time in times], dtype=np.int64).reshape(-1, 3)
+    return (split_times[:, 0] * 3600 + split_times[:, 1] * 60 + split_times[:, 2]).astype(np.float64)
+
+
+def _is_summer_time(timestamps: np.ndarray) -> np.ndarray:
+    """
+    Vectorized counterpart of logger_gps_csv_reader._is_summer_time: April 3rd to October 30th, both included
+    :param timestamps: UTC timestamps, as seconds since the epoch
+    :return: A boolean array, True for timestamps within summer time
+    """
+    as_dates = timestamps.astype('datetime64[s]')
+    months_since_epoch = as_dates.astype('datetime64[M]')
+    month = months_since_epoch.astype(np.int64) % 12 + 1
+    day = (as_dates.astype('datetime64[D]') - months_since_epoch).astype(np.int64) + 1
+
+    within_months = (4 <= month) & (month <= 10)
+    too_early = (month == 4) & (day < 3)
+    too_late = (month == 10) & (day > 30)
+    return within_months & ~too_early & ~too_late
+
+
+def _concatenate(chunks: List[FixArray]) -> FixArray:
+    if len(chunks) == 1:
+        return chunks[0]
+    if len(chunks) == 0:
+        return FixArray([], [], [])
+    return FixArray(**{c: np.concatenate([getattr(chunk, c) for chunk in chunks]) for c in FixArray.COLUMNS})
+
+
+def _concatenate_columns(chunks: List[Dict[str, np.ndarray]]) -> Dict[str, np.ndarray]:
+    if len(chunks) == 1:
+        return chunks[0]
+    if len(chunks) == 0:
+        return {c: np.zeros(0) for c in FixArray.COLUMNS}
+    return {c: np.concatenate([chunk[c] for chunk in chunks]) for c in FixArray.COLUMNS}
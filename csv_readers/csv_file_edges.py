@@ -0,0 +1,41 @@
+import csv
+import os
+from typing import Dict, Tuple, Union
+
+
+def read_first_and_last_lines(file_path: str, chunk_size=8192) -> Tuple[Union[Dict, None], Union[Dict, None]]:
+    """
+    Reads the first and the last data lines of a csv file, without going through the lines in between.
+    The last line is found seeking to the end of the file and reading backwards.
+    :param file_path: The path of file to read
+    :param chunk_size: The amount of bytes read on each step backwards
+    :return: The first and the last lines as dictionaries keyed by the header, (None, None) if there is no data
+    """
+    with open(file_path, 'rb') as file:
+        header = _decode_row(file.readline())
+        data_start = file.tell()
+        first_line = file.readline()
+        while first_line != b'' and first_line.strip() == b'':
+            first_line = file.readline()
+        if first_line == b'':
+            return None, None
+
+        file.seek(0, os.SEEK_END)
+        position = file.tell()
+        tail = b''
+        while position > data_start:
+            step = min(chunk_size, position - data_start)
+            position -= step
+            file.seek(position)
+            tail = file.read(step) + tail
+            # Need a complete non-empty line, so a line break must precede it (or the data must start there)
+            lines = tail.rstrip(b'\r\n').split(b'\n')
+            if len(lines) > 1 or position == data_start:
+                last_line = lines[-1]
+                break
+
+    return dict(zip(header, _decode_row(first_line))), dict(zip(header, _decode_row(last_line)))
+
+
+def _decode_row(raw_line: bytes):
+    return next(csv.reader([raw_line.decode('utf-8').rstrip('\r\n')], delimiter=','))
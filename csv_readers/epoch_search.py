@@ -0,0 +1,40 @@
+from bisect import bisect_left
+from datetime import datetime
+from typing import List
+
+from entities.FixArray import datetime_to_epoch
+from entities.GpsFix import GpsFix
+
+
+def epochs_of(fixes: List[GpsFix]) -> List[float]:
+    """
+    Obtains the timestamps of the fixes as seconds since the epoch. The conversion keeps the order and tells apart
+    any two different timestamps, so searching the epochs is the same as comparing the timestamps themselves
+    :param fixes: The fixes, in chronological order
+    :return: A list with the epoch of each fix
+    """
+    return [datetime_to_epoch(fix.timestamp) for fix in fixes]
+
+
+def find_first_not_before(epochs: List[float], timestamp: datetime, start=0) -> int:
+    """
+    Finds the first position, from start on, whose epoch is not before the specified timestamp. The search gallops
+    forward from start (checking 1, 2, 4... positions ahead) and then bisects the last step, so short moves forward,
+    the common case when reading a trajectory, only look at a few positions
+    :param epochs: The epochs, sorted
+    :param timestamp: The timestamp to find
+    :param start: The first position to consider
+    :return: The position found, len(epochs) if every epoch from start on is before the timestamp
+    """
+    target = datetime_to_epoch(timestamp)
+    size = len(epochs)
+    if start >= size or epochs[start] >= target:
+        return start
+
+    low = start  # epochs[low] is always before the target
+    step = 1
+    while low + step < size and epochs[low + step] < target:
+        low += step
+        step *= 2
+
+    return bisect_left(epochs, target, low + 1, min(low + step, size))
@@ -0,0 +1,180 @@
+import glob
+import hashlib
+import os
+from typing import Dict, List, Callable
+
+import numpy as np
+
+from csv_readers import bulk_gps_csv_reader
+from entities.FixArray import FixArray
+from entities.GpsFix import GpsFix
+from file_utils import write_atomically
+
+CACHE_SUFFIX = '.fixcache.npy'
+CACHE_VERSION = 1
+LOGGER_FORMAT = 'logger'
+SMARTPHONE_FORMAT = 'smartphone'
+
+
+def read_logger_fixes(file_path: str, date_format=bulk_gps_csv_reader.LOGGER_DATE_FORMAT,
+                      cache_dir=None) -> List[GpsFix]:
+    """
+    Obtains the fixes of a logger csv file, parsing it only when there is no valid cache for it
+    :param file_path: The path of file to read
+    :param date_format: The date format to use
+    :param cache_dir: The directory for the cache file (next to the csv file if None)
+    :return: A list of GpsFix, equal to the one logger_gps_csv_reader.read returns
+    """
+    return bulk_gps_csv_reader.build_fixes(read_logger_columns(file_path, date_format, cache_dir))
+
+
+def read_logger_fix_array(file_path: str, date_format=bulk_gps_csv_reader.LOGGER_DATE_FORMAT,
+                          cache_dir=None) -> FixArray:
+    """
+    Obtains the columnar trajectory of a logger csv file, parsing it only when there is no valid cache for it
+    :param file_path: The path of file to read
+    :param date_format: The date format to use
+    :param cache_dir: The directory for the cache file (next to the csv file if None)
+    :return: A FixArray with the fixes of the file
+    """
+    return FixArray(**read_logger_columns(file_path, date_format, cache_dir))
+
+
+def read_logger_columns(file_path: str, date_format=bulk_gps_csv_reader.LOGGER_DATE_FORMAT,
+                        cache_dir=None) -> Dict[str, np.ndarray]:
+    """
+    Obtains the (memory mapped) columns of a logger csv file, parsing it only when there is no valid cache for it
+    :param file_path: The path of file to read
+    :param date_format: The date format to use
+    :param cache_dir: The directory for the cache file (next to the csv file if None)
+    :return: The columns of the file, keyed as FixArray.COLUMNS
+    """
+    return _load_or_parse(file_path, LOGGER_FORMAT + ' ' + date_format,
+                          lambda: bulk_gps_csv_reader.read_logger_columns(file_path, date_format), cache_dir)
+
+
+def read_smartphone_fixes(file_path: str, cache_dir=None) -> List[GpsFix]:
+    """
+    Obtains the fixes of a smartphone csv file, parsing it only when there is no valid cache for it
+    :param file_path: The path of file to read
+    :param cache_dir: The directory for the cache file (next to the csv file if None)
+    :return: A list of GpsFix, equal to the one smartphone_gps_csv_reader.read returns
+    """
+    return bulk_gps_csv_reader.build_fixes(read_smartphone_columns(file_path, cache_dir))
+
+
+def read_smartphone_fix_array(file_path: str, cache_dir=None) -> FixArray:
+    """
+    Obtains the columnar trajectory of a smartphone csv file, parsing it only when there is no valid cache for it
+    :param file_path: The path of file to read
+    :param cache_dir: The directory for the cache file (next to the csv file if None)
+    :return: A FixArray with the fixes of the file
+    """
+    return FixArray(**read_smartphone_columns(file_path, cache_dir))
+
+
+def read_smartphone_columns(file_path: str, cache_dir=None) -> Dict[str, np.ndarray]:
+    """
+    Obtains the (memory mapped) columns of a smartphone csv file, parsing it only when there is no valid cache for it
+    :param file_path: The path of file to read
+    :param cache_dir: The directory for the cache file (next to the csv file if None)
+    :return: The columns of the file, keyed as FixArray.COLUMNS
+    """
+    return _load_or_parse(file_path, SMARTPHONE_FORMAT,
+                          lambda: bulk_gps_csv_reader.read_smartphone_columns(file_path), cache_dir)
+
+
+def get_cache_path(file_path: str, file_format: str, cache_dir=None) -> str:
+    """
+    Obtains the path of the cache file of a csv file. The name carries a digest of the format, and a digest of the
+    absolute path, the modification time and the size of the csv file, so any change of the csv file leads to a
+    different cache, and the caches of each format are told apart.
+    :param file_path: The path of the csv file
+    :param file_format: The format (and parsing options) of the csv file
+    :param cache_dir: The directory for the cache file (next to the csv file if None)
+    :return: The path of the cache file
+    """
+    absolute_path = os.path.abspath(file_path)
+    stat = os.stat(absolute_path)
+    key = '{}|{}|{}|{}|{}'.format(CACHE_VERSION, absolute_path, stat.st_mtime_ns, stat.st_size, file_format)
+    digest = hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+    return _cache_prefix(absolute_path, cache_dir) + _format_digest(file_format) + '.' + digest + CACHE_SUFFIX
+
+
+def clear_cache(file_path: str, cache_dir=None):
+    """
+    Removes every cache file of the specified csv file, whatever its format
+    :param file_path: The path of the csv file
+    :param cache_dir: The directory for the cache files (next to the csv file if None)
+    """
+    for cache_path in _find_cache_files(os.path.abspath(file_path), cache_dir):
+        _remove_quietly(cache_path)
+
+
+def _load_or_parse(file_path: str, file_format: str, parse: Callable[[], Dict[str, np.ndarray]],
+                   cache_dir) -> Dict[str, np.ndarray]:
+    """
+    Loads the columns from the cache file if it exists, otherwise parses the csv file and writes its cache.
+    Caches of previous versions of the csv file in the same format are removed. Failing to write the cache is not an error, the
+    parsed columns are returned anyway.
+    """
+    cache_path = get_cache_path(file_path, file_format, cache_dir)
+    if os.path.exists(cache_path):
+        try:
+            return _columns_from_matrix(np.load(cache_path, mmap_mode='r'))
+        except (OSError, ValueError):
+            _remove_quietly(cache_path)
+
+    columns = parse()
+    for stale_path in _find_cache_files(os.path.abspath(file_path), cache_dir, file_format):
+        _remove_quietly(stale_path)
+    try:
+        matrix = np.vstack([np.asarray(columns[c], dtype=np.float64) for c in FixArray.COLUMNS])
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        write_atomically(cache_path, lambda file: np.save(file, matrix))
+    except OSError:
+        pass
+
+    return columns
+
+
+def _columns_from_matrix(matrix: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Splits the cached matrix (one row per column) into the columns, every one of them is a view of the mapped file
+    """
+    if matrix.ndim != 2 or matrix.shape[0] != len(FixArray.COLUMNS):
+        raise ValueError('Unexpected shape of cache file ' + str(matrix.shape))
+    return {c: matrix[i] for i, c in enumerate(FixArray.COLUMNS)}
+
+
+def _cache_prefix(absolute_path: str, cache_dir) -> str:
+    """
+    Obtains the name shared by every cache file of a csv file. In a shared cache directory, the name also
+    identifies the directory of the csv file, so files with the same name never remove each other caches.
+    """
+    source_directory, file_name = os.path.split(absolute_path)
+    if cache_dir is None:
+        return os.path.join(source_directory, file_name + '.')
+    directory_digest = hashlib.sha1(source_directory.encode('utf-8')).hexdigest()[:8]
+    return os.path.join(os.path.abspath(cache_dir), file_name + '.' + directory_digest + '.')
+
+
+def _format_digest(file_format: str) -> str:
+    return hashlib.sha1(file_format.encode('utf-8')).hexdigest()[:8]
+
+
+def _find_cache_files(absolute_path: str, cache_dir, file_format=None) -> List[str]:
+    """
+    Finds the cache files of a csv file, only the ones of the specified format unless it is None
+    """
+    format_pattern = '[0-9a-f]' * 8 if file_format is None else _format_digest(file_format)
+    digest_pattern = '[0-9a-f]' * 16
+    return glob.glob(glob.escape(_cache_prefix(absolute_path, cache_dir)) + format_pattern + '.' + digest_pattern +
+                     CACHE_SUFFIX)
+
+
+def _remove_quietly(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
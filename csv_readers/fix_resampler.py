@@ -0,0 +1,93 @@
+from typing import Dict, Iterable
+
+import numpy as np
+
+from entities.FixArray import FixArray, epochs_to_microseconds
+
+
+def source_indices(timestamp: np.ndarray, targets: np.ndarray) -> np.ndarray:
+    """
+    Finds the fix LogicGpsReader delivers for each target time: the fix of that very time if there is one, otherwise
+    the previous fix (with the target time as its timestamp). Times are compared as whole microseconds, as the
+    datetimes the reader compares
+    :param timestamp: The timestamps of the fixes, as seconds since the epoch, in chronological order
+    :param targets: The target times, as seconds since the epoch
+    :return: The index of the fix of each target, -1 where the reader delivers none (before the first fix or after
+    the last one)
+    """
+    epochs = epochs_to_microseconds(timestamp)
+    targets = epochs_to_microseconds(targets)
+    if len(epochs) == 0:
+        return np.full(len(targets), -1, dtype=np.int64)
+
+    indices = np.searchsorted(epochs, targets, side='left')
+    exact = epochs[np.minimum(indices, len(epochs) - 1)] == targets
+    # Before the first fix the previous index is already -1
+    delivered = np.where(exact, indices, indices - 1)
+    delivered[indices == len(epochs)] = -1
+    return delivered
+
+
+def fixed_rate_targets(timestamp: np.ndarray, period, start=None) -> np.ndarray:
+    """
+    Builds the times a reader visits when it is read every period seconds: start, start + period... until the last
+    fix
+    :param timestamp: The timestamps of the fixes, as seconds since the epoch, in chronological order
+    :param period: The seconds between readings
+    :param start: The first time, as seconds since the epoch (the time of the first fix if None)
+    :return: The target times, as seconds since the epoch
+    """
+    if len(timestamp) == 0:
+        return np.empty(0, dtype=np.float64)
+
+    period = int(round(period * 1000000))
+    if period <= 0:
+        raise ValueError('The period must be positive')
+    epochs = epochs_to_microseconds(np.asarray(timestamp[[0, -1]], dtype=np.float64))
+    first = epochs[0] if start is None else epochs_to_microseconds(np.float64(start))
+    if first > epochs[-1]:
+        return np.empty(0, dtype=np.float64)
+
+    targets = first + np.arange((epochs[-1] - first) // period + 1, dtype=np.int64) * period
+    return targets / 1000000
+
+
+def resample_at(fixes: FixArray, targets) -> FixArray:
+    """
+    Obtains the fixes LogicGpsReader delivers at the target times, the spatial information of each one comes from
+    the fix of that time or the previous one (forward fill) and the timestamp is the target time
+    :param fixes: The trajectory, in chronological order
+    :param targets: The target times, as seconds since the epoch. Times without fix (before the first fix or after
+    the last one) are left out
+    :return: The resampled trajectory, a row per target time with fix
+    """
+    targets = np.asarray(targets, dtype=np.float64)
+    indices = source_indices(fixes.timestamp, targets)
+    delivered = indices >= 0
+    resampled = fixes[indices[delivered]]
+    resampled.timestamp = targets[delivered]
+    return resampled
+
+
+def resample(fixes: FixArray, period, start=None) -> FixArray:
+    """
+    Obtains the fixes of reading a LogicGpsReader with get_fix_in_n_seconds(0) and then get_fix_in_n_seconds(period)
+    until it delivers no more fixes, in one vectorized pass
+    :param fixes: The trajectory, in chronological order
+    :param period: The seconds between readings
+    :param start: The time of the first reading, as seconds since the epoch (the time of the first fix if None)
+    :return: The resampled trajectory
+    """
+    return resample_at(fixes, fixed_rate_targets(fixes.timestamp, period, start))
+
+
+def resample_many(fixes: FixArray, periods: Iterable, start=None) -> Dict[object, FixArray]:
+    """
+    Resamples a trajectory at several rates, see resample
+    :param fixes: The trajectory, in chronological order
+    :param periods: The seconds between readings of each rate
+    :param start: The time of the first reading, as seconds since the epoch (the time of the first fix if None)
+    :return: The resampled trajectory of each period, keyed by the period
+    """
+    return {period: resample(fixes, period, start) for period in periods}
+
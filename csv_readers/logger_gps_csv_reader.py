@@ -1,17 +1,24 @@
 import csv
 from datetime import datetime, timedelta
-from typing import List, Iterator, Dict
+from typing import List, Iterator, Dict, Tuple, Union
 
+from csv_readers import fix_cache
+from csv_readers.csv_file_edges import read_first_and_last_lines
+from entities.FixArray import FixArray
 from entities.GpsFix import GpsFix
 
 
-def read(file_path: str, date_format='%Y/%m/%d %H:%M:%S') -> List[GpsFix]:
+def read(file_path: str, date_format='%Y/%m/%d %H:%M:%S', use_cache=False) -> List[GpsFix]:
     """
     Returns a list of GpsFix read from the specified file path
     :param file_path: The path of file to read
     :param date_format: The date format to use
+    :param use_cache: Whether to load the fixes from (or save them into) a binary cache next to the file
     :return: A list of GpsFix
     """
+    if use_cache:
+        return fix_cache.read_logger_fixes(file_path, date_format)
+
     file = open(file_path, 'r', newline='', encoding='utf-8')
     results = []
     reader = csv.DictReader(file, delimiter=',')
@@ -23,19 +30,48 @@ def read(file_path: str, date_format='%Y/%m/%d %H:%M:%S') -> List[GpsFix]:
     return results
 
 
-def read_line_by_line(file_path: str) -> Iterator[GpsFix]:
+def read_line_by_line(file_path: str, date_format='%Y/%m/%d %H:%M:%S') -> Iterator[GpsFix]:
     """
     Reads a csv file of fixes line by line
     :param file_path:
+    :param date_format: The date format to use
     :return: A GpsFix object usable in for each call
     """
     file = open(file_path, 'r', newline='', encoding='utf-8')
     reader = csv.DictReader(file, delimiter=',')
     for line in reader:
-        current_fix = build_fix_from_line(line)
+        current_fix = build_fix_from_line(line, date_format)
         yield current_fix
 
 
+def read_fix_array(file_path: str, date_format='%Y/%m/%d %H:%M:%S', use_cache=False) -> FixArray:
+    """
+    Reads the specified file into a columnar trajectory, no list of GpsFix is kept while reading
+    :param file_path: The path of file to read
+    :param date_format: The date format to use
+    :param use_cache: Whether to map the columns from (or save them into) a binary cache next to the file
+    :return: A FixArray with the fixes of the file
+    """
+    if use_cache:
+        return fix_cache.read_logger_fix_array(file_path, date_format)
+
+    return FixArray.from_fixes(read_line_by_line(file_path, date_format))
+
+
+def read_first_and_last_fix(file_path: str, date_format='%Y/%m/%d %H:%M:%S') -> Tuple[Union[GpsFix, None],
+                                                                                        Union[GpsFix, None]]:
+    """
+    Reads the first and the last fixes of the file, seeking to its tail instead of reading it whole
+    :param file_path: The path of file to read
+    :param date_format: The date format to use
+    :return: The first and the last GpsFix of the file, (None, None) if the file has no fixes
+    """
+    first_line, last_line = read_first_and_last_lines(file_path)
+    if first_line is None:
+        return None, None
+    return build_fix_from_line(first_line, date_format), build_fix_from_line(last_line, date_format)
+
+
 def _is_summer_time(date: datetime):
     summer_time_start_month = 4  # april
     summer_time_start_day = 3  # april 3rd
@@ -1,16 +1,23 @@
 import csv
 from datetime import datetime
-from typing import List, Iterator, Dict
+from typing import List, Iterator, Dict, Tuple, Union
 
+from csv_readers import fix_cache
+from csv_readers.csv_file_edges import read_first_and_last_lines
+from entities.FixArray import FixArray
 from entities.GpsFix import GpsFix
 
 
-def read(file_path: str) -> List[GpsFix]:
+def read(file_path: str, use_cache=False) -> List[GpsFix]:
     """
     Returns a list of GpsFix read from the specified file path
     :param file_path: The path of file to read
+    :param use_cache: Whether to load the fixes from (or save them into) a binary cache next to the file
     :return: A list of GpsFix
     """
+    if use_cache:
+        return fix_cache.read_smartphone_fixes(file_path)
+
     file = open(file_path, 'r', newline='', encoding='utf-8')
     results = []
     reader = csv.DictReader(file, delimiter=',')
@@ -35,6 +42,31 @@ def read_line_by_line(file_path: str) -> Iterator[GpsFix]:
         yield current_fix
 
 
+def read_fix_array(file_path: str, use_cache=False) -> FixArray:
+    """
+    Reads the specified file into a columnar trajectory, no list of GpsFix is kept while reading
+    :param file_path: The path of file to read
+    :param use_cache: Whether to map the columns from (or save them into) a binary cache next to the file
+    :return: A FixArray with the fixes of the file
+    """
+    if use_cache:
+        return fix_cache.read_smartphone_fix_array(file_path)
+
+    return FixArray.from_fixes(read_line_by_line(file_path))
+
+
+def read_first_and_last_fix(file_path: str) -> Tuple[Union[GpsFix, None], Union[GpsFix, None]]:
+    """
+    Reads the first and the last fixes of the file, seeking to its tail instead of reading it whole
+    :param file_path: The path of file to read
+    :return: The first and the last GpsFix of the file, (None, None) if the file has no fixes
+    """
+    first_line, last_line = read_first_and_last_lines(file_path)
+    if first_line is None:
+        return None, None
+    return build_fix_from_line(first_line), build_fix_from_line(last_line)
+
+
 def build_fix_from_line(line: Dict) -> GpsFix:
     """
     Builds a GpsFix parsing the specified line
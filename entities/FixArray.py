@@ -0,0 +1,165 @@
+from array import array
+from datetime import datetime, timedelta
+from typing import Iterable, List, Union
+
+import numpy as np
+
+from entities.GpsFix import GpsFix
+
+EPOCH = datetime(1970, 1, 1)
+NO_ACTIVITY = -1
+
+
+def datetime_to_epoch(timestamp: datetime) -> float:
+    """
+    Converts a (naive) datetime into seconds since the epoch, without applying any time zone
+    :param timestamp: The datetime to convert
+    :return: The seconds elapsed since 1970-01-01 00:00:00
+    """
+    return (timestamp - EPOCH).total_seconds()
+
+
+def epoch_to_datetime(seconds: float) -> datetime:
+    """
+    Converts seconds since the epoch into a (naive) datetime, without applying any time zone
+    :param seconds: The seconds elapsed since 1970-01-01 00:00:00
+    :return: The equivalent datetime
+    """
+    return EPOCH + timedelta(seconds=float(seconds))
+
+
+def epochs_to_microseconds(seconds) -> np.ndarray:
+    """
+    Converts seconds since the epoch into whole microseconds, the resolution of datetime. A float64 epoch keeps the
+    microsecond it comes from, so rounding recovers it exactly and comparing or subtracting the results is the same
+    as doing it with the datetimes
+    :param seconds: The seconds elapsed since 1970-01-01 00:00:00 (a scalar or an array)
+    :return: An int64 array with the microseconds elapsed since 1970-01-01 00:00:00
+    """
+    return np.round(np.asarray(seconds, dtype=np.float64) * 1000000).astype(np.int64)
+
+
+class FixArray(object):
+    """
+    A columnar trajectory, it keeps each attribute of the fixes in a contiguous typed array.
+    GpsFix objects are only built when they are requested, and slicing shares the underlying arrays.
+
+    Attributes:
+        latitude: float64 array of latitudes
+        longitude: float64 array of longitudes
+        timestamp: float64 array of timestamps, as seconds since the epoch (naive, no time zone applied)
+        altitude: float64 array of altitudes
+        accuracy: float64 array of accuracies
+        speed: float64 array of speeds
+        battery_level: float64 array of battery levels
+        detected_activity: int16 array of detected activities, NO_ACTIVITY when unknown
+    """
+
+    COLUMNS = ('latitude', 'longitude', 'timestamp', 'altitude', 'accuracy', 'speed', 'battery_level',
+               'detected_activity')
+    DTYPES = {'latitude': np.float64, 'longitude': np.float64, 'timestamp': np.float64, 'altitude': np.float64,
+              'accuracy': np.float64, 'speed': np.float64, 'battery_level': np.float64,
+              'detected_activity': np.int16}
+    _TYPE_CODES = {np.float64: 'd', np.int16: 'h'}
+
+    def __init__(self, latitude, longitude, timestamp, altitude=None, accuracy=None, speed=None,
+                 battery_level=None, detected_activity=None):
+        """
+        Builds a FixArray from its columns, arrays already holding the right dtype are not copied
+        :param latitude: latitudes to assign
+        :param longitude: longitudes to assign
+        :param timestamp: timestamps to assign, as seconds since the epoch
+        :param altitude: altitudes to assign (zeros if None)
+        :param accuracy: accuracies to assign (zeros if None)
+        :param speed: speeds to assign (zeros if None)
+        :param battery_level: battery levels to assign (zeros if None)
+        :param detected_activity: detected activities to assign (NO_ACTIVITY if None)
+        """
+        self.latitude = np.asarray(latitude, dtype=np.float64)
+        size = len(self.latitude)
+        self.longitude = np.asarray(longitude, dtype=np.float64)
+        self.timestamp = np.asarray(timestamp, dtype=np.float64)
+        self.altitude = self._column_or_default(altitude, 'altitude', size, 0)
+        self.accuracy = self._column_or_default(accuracy, 'accuracy', size, 0)
+        self.speed = self._column_or_default(speed, 'speed', size, 0)
+        self.battery_level = self._column_or_default(battery_level, 'battery_level', size, 0)
+        self.detected_activity = self._column_or_default(detected_activity, 'detected_activity', size, NO_ACTIVITY)
+
+    @staticmethod
+    def _column_or_default(values, column, size, default) -> np.ndarray:
+        if values is None:
+            return np.full(size, default, dtype=FixArray.DTYPES[column])
+        return np.asarray(values, dtype=FixArray.DTYPES[column])
+
+    @staticmethod
+    def from_fixes(fixes: Iterable[GpsFix]) -> 'FixArray':
+        """
+        Builds a FixArray from GpsFix objects. Any iterable is accepted, so a reader generator can be consumed
+        without keeping its GpsFix objects alive.
+        :param fixes: The fixes to store
+        :return: A FixArray with the same content
+        """
+        columns = {c: array(FixArray._TYPE_CODES[FixArray.DTYPES[c]]) for c in FixArray.COLUMNS}
+        for fix in fixes:
+            columns['latitude'].append(fix.latitude)
+            columns['longitude'].append(fix.longitude)
+            columns['timestamp'].append(datetime_to_epoch(fix.timestamp))
+            columns['altitude'].append(fix.altitude)
+            columns['accuracy'].append(fix.accuracy)
+            columns['speed'].append(fix.speed)
+            columns['battery_level'].append(fix.battery_level)
+            columns['detected_activity'].append(
+                NO_ACTIVITY if fix.detected_activity is None else fix.detected_activity)
+
+        return FixArray(**{c: np.frombuffer(columns[c], dtype=FixArray.DTYPES[c]) for c in FixArray.COLUMNS})
+
+    def get_fix(self, index: int) -> GpsFix:
+        """
+        Builds a GpsFix view of the specified row
+        :param index: The row to read (negative values count from the end)
+        :return: A GpsFix with the values of that row
+        """
+        detected_activity = int(self.detected_activity[index])
+        return GpsFix(latitude=float(self.latitude[index]), longitude=float(self.longitude[index]),
+                      timestamp=epoch_to_datetime(self.timestamp[index]), altitude=float(self.altitude[index]),
+                      accuracy=float(self.accuracy[index]), speed=float(self.speed[index]),
+                      battery_level=float(self.battery_level[index]),
+                      detected_activity=None if detected_activity == NO_ACTIVITY else detected_activity)
+
+    def get_timestamp(self, index: int) -> datetime:
+        return epoch_to_datetime(self.timestamp[index])
+
+    def get_valid_mask(self) -> np.ndarray:
+        """
+        Obtains which rows would produce a valid GpsFix (see GpsFix.is_valid)
+        :return: A boolean array, True for valid rows
+        """
+        return ~((self.latitude == 0) & (self.longitude == 0) & (self.accuracy == 0) & (self.speed == 0) &
+                 (self.altitude == 0))
+
+    def to_fixes(self) -> List[GpsFix]:
+        return [self.get_fix(i) for i in range(0, len(self))]
+
+    def nbytes(self) -> int:
+        """
+        Obtains the memory held by the columns
+        :return: The amount of bytes of all of the columns
+        """
+        return sum(getattr(self, c).nbytes for c in FixArray.COLUMNS)
+
+    def __len__(self):
+        return len(self.latitude)
+
+    def __getitem__(self, item) -> Union[GpsFix, 'FixArray']:
+        """
+        An integer returns a GpsFix view. A slice returns a FixArray sharing the columns (zero-copy), while a
+        boolean mask or an index array returns a FixArray with copied columns.
+        """
+        if isinstance(item, (int, np.integer)):
+            return self.get_fix(item)
+
+        return FixArray(**{c: getattr(self, c)[item] for c in FixArray.COLUMNS})
+
+    def __iter__(self):
+        for i in range(0, len(self)):
+            yield self.get_fix(i)
@@ -1,6 +1,8 @@
 import math
 from datetime import timedelta
 
+from entities import geodesic
+
 
 class GpsFix(object):
     """
@@ -43,82 +45,25 @@ class GpsFix(object):
 
         self.battery_level = 0 if battery_level is None else battery_level
 
+    def with_timestamp(self, timestamp) -> 'GpsFix':
+        """
+        Builds a copy of the fix with another timestamp. The attributes of a fix are immutable values, so the copy
+        shares them instead of deep copying them
+        :param timestamp: The timestamp of the copy
+        :return: The new GpsFix
+        """
+        fix = GpsFix.__new__(GpsFix)
+        fix.__dict__.update(self.__dict__)
+        fix.timestamp = timestamp
+        return fix
+
     def distance_to(self, other_fix: 'GpsFix') -> float:
         """
         Calculates the distance to other GpsFix (ported from Android source code)
         :param other_fix: The fix to measure distance to
         :return: The distance to other fix, in meters
         """
-        max_iterations = 20
-
-        lat1 = self.latitude
-        lon1 = self.longitude
-        lat2 = other_fix.latitude
-        lon2 = other_fix.longitude
-
-        lat1 *= math.pi / 180.0
-        lat2 *= math.pi / 180.0
-        lon1 *= math.pi / 180.0
-        lon2 *= math.pi / 180.0
-
-        a_axis = 6378137.0  # WGS84 major axis double
-        b_axis = 6356752.3142  # WGS84 semi - major axis double
-        f = (a_axis - b_axis) / a_axis
-        a_sq_minus_bsq_over_bsq = (a_axis * a_axis - b_axis * b_axis) / (b_axis * b_axis)
-
-        l = lon2 - lon1
-        a_axis = 0.0
-        u1 = math.atan((1.0 - f) * math.tan(lat1))
-        u2 = math.atan((1.0 - f) * math.tan(lat2))
-
-        cos_u1 = math.cos(u1)
-        cos_u2 = math.cos(u2)
-        sin_u1 = math.sin(u1)
-        sin_u2 = math.sin(u2)
-        cos_u1_cos_u2 = cos_u1 * cos_u2
-        sin_u1_sin_u2 = sin_u1 * sin_u2
-
-        sigma = 0.0
-        delta_sigma = 0.0
-
-        lambda_var = l
-        for i in range(0, max_iterations):
-            lambda_orig = lambda_var
-            cos_lambda = math.cos(lambda_var)
-            sin_lambda = math.sin(lambda_var)
-
-            t1 = cos_u2 * sin_lambda
-            t2 = cos_u1 * sin_u2 - sin_u1 * cos_u2 * cos_lambda
-
-            sin_sq_sigma = t1 * t1 + t2 * t2
-            sin_sigma = math.sqrt(sin_sq_sigma)
-            cos_sigma = sin_u1_sin_u2 + cos_u1_cos_u2 * cos_lambda
-            sigma = math.atan2(sin_sigma, cos_sigma)
-            sin_alpha = 0.0 if sin_sigma == 0 else cos_u1_cos_u2 * sin_lambda / sin_sigma
-            cos_sq_alpha = 1.0 - sin_alpha * sin_alpha
-            cos_2_sm = 0.0 if cos_sq_alpha == 0 else cos_sigma - 2.0 * sin_u1_sin_u2 / cos_sq_alpha
-            u_squared = cos_sq_alpha * a_sq_minus_bsq_over_bsq
-
-            a_axis = 1 + (u_squared / 16384.0) * (
-                4096.0 + u_squared * (-768 + u_squared * (320.0 - 175.0 * u_squared)))
-            b = (u_squared / 1024.0) * (256.0 + u_squared * (-128.0 + u_squared * (74.0 - 47.0 * u_squared)))
-            c = (f / 16.0) * cos_sq_alpha * (4.0 + f * (4.0 - 3.0 * cos_sq_alpha))
-
-            cos2_s_m_sq = cos_2_sm * cos_2_sm
-            delta_sigma = b * sin_sigma * (cos_2_sm + (b / 4.0) * (
-                cos_sigma * (-1.0 + 2.0 * cos2_s_m_sq) - (b / 6.0) * cos_2_sm * (-3.0 + 4.0 * sin_sigma * sin_sigma) * (
-                    -3.0 + 4.0 * cos2_s_m_sq)))
-
-            lambda_var = l + (1.0 - c) * f * sin_alpha * (
-                sigma + c * sin_sigma * (cos_2_sm + c * cos_sigma * (-1.0 + 2.0 * cos_2_sm * cos_2_sm)))
-
-            delta = (lambda_var - lambda_orig) / lambda_var if lambda_var != 0 else 0.0
-
-            if math.fabs(delta) < 1.0e-12:
-                break
-
-        distance = b_axis * a_axis * (sigma - delta_sigma)
-        return distance
+        return geodesic.distance(self.latitude, self.longitude, other_fix.latitude, other_fix.longitude)
 
     def time_difference(self, other_fix: 'GpsFix'):
         """
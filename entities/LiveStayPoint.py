@@ -66,6 +66,21 @@ class LiveStayPoint(object):
     def create_from_list(gps_fixes: List[GpsFix]) -> 'LiveStayPoint':
         return LiveStayPoint.create_from_sublist(gps_fixes, 0, len(gps_fixes) - 1)
 
+    @staticmethod
+    def create_from_sums(sum_latitude: float, sum_longitude: float, amount_of_fixes: int, first_fix: GpsFix,
+                         last_fix: GpsFix) -> 'LiveStayPoint':
+        """
+        Creates a StayPoint from the sums of the coordinates of its fixes, instead of the fixes themselves
+        :param sum_latitude: The sum of the latitudes of the fixes
+        :param sum_longitude: The sum of the longitudes of the fixes
+        :param amount_of_fixes: The amount of fixes
+        :param first_fix: The first fix
+        :param last_fix: The last fix
+        :return: A LiveStayPoint object
+        """
+        return LiveStayPoint(sum_latitude / amount_of_fixes, sum_longitude / amount_of_fixes, first_fix.timestamp,
+                             last_fix.timestamp, 0, amount_of_fixes)
+
     def distance_to(self, other: 'LiveStayPoint'):
         """
         Calculates the distance to other LiveStayPoint object.
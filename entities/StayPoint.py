@@ -1,6 +1,4 @@
-from datetime import datetime
-
-from entities.GpsFix import GpsFix
+from entities import geodesic
 
 
 class StayPoint(object):
@@ -34,12 +32,7 @@ class StayPoint(object):
         :param other: The StayPoint object to find the distance to
         :return: The distance between the stay points, in meters
         """
-        self_as_fix = GpsFix(self.latitude, self.longitude, datetime.now(), altitude=0, speed=0, battery_level=0,
-                             detected_activity=0)
-        other_as_fix = GpsFix(other.latitude, other.longitude, datetime.now(), altitude=0, speed=0, battery_level=0,
-                              detected_activity=0)
-
-        return self_as_fix.distance_to(other_as_fix)
+        return geodesic.distance(self.latitude, self.longitude, other.latitude, other.longitude)
 
     def __eq__(self, other):
         """
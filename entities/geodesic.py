@@ -0,0 +1,190 @@
+import math
+
+import numpy as np
+
+MAX_ITERATIONS = 20
+CONVERGENCE_THRESHOLD = 1.0e-12
+
+A_AXIS = 6378137.0  # WGS84 major axis double
+B_AXIS = 6356752.3142  # WGS84 semi - major axis double
+FLATTENING = (A_AXIS - B_AXIS) / A_AXIS
+A_SQ_MINUS_B_SQ_OVER_B_SQ = (A_AXIS * A_AXIS - B_AXIS * B_AXIS) / (B_AXIS * B_AXIS)
+
+
+def distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """
+    Calculates the distance between two coordinates (ported from Android source code)
+    :param lat1: Latitude of first coordinate, in degrees
+    :param lon1: Longitude of first coordinate, in degrees
+    :param lat2: Latitude of second coordinate, in degrees
+    :param lon2: Longitude of second coordinate, in degrees
+    :return: The distance between the coordinates, in meters
+    """
+    lat1 *= math.pi / 180.0
+    lat2 *= math.pi / 180.0
+    lon1 *= math.pi / 180.0
+    lon2 *= math.pi / 180.0
+
+    f = FLATTENING
+    a_sq_minus_bsq_over_bsq = A_SQ_MINUS_B_SQ_OVER_B_SQ
+
+    l = lon2 - lon1
+    a_axis = 0.0
+    u1 = math.atan((1.0 - f) * math.tan(lat1))
+    u2 = math.atan((1.0 - f) * math.tan(lat2))
+
+    cos_u1 = math.cos(u1)
+    cos_u2 = math.cos(u2)
+    sin_u1 = math.sin(u1)
+    sin_u2 = math.sin(u2)
+    cos_u1_cos_u2 = cos_u1 * cos_u2
+    sin_u1_sin_u2 = sin_u1 * sin_u2
+
+    sigma = 0.0
+    delta_sigma = 0.0
+
+    lambda_var = l
+    for i in range(0, MAX_ITERATIONS):
+        lambda_orig = lambda_var
+        cos_lambda = math.cos(lambda_var)
+        sin_lambda = math.sin(lambda_var)
+
+        t1 = cos_u2 * sin_lambda
+        t2 = cos_u1 * sin_u2 - sin_u1 * cos_u2 * cos_lambda
+
+        sin_sq_sigma = t1 * t1 + t2 * t2
+        sin_sigma = math.sqrt(sin_sq_sigma)
+        cos_sigma = sin_u1_sin_u2 + cos_u1_cos_u2 * cos_lambda
+        sigma = math.atan2(sin_sigma, cos_sigma)
+        sin_alpha = 0.0 if sin_sigma == 0 else cos_u1_cos_u2 * sin_lambda / sin_sigma
+        cos_sq_alpha = 1.0 - sin_alpha * sin_alpha
+        cos_2_sm = 0.0 if cos_sq_alpha == 0 else cos_sigma - 2.0 * sin_u1_sin_u2 / cos_sq_alpha
+        u_squared = cos_sq_alpha * a_sq_minus_bsq_over_bsq
+
+        a_axis = 1 + (u_squared / 16384.0) * (
+            4096.0 + u_squared * (-768 + u_squared * (320.0 - 175.0 * u_squared)))
+        b = (u_squared / 1024.0) * (256.0 + u_squared * (-128.0 + u_squared * (74.0 - 47.0 * u_squared)))
+        c = (f / 16.0) * cos_sq_alpha * (4.0 + f * (4.0 - 3.0 * cos_sq_alpha))
+
+        cos2_s_m_sq = cos_2_sm * cos_2_sm
+        delta_sigma = b * sin_sigma * (cos_2_sm + (b / 4.0) * (
+            cos_sigma * (-1.0 + 2.0 * cos2_s_m_sq) - (b / 6.0) * cos_2_sm * (-3.0 + 4.0 * sin_sigma * sin_sigma) * (
+                -3.0 + 4.0 * cos2_s_m_sq)))
+
+        lambda_var = l + (1.0 - c) * f * sin_alpha * (
+            sigma + c * sin_sigma * (cos_2_sm + c * cos_sigma * (-1.0 + 2.0 * cos_2_sm * cos_2_sm)))
+
+        delta = (lambda_var - lambda_orig) / lambda_var if lambda_var != 0 else 0.0
+
+        if math.fabs(delta) < CONVERGENCE_THRESHOLD:
+            break
+
+    return B_AXIS * a_axis * (sigma - delta_sigma)
+
+
+def distances(lats1, lons1, lats2, lons2) -> np.ndarray:
+    """
+    Calculates element-wise distances between two sets of coordinates, the same way distance() does.
+    Inputs are broadcast against each other and every element iterates until it converges on its own.
+    :param lats1: Latitudes of first coordinates, in degrees
+    :param lons1: Longitudes of first coordinates, in degrees
+    :param lats2: Latitudes of second coordinates, in degrees
+    :param lons2: Longitudes of second coordinates, in degrees
+    :return: An array of distances, in meters
+    """
+    lat1, lon1, lat2, lon2 = np.broadcast_arrays(*[np.asarray(x, dtype=np.float64) for x in
+                                                   (lats1, lons1, lats2, lons2)])
+    shape = lat1.shape
+    lat1, lon1, lat2, lon2 = [np.radians(x).ravel() for x in (lat1, lon1, lat2, lon2)]
+
+    f = FLATTENING
+    l = lon2 - lon1
+    u1 = np.arctan((1.0 - f) * np.tan(lat1))
+    u2 = np.arctan((1.0 - f) * np.tan(lat2))
+    cos_u1 = np.cos(u1)
+    cos_u2 = np.cos(u2)
+    sin_u1 = np.sin(u1)
+    sin_u2 = np.sin(u2)
+    cos_u1_cos_u2 = cos_u1 * cos_u2
+    sin_u1_sin_u2 = sin_u1 * sin_u2
+
+    a_axis = np.zeros_like(l)
+    sigma = np.zeros_like(l)
+    delta_sigma = np.zeros_like(l)
+    lambda_var = l.copy()
+    active = np.arange(l.size)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for i in range(0, MAX_ITERATIONS):
+            if active.size == 0:
+                break
+
+            lambda_orig = lambda_var[active]
+            cu2 = cos_u2[active]
+            cu1 = cos_u1[active]
+            su1 = sin_u1[active]
+            su2 = sin_u2[active]
+            cu1cu2 = cos_u1_cos_u2[active]
+            su1su2 = sin_u1_sin_u2[active]
+            cos_lambda = np.cos(lambda_orig)
+            sin_lambda = np.sin(lambda_orig)
+
+            t1 = cu2 * sin_lambda
+            t2 = cu1 * su2 - su1 * cu2 * cos_lambda
+
+            sin_sq_sigma = t1 * t1 + t2 * t2
+            sin_sigma = np.sqrt(sin_sq_sigma)
+            cos_sigma = su1su2 + cu1cu2 * cos_lambda
+            active_sigma = np.arctan2(sin_sigma, cos_sigma)
+            sin_alpha = np.where(sin_sigma == 0, 0.0, cu1cu2 * sin_lambda / sin_sigma)
+            cos_sq_alpha = 1.0 - sin_alpha * sin_alpha
+            cos_2_sm = np.where(cos_sq_alpha == 0, 0.0, cos_sigma - 2.0 * su1su2 / cos_sq_alpha)
+            u_squared = cos_sq_alpha * A_SQ_MINUS_B_SQ_OVER_B_SQ
+
+            active_a_axis = 1 + (u_squared / 16384.0) * (
+                4096.0 + u_squared * (-768 + u_squared * (320.0 - 175.0 * u_squared)))
+            b = (u_squared / 1024.0) * (256.0 + u_squared * (-128.0 + u_squared * (74.0 - 47.0 * u_squared)))
+            c = (f / 16.0) * cos_sq_alpha * (4.0 + f * (4.0 - 3.0 * cos_sq_alpha))
+
+            cos2_s_m_sq = cos_2_sm * cos_2_sm
+            active_delta_sigma = b * sin_sigma * (cos_2_sm + (b / 4.0) * (
+                cos_sigma * (-1.0 + 2.0 * cos2_s_m_sq) - (b / 6.0) * cos_2_sm * (-3.0 + 4.0 * sin_sigma * sin_sigma) * (
+                    -3.0 + 4.0 * cos2_s_m_sq)))
+
+            new_lambda = l[active] + (1.0 - c) * f * sin_alpha * (
+                active_sigma + c * sin_sigma * (cos_2_sm + c * cos_sigma * (-1.0 + 2.0 * cos_2_sm * cos_2_sm)))
+
+            delta = np.where(new_lambda != 0, (new_lambda - lambda_orig) / new_lambda, 0.0)
+
+            a_axis[active] = active_a_axis
+            sigma[active] = active_sigma
+            delta_sigma[active] = active_delta_sigma
+            lambda_var[active] = new_lambda
+
+            active = active[np.abs(delta) >= CONVERGENCE_THRESHOLD]
+
+    return (B_AXIS * a_axis * (sigma - delta_sigma)).reshape(shape)
+
+
+def distances_to_point(latitude: float, longitude: float, lats, lons) -> np.ndarray:
+    """
+    Calculates the distances from one coordinate to many
+    :param latitude: Latitude of the reference coordinate, in degrees
+    :param longitude: Longitude of the reference coordinate, in degrees
+    :param lats: Latitudes of the other coordinates, in degrees
+    :param lons: Longitudes of the other coordinates, in degrees
+    :return: An array of distances, in meters, one per coordinate in lats/lons
+    """
+    return distances(latitude, longitude, lats, lons)
+
+
+def distances_along(lats, lons) -> np.ndarray:
+    """
+    Calculates the distances between consecutive coordinates of a sequence
+    :param lats: Latitudes of the sequence, in degrees
+    :param lons: Longitudes of the sequence, in degrees
+    :return: An array of len(lats) - 1 distances, in meters
+    """
+    lats = np.asarray(lats, dtype=np.float64)
+    lons = np.asarray(lons, dtype=np.float64)
+    return distances(lats[:-1], lons[:-1], lats[1:], lons[1:])
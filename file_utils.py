@@ -0,0 +1,23 @@
+import os
+import tempfile
+from typing import BinaryIO, Callable
+
+
+def write_atomically(file_path: str, write: Callable[[BinaryIO], None]):
+    """
+    Writes a file into a temporary file of the same directory and then moves it into place, so that readers never
+    load (or map) a partial file. The temporary file is removed if anything fails, and the error is raised again
+    :param file_path: The path of the file, its directory must exist
+    :param write: Writes the content into the (binary) file it receives
+    """
+    handle, temporary_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(file_path)), suffix='.tmp')
+    try:
+        with os.fdopen(handle, 'wb') as file:
+            write(file)
+        os.replace(temporary_path, file_path)
+    except BaseException:
+        try:
+            os.remove(temporary_path)
+        except OSError:
+            pass
+        raise
@@ -0,0 +1,402 @@
+from collections import deque
+from datetime import datetime, timedelta
+from typing import List, Iterator
+
+from entities.FixArray import FixArray
+from entities.GpsFix import GpsFix
+from entities.LiveStayPoint import LiveStayPoint
+from entities.StayPoint import StayPoint
+from entities.Visit import Visit
+from pac.PacEvent import PacEvent
+from pac.controller import pool_policies
+from pac.controller.SamplingCurveGenerator import SamplingCurveGenerator
+from pac.controller.SamplingCurveGenerator import SamplingCurveGenerator as Scg
+from pac.mobility_analyzer.GeoFencingOutcome import GeoFencingOutcome
+from pac.mobility_analyzer.GeoFencingOutcome import GeoFencingOutcome as Gfo
+from pac.mobility_analyzer.WindowedGeoFencing import WindowedGeoFencing
+from pac.persistence.StayPointsDal import StayPointsDal
+from pac.persistence.VisitsDal import VisitsDal
+from pac.stay_point_detectors.StreamedZhen import StreamedZhen
+
+
+class PacEngine(object):
+    """
+    The PAC engine: SPD, GF, PRM, CC (Sigmoid sampling and conservative sampling) over a source of fixes.
+    The source is any object with get_fix_in_n_seconds(n_seconds), which delivers the next fix to analyze (None once
+    they are over), and last_fix, the last fix of the trajectory (if known), such as LogicGpsReader,
+    LogicGpsReaderStreamed or IterableGpsReader.
+
+    The engine runs as a generator of PacEvent (run), or fix by fix (process_fix, then finish). What is kept of the
+    processed fixes depends on the retention policy:
+        RETAIN_ALL: every fix in fixes, and the fixes of each stay point in the calculated live stay points
+        RETAIN_RING: the latest ring_size fixes in fixes, and the calculated live stay points without their fixes
+        RETAIN_SUMMARIES: no fixes, the calculated live stay points without their fixes
+        RETAIN_NONE: no fixes and no calculated live stay points
+    Stay points and visits are always kept, so with a streamed source and RETAIN_NONE memory does not depend on the
+    length of the trajectory.
+
+    Attributes:
+        fixes_read: The amount of fixes read from the source
+        fixes: The fixes kept, according to the retention policy
+        next_sampling: The seconds to wait for the next fix, as decided after the latest processed fix
+    """
+
+    RETAIN_ALL = 'all'
+    RETAIN_RING = 'ring'
+    RETAIN_SUMMARIES = 'summaries'
+    RETAIN_NONE = 'none'
+
+    def __init__(self, spd_algorithm: StreamedZhen, gf: WindowedGeoFencing, fix_source,
+                 stay_points_dal_distance: float, adapt_sampling=True, base_sampling=30, late_departure_sampling=30,
+                 maximum_time_separations=None, sigmoid_segments=None, verbose=False, retention=RETAIN_ALL,
+                 ring_size=3600):
+        """
+        Basic constructor
+        :param spd_algorithm: The stay points detection algorithm, None for no detection
+        :param gf: The geo-fencing, None for no geo-fencing
+        :param fix_source: The source of fixes
+        :param stay_points_dal_distance: The distance for considering two stay points the same one
+        :param adapt_sampling: Whether to adapt the sampling to the mobility (sigmoid and conservative sampling)
+        :param base_sampling: The seconds between fixes when sampling is not adapted
+        :param late_departure_sampling: The seconds between fixes once the sigmoid is done
+        :param maximum_time_separations: The maximum separations of the sigmoid sampling
+        :param sigmoid_segments: The segments of the sigmoid sampling
+        :param verbose: Whether to print the details of the processing
+        :param retention: What is kept of the processed fixes, one of the RETAIN_ values
+        :param ring_size: The amount of latest fixes kept with RETAIN_RING
+        """
+        if retention not in (PacEngine.RETAIN_ALL, PacEngine.RETAIN_RING, PacEngine.RETAIN_SUMMARIES,
+                             PacEngine.RETAIN_NONE):
+            raise ValueError('Unknown retention policy {}'.format(retention))
+
+        self._file_enumerator = fix_source
+        self._spd_algorithm = spd_algorithm
+        self._geo_fencing = gf
+        self._verbose = verbose
+        self._adapt_sampling = adapt_sampling
+        self._base_sampling = base_sampling
+        self._stay_points_dal = StayPointsDal(stay_points_dal_distance)
+        self._visits_dal = VisitsDal()
+        self._mobility_status = {"mobility_mode": "trajectory"}
+        self._curve_generator = None  # type: SamplingCurveGenerator
+        self._late_departure_sampling = late_departure_sampling
+        self._maximum_time_separations = maximum_time_separations
+        self._sigmoid_segments = sigmoid_segments
+        self._retention = retention
+        self.fixes_read = 0
+        self.fixes = deque(maxlen=ring_size) if retention == PacEngine.RETAIN_RING else []  # type: List[GpsFix]
+        self.next_sampling = 0
+        self._pre_loaded = False
+        self._minor_allowed_sampling = 30
+        self._live_stay_points = []
+        self._events = []  # type: List[PacEvent]
+        self._current_fix = None  # type: GpsFix
+
+    def start_main_loop(self):
+        """
+        Processes every fix of the source
+        """
+        for _ in self.run():
+            pass
+
+    def run(self) -> Iterator[PacEvent]:
+        """
+        Processes every fix of the source, as a generator
+        :return: The events found, as they are found
+        """
+        self.next_sampling = 0
+        fix = self._file_enumerator.get_fix_in_n_seconds(self.next_sampling)
+        self.fixes_read = 1
+        time_percentage = 0
+        start_timestamp = None if fix is None else fix.timestamp
+        last_fix = self._file_enumerator.last_fix
+        total_time = 0 if fix is None or last_fix is None else (last_fix.timestamp - start_timestamp).total_seconds()
+        while fix is not None:
+            if total_time > 0:
+                new_time_percentage = int((fix.timestamp - start_timestamp).total_seconds() * 100 / total_time)
+                if new_time_percentage != time_percentage:
+                    time_percentage = new_time_percentage
+                    self._print_progress(time_percentage)
+
+            yield from self.process_fix(fix)
+            fix = self._file_enumerator.get_fix_in_n_seconds(self.next_sampling)
+
+        yield from self.finish()
+
+    def process_fix(self, fix: GpsFix) -> List[PacEvent]:
+        """
+        Processes a single fix, then next_sampling holds the seconds to wait for the next one
+        :param fix: The fix to process
+        :return: The events found with the fix
+        """
+        self._current_fix = fix
+        self._count_fix(fix)
+        if self._accept_fix(fix):
+            self._retain_fix(fix)
+
+        if self._spd_algorithm is not None:
+            self._evaluate_fix_in_spd(fix)
+
+        if self._curve_generator is not None and self._curve_generator.is_done is False and self._verbose:
+            print('Sigmoid reading {}, after {} seconds'.format(fix, self.next_sampling))
+
+        outcome = None
+        if self._geo_fencing is not None:
+            outcome = self._evaluate_fix_in_gf(fix)
+
+        if self._adapt_sampling:
+            self.next_sampling = self._calculate_next_scheduling(outcome)
+        else:
+            self.next_sampling = self._base_sampling
+
+        return self._pop_events()
+
+    def finish(self) -> List[PacEvent]:
+        """
+        Processes the last part of the trajectory, once there are no more fixes
+        :return: The events found in the last part
+        """
+        self._current_fix = None
+        self._process_last_part()
+        return self._pop_events()
+
+    def _count_fix(self, fix: GpsFix):
+        """
+        Counts a fix in fixes_read
+        """
+        self.fixes_read += 1
+
+    def _accept_fix(self, fix: GpsFix) -> bool:
+        """
+        Decides whether a fix is kept in fixes (the fix could also be marked as invalid here)
+        """
+        return True
+
+    def _print_progress(self, time_percentage: int):
+        print('{}%'.format(time_percentage))
+
+    def _retain_fix(self, fix: GpsFix):
+        if self._retention == PacEngine.RETAIN_ALL or self._retention == PacEngine.RETAIN_RING:
+            self.fixes.append(fix)
+
+    def _pop_events(self) -> List[PacEvent]:
+        events = self._events
+        self._events = []
+        return events
+
+    def _append_stay_point_to_memory(self, live_stay_point: LiveStayPoint, list_of_fixes: List[GpsFix]) -> StayPoint:
+        if self._retention == PacEngine.RETAIN_ALL:
+            self._live_stay_points.append((live_stay_point, list_of_fixes))
+        elif self._retention != PacEngine.RETAIN_NONE:
+            self._live_stay_points.append((live_stay_point, None))
+        stay_point_to_add = StayPoint(0, live_stay_point.latitude, live_stay_point.longitude,
+                                      live_stay_point.amount_of_fixes)
+        stay_point_added = self._stay_points_dal.add(stay_point_to_add)
+
+        if stay_point_added is None and self._verbose:
+            print('Stay point {} already exists'.format(live_stay_point))
+        elif stay_point_added is not None and self._verbose:
+            print('Stay point {} is added'.format(live_stay_point))
+
+        return stay_point_added
+
+    def _insert_visit_from_new_stay_point(self, stay_point_id, live_stay_point: LiveStayPoint) -> Visit:
+        self.is_last_visit_because_new_stay_point = True
+        fake_arrival_fix = GpsFix(live_stay_point.latitude, live_stay_point.longitude, live_stay_point.arrival_time)
+        fake_departure_fix = GpsFix(live_stay_point.latitude, live_stay_point.longitude, live_stay_point.departure_time)
+
+        visit = Visit(0, stay_point_id,
+                      pivot_arrival_fix=fake_arrival_fix,
+                      pivot_departure_fix=fake_departure_fix,
+                      detection_arrival_fix=fake_arrival_fix,
+                      detection_departure_fix=fake_departure_fix)
+        added_visit = self._visits_dal.add(visit)
+        return added_visit
+
+    @staticmethod
+    def _live_stay_point_could_be_added(stay_point: StayPoint) -> bool:
+        return stay_point is not None
+
+    def _process_last_part(self):
+        if self._spd_algorithm is not None:
+            live_stay_point, list_of_fixes = self._spd_algorithm.analyze_last_part()
+            self.detect_sp_and_try_to_append_visit(live_stay_point, list_of_fixes)
+
+        if self._geo_fencing is not None:
+            last_visit = self.get_obtained_visits()[-1]
+            if last_visit is not None and last_visit.pivot_arrival_fix.timestamp == last_visit.pivot_departure_fix.timestamp:
+                last_fix = self._file_enumerator.last_fix
+                self._visits_dal.update_last(last_fix, last_fix)
+
+                if self._retention in (PacEngine.RETAIN_ALL, PacEngine.RETAIN_RING) and last_fix != self.fixes[-1]:
+                    self.fixes.append(last_fix)
+
+    def detect_sp_and_try_to_append_visit(self, live_stay_point, list_of_fixes):
+        if live_stay_point is not None:
+            stay_point = self._append_stay_point_to_memory(live_stay_point, list_of_fixes)
+            if self._live_stay_point_could_be_added(stay_point):
+                if self._verbose:
+                    print()
+                    print('Stay point added, now storing visit')
+                visit = self._insert_visit_from_new_stay_point(stay_point.id_stay_point, live_stay_point)
+                self._events.append(PacEvent(PacEvent.TYPE_STAY_POINT_DETECTED, self._current_fix,
+                                             stay_point=stay_point, visit=visit))
+                if self._geo_fencing is not None:
+                    self._notify_geo_fencing(stay_point)
+
+    def _evaluate_fix_in_spd(self, fix):
+        if fix.is_valid:
+            live_stay_point, list_of_fixes = self._spd_algorithm.analyze_location(fix)
+            self.detect_sp_and_try_to_append_visit(live_stay_point, list_of_fixes)
+        else:
+            if self._verbose:
+                print('Invalid fix received, continuing to next one')
+
+    def _evaluate_fix_in_gf(self, fix):
+        outcome = None
+
+        if fix.is_valid:
+            outcome = self._geo_fencing.analyze_location(fix)
+            if outcome is not None:
+                if outcome.event_type == GeoFencingOutcome.TYPE_ARRIVING_STAY_POINT:
+                    if self._verbose:
+                        print()
+                    self._append_visit_to_memory(outcome)
+
+                    self._mobility_status["mobility_mode"] = 'stay_point'
+
+                    if self._adapt_sampling:
+                        self._mobility_status["is_sigmoid_done"] = False
+                        oracle_visit = self.get_visit_smartly(outcome)
+                        self._mobility_status["curve_offset"] = 0
+                        self.generate_sigmoid(oracle_visit, outcome.detection_fix.timestamp)
+
+                elif outcome.event_type == GeoFencingOutcome.TYPE_LEAVING_STAY_POINT:
+                    self._mark_end_of_visit(outcome)
+                    self._mobility_status["mobility_mode"] = 'trajectory'
+                    if self._adapt_sampling:
+                        self._curve_generator = None
+                        self._mobility_status["curve_offset"] = 0
+
+                elif outcome.event_type == GeoFencingOutcome.TYPE_LEAVING_AND_ARRIVING:
+                    self._mark_end_of_visit(outcome)
+                    self._append_visit_to_memory(outcome)
+                    # Hard to happen but shruggie
+                    if self._adapt_sampling:
+                        self._mobility_status["is_sigmoid_done"] = False
+                        oracle_visit = self.get_visit_smartly(outcome)
+                        self._mobility_status["curve_offset"] = 0
+                        self.generate_sigmoid(oracle_visit, outcome.detection_fix.timestamp)
+                elif outcome.event_type == GeoFencingOutcome.TYPE_NO_CHANGE:
+                    pass
+                else:
+                    raise RuntimeError('That is not the type of outcome you are looking for')
+
+                if outcome.event_type != GeoFencingOutcome.TYPE_NO_CHANGE:
+                    self._events.append(PacEvent(PacEvent.TYPE_MOBILITY_CHANGE, fix, outcome=outcome))
+
+                if self._verbose and outcome.event_type is not outcome.TYPE_NO_CHANGE:
+                    print(outcome)
+        else:
+            if self._verbose:
+                print('Invalid fix received')
+        return outcome
+
+    def _append_visit_to_memory(self, outcome):
+        id_stay_point = 0
+        if outcome.event_type == GeoFencingOutcome.TYPE_ARRIVING_STAY_POINT:
+            id_stay_point = outcome.stay_point.id_stay_point
+        elif outcome.event_type == GeoFencingOutcome.TYPE_LEAVING_AND_ARRIVING:
+            id_stay_point = outcome.stay_point_2.id_stay_point
+
+        visit = Visit(0, id_stay_point,
+                      pivot_arrival_fix=outcome.event_fix,
+                      pivot_departure_fix=outcome.event_fix,
+                      detection_arrival_fix=outcome.detection_fix,
+                      detection_departure_fix=outcome.detection_fix)
+        self._visits_dal.add(visit)
+
+    def _mark_end_of_visit(self, outcome: Gfo):
+        last_visit_position = self._visits_dal.get_last_visit_position(outcome.stay_point.id_stay_point)
+        if last_visit_position is None:
+            raise ValueError('No visit found for the outcome\'s stay point given')
+        self._visits_dal.update_visit(last_visit_position, outcome.event_fix, outcome.detection_fix)
+
+    def get_obtained_stay_points(self) -> List[StayPoint]:
+        return self._stay_points_dal.get_all()
+
+    def get_obtained_visits(self):
+        return self._visits_dal.get_all()
+
+    def get_fixes_as_array(self) -> FixArray:
+        return FixArray.from_fixes(self.fixes)
+
+    def _notify_geo_fencing(self, stay_point):
+        self._geo_fencing.introduce_new_stay_point(stay_point)
+
+    def _calculate_next_scheduling(self, outcome):
+        if outcome is None:
+            return self._base_sampling
+
+        if self._mobility_status["mobility_mode"] == 'stay_point':
+            if self._curve_generator.is_done:
+                if self._verbose and not self._sigmoid_done_message_has_been_shown:
+                    print('Sigmoid is done')
+                    self._sigmoid_done_message_has_been_shown = True
+
+                return self._late_departure_sampling
+            else:
+                next_curve_value = int(self._curve_generator.get_next_schedule())
+                if self._mobility_status["curve_offset"] == 0:
+                    self._mobility_status["curve_offset"] = next_curve_value
+                    return next_curve_value
+                else:
+                    next_schedule = next_curve_value - self._mobility_status["curve_offset"]
+                    if self._watchdog_barks_at_next_schedule(next_schedule):
+                        next_curve_value = self._mobility_status["curve_offset"] + self._minor_allowed_sampling
+                        next_schedule = 30
+
+                    self._mobility_status["curve_offset"] = next_curve_value
+                    return next_schedule
+        elif self._mobility_status["mobility_mode"] == 'trajectory':
+            return self._base_sampling
+        else:
+            raise NotImplementedError(
+                'Outcome is not none and the mobility mode is not recognized' + self._mobility_status["mobility_mode"])
+
+    def generate_sigmoid(self, oracle_visit: Visit, now_time: datetime):
+        oracle_visit_length = (
+        oracle_visit.pivot_departure_fix.timestamp - oracle_visit.pivot_arrival_fix.timestamp).total_seconds()
+        self._curve_generator = Scg(now_time, now_time + timedelta(seconds=oracle_visit_length), total_schedules=-1,
+                                    curve_type=pool_policies.TYPE_SIGMOID_SLICED,
+                                    **{"alpha": 1,
+                                       "maximum_time_separations": self._maximum_time_separations,
+                                       "sigmoid_segments": self._sigmoid_segments})
+        self._sigmoid_done_message_has_been_shown = False
+        if self._verbose:
+            print('Generating sigmoid from {} to {}, {} seconds, {} max time sep (secs)'
+                  .format(now_time,
+                          now_time + timedelta(seconds=oracle_visit_length),
+                          oracle_visit_length,
+                          self._maximum_time_separations))
+
+    def get_visit_smartly(self, outcome):
+        first_visit = self._visits_dal.get_first_visit(outcome.stay_point.id_stay_point)
+        if first_visit is None:
+            raise NotImplementedError('I could not find a visit for that stay point')
+        return first_visit
+
+    def preload_stay_points(self, live_sps):
+        self._pre_loaded = True
+        for lsp in live_sps:
+            new_sp = self._append_stay_point_to_memory(lsp, None)
+            self._insert_visit_from_new_stay_point(new_sp.id_stay_point, lsp)
+            self._notify_geo_fencing(new_sp)
+
+    def _watchdog_barks_at_next_schedule(self, value):
+        if value < self._minor_allowed_sampling:
+            return True
+        return False
+
+    def get_calculated_live_stay_points(self):
+        return self._live_stay_points
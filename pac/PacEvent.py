@@ -0,0 +1,42 @@
+from entities.GpsFix import GpsFix
+from entities.StayPoint import StayPoint
+from entities.Visit import Visit
+from pac.mobility_analyzer.GeoFencingOutcome import GeoFencingOutcome
+
+
+class PacEvent(object):
+    """
+    Represents something the PAC found while processing a fix: a new stay point (detected by SPD, along with its
+    visit) or a mobility change (reported by geo-fencing)
+
+    Attributes:
+        event_type: The type of the event, TYPE_STAY_POINT_DETECTED or TYPE_MOBILITY_CHANGE
+        fix: The fix being processed when the event happened (None at the end of the trajectory)
+        stay_point: The new stay point, for TYPE_STAY_POINT_DETECTED
+        visit: The visit stored for the new stay point, for TYPE_STAY_POINT_DETECTED
+        outcome: The geo-fencing outcome, for TYPE_MOBILITY_CHANGE
+    """
+
+    TYPE_STAY_POINT_DETECTED = 0
+    TYPE_MOBILITY_CHANGE = 1
+
+    def __init__(self, event_type: int, fix: GpsFix, stay_point: StayPoint = None, visit: Visit = None,
+                 outcome: GeoFencingOutcome = None):
+        """
+        Basic constructor
+        :param event_type: The type of the event
+        :param fix: The fix being processed when the event happened
+        :param stay_point: The new stay point (if apply)
+        :param visit: The visit of the new stay point (if apply)
+        :param outcome: The geo-fencing outcome (if apply)
+        """
+        self.event_type = event_type
+        self.fix = fix
+        self.stay_point = stay_point
+        self.visit = visit
+        self.outcome = outcome
+
+    def __str__(self):
+        if self.event_type == PacEvent.TYPE_STAY_POINT_DETECTED:
+            return 'Stay point detected: {}'.format(self.stay_point)
+        return 'Mobility change: {}'.format(self.outcome)
@@ -0,0 +1,228 @@
+import contextlib
+import hashlib
+import os
+from time import perf_counter
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+
+from csv_readers import bulk_gps_csv_reader, fix_resampler
+from csv_readers.LogicGpsReader import LogicGpsReader
+from csv_readers.LogicGpsReaderSparse import LogicGpsReaderSparse
+from entities.FixArray import FixArray
+from entities.GpsFix import GpsFix
+from entities.LiveStayPoint import LiveStayPoint
+from entities.StayPoint import StayPoint
+from pac import batch_runner
+from pac.SmartPac import SmartPac
+from pac.SmartPacSparseInput import SmartPacSparseInput
+from pac.mobility_analyzer.WindowedGeoFencing import WindowedGeoFencing
+from pac.persistence.StageCache import StageCache
+from pac.persistence.StayPointsDal import StayPointsDal
+from pac.stay_point_detectors.OfflineZhen import OfflineZhen
+
+STAGE_FIXES = 'fixes'
+STAGE_SPD = 'spd'
+STAGE_STAY_POINTS = 'stay_points'
+STAGE_PAC = 'pac'
+
+DEFAULT_CONFIGURATION = {
+    "input_format": batch_runner.LOGGER_FORMAT,
+    "spd_time": 45 * 60,
+    "spd_distance": 500,
+    "spd_sampling": 1,
+    "stay_points_dal_distance": None,  # The spd_distance when None
+    "gf_radio_distance": 250,
+    "gf_window_size": 3,
+    "adapt_sampling": False,
+    "base_sampling": 1,
+    "late_departure_sampling": 30,
+    "maximum_time_separations": None,
+    "sigmoid_segments": None,
+}
+
+
+class SweepEngine(object):
+    """
+    Runs parameter sweeps of the PAC over input files, reusing the outputs of the stages every configuration that
+    shares them. The stages are:
+        fixes: the parsed input file, depends on the content of the file
+        spd: the stay points Zhen detects over the fixes (read every spd_sampling seconds), with OfflineZhen
+        stay_points: the set of stay points preloaded into the PAC, the ones a StayPointsDal accepts
+        pac: the PAC (geo-fencing and sampling control) over the fixes, with the stay points preloaded
+    Each output is keyed by the keys of the outputs it depends on plus its own parameters, so changing a parameter
+    only runs the stages downstream of it. Outputs are kept in a StageCache (memory and disk, LRU).
+
+    As the stay points are detected offline and preloaded, instead of being detected live as SmartPac.start_main_loop
+    does, the stay points and visits found differ from the ones of a batch_runner job with the same configuration.
+    The outcomes are marked with "preloaded_stay_points", so both kinds are not mixed.
+
+    Attributes:
+        stage_cache: The cache of the outputs of the stages
+    """
+
+    def __init__(self, cache_dir=None, memory_entries=16, disk_entries=256):
+        """
+        Basic constructor
+        :param cache_dir: The directory for the outputs of the stages, None keeps them only in memory
+        :param memory_entries: The maximum amount of outputs kept in memory
+        :param disk_entries: The maximum amount of outputs kept on disk
+        """
+        self.stage_cache = StageCache(cache_dir, memory_entries, disk_entries)
+        self._content_digests = {}  # type: Dict[Tuple[str, int, int], str]
+        self._fixes_key = None
+        self._fixes = None  # type: List[GpsFix]
+
+    def run(self, input_file: str, configuration: Dict) -> Dict:
+        """
+        Runs the PAC over an input file, reusing every stage output already computed
+        :param input_file: The path of the input file
+        :param configuration: The parameters, the missing ones are taken from DEFAULT_CONFIGURATION
+        :return: The outcome of the PAC, in the form of batch_runner outcomes ("job_id" is the key of the pac stage)
+        plus "preloaded_stay_points" (true). Its stay points and visits are not the ones batch_runner finds, as the
+        stay points are preloaded instead of detected live
+        """
+        unknown_keys = set(configuration) - set(DEFAULT_CONFIGURATION)
+        if len(unknown_keys) > 0:
+            raise ValueError('Unknown configuration keys: {}'.format(', '.join(sorted(unknown_keys))))
+        configuration = dict(DEFAULT_CONFIGURATION, **configuration)
+        if configuration["stay_points_dal_distance"] is None:
+            configuration["stay_points_dal_distance"] = configuration["spd_distance"]
+        if configuration["adapt_sampling"] and configuration["late_departure_sampling"] <= 0:
+            # The PAC would ask the reader for the fixes 0 or less seconds later, which never ends
+            raise ValueError('The late departure sampling must be positive when adapting the sampling')
+
+        stage_cache = self.stage_cache
+        fixes_dependencies = self._get_fixes_dependencies(input_file, configuration["input_format"])
+        fixes_key = stage_cache.get_key(STAGE_FIXES, fixes_dependencies)
+        spd_dependencies = {"fixes": fixes_key, "spd_time": configuration["spd_time"],
+                            "spd_distance": configuration["spd_distance"],
+                            "spd_sampling": configuration["spd_sampling"]}
+        stay_points_dependencies = {"spd": stage_cache.get_key(STAGE_SPD, spd_dependencies),
+                                    "stay_points_dal_distance": configuration["stay_points_dal_distance"]}
+        pac_dependencies = {key: configuration[key] for key in
+                            ("input_format", "stay_points_dal_distance", "gf_radio_distance", "gf_window_size",
+                             "adapt_sampling", "base_sampling", "late_departure_sampling",
+                             "maximum_time_separations", "sigmoid_segments")}
+        pac_dependencies.update({"fixes": fixes_key,
+                                 "stay_points": stage_cache.get_key(STAGE_STAY_POINTS, stay_points_dependencies)})
+        job = {"job_id": stage_cache.get_key(STAGE_PAC, pac_dependencies), "input_file": os.path.abspath(input_file)}
+
+        # Upstream outputs are only obtained when a stage actually needs to be computed
+        def get_fixes():
+            return self._get_fixes(fixes_key, lambda: stage_cache.get_or_compute(
+                STAGE_FIXES, fixes_dependencies, lambda: self._parse(input_file, configuration["input_format"])))
+
+        def get_live_stay_points():
+            return stage_cache.get_or_compute(STAGE_SPD, spd_dependencies,
+                                              lambda: self._detect_stay_points(get_fixes(), configuration))
+
+        def get_stay_points():
+            return stage_cache.get_or_compute(STAGE_STAY_POINTS, stay_points_dependencies,
+                                              lambda: self._select_stay_points(get_live_stay_points(), configuration))
+
+        return stage_cache.get_or_compute(STAGE_PAC, pac_dependencies,
+                                          lambda: self._run_pac(job, get_fixes(), get_stay_points(), configuration))
+
+    def run_sweep(self, input_file: str, configurations: List[Dict]) -> List[Dict]:
+        """
+        Runs the PAC over an input file with each configuration
+        :param input_file: The path of the input file
+        :param configurations: The configurations, see run
+        :return: The outcome of each configuration, in the same order
+        """
+        return [self.run(input_file, configuration) for configuration in configurations]
+
+    def _get_fixes_dependencies(self, input_file: str, input_format: str) -> Dict:
+        """
+        Obtains what the parsed fixes depend on: the digest of the content of the file and its format. The digest of
+        a file is computed again only when its modification time or size changed
+        """
+        if input_format not in (batch_runner.LOGGER_FORMAT, batch_runner.SMARTPHONE_FORMAT):
+            raise ValueError('Unknown input format {}'.format(input_format))
+
+        absolute_path = os.path.abspath(input_file)
+        stat = os.stat(absolute_path)
+        file_id = (absolute_path, stat.st_mtime_ns, stat.st_size)
+        if file_id not in self._content_digests:
+            digest = hashlib.sha1()
+            with open(absolute_path, 'rb') as file:
+                for block in iter(lambda: file.read(1 << 20), b''):
+                    digest.update(block)
+            self._content_digests[file_id] = digest.hexdigest()
+
+        return {"content": self._content_digests[file_id], "input_format": input_format}
+
+    @staticmethod
+    def _parse(input_file: str, input_format: str) -> Dict[str, np.ndarray]:
+        if input_format == batch_runner.SMARTPHONE_FORMAT:
+            return bulk_gps_csv_reader.read_smartphone_columns(input_file)
+        return bulk_gps_csv_reader.read_logger_columns(input_file)
+
+    def _get_fixes(self, fixes_key: str, get_columns: Callable[[], Dict[str, np.ndarray]]) -> List[GpsFix]:
+        """
+        Builds the fixes of parsed columns, the ones of the latest columns are kept
+        """
+        if self._fixes_key != fixes_key:
+            self._fixes = bulk_gps_csv_reader.build_fixes(get_columns())
+            self._fixes_key = fixes_key
+
+        return self._fixes
+
+    @staticmethod
+    def _detect_stay_points(fixes: List[GpsFix], configuration: Dict) -> List[LiveStayPoint]:
+        """
+        Detects the stay points over the valid fixes read every spd_sampling seconds, as SmartPac does
+        """
+        spd_algorithm = OfflineZhen(configuration["spd_time"], configuration["spd_distance"])
+        if configuration["input_format"] != batch_runner.SMARTPHONE_FORMAT:
+            sampled = fix_resampler.resample(FixArray.from_fixes(fixes), configuration["spd_sampling"])
+            return spd_algorithm.analyze_fix_array(sampled[sampled.get_valid_mask()])
+
+        reader = LogicGpsReaderSparse.from_fixes(fixes)
+        fixes = []
+        fix = reader.get_fix_in_n_seconds(0)
+        while fix is not None:
+            if fix.is_valid:
+                fixes.append(fix)
+            fix = reader.get_fix_in_n_seconds(configuration["spd_sampling"])
+
+        return spd_algorithm.analyze_fix_array(FixArray.from_fixes(fixes))
+
+    @staticmethod
+    def _select_stay_points(live_stay_points: List[LiveStayPoint], configuration: Dict) -> List[LiveStayPoint]:
+        """
+        Keeps the detected stay points a StayPointsDal accepts, so all of them can be preloaded
+        """
+        stay_points_dal = StayPointsDal(configuration["stay_points_dal_distance"])
+        return [live_stay_point for live_stay_point in live_stay_points
+                if stay_points_dal.add(StayPoint(0, live_stay_point.latitude, live_stay_point.longitude,
+                                                 live_stay_point.amount_of_fixes)) is not None]
+
+    @staticmethod
+    def _run_pac(job: Dict, fixes: List[GpsFix], stay_points: List[LiveStayPoint], configuration: Dict) -> Dict:
+        """
+        Runs the PAC, without stay points detection, with the stay points preloaded
+        """
+        start = perf_counter()
+        if configuration["input_format"] == batch_runner.SMARTPHONE_FORMAT:
+            reader, pac_class = LogicGpsReaderSparse.from_fixes(fixes), SmartPacSparseInput
+        else:
+            reader, pac_class = LogicGpsReader.from_fixes(fixes), SmartPac
+        read_seconds = perf_counter() - start
+
+        pac = pac_class(None, WindowedGeoFencing(configuration["gf_radio_distance"], configuration["gf_window_size"]),
+                        reader, configuration["stay_points_dal_distance"],
+                        adapt_sampling=configuration["adapt_sampling"],
+                        base_sampling=configuration["base_sampling"],
+                        late_departure_sampling=configuration["late_departure_sampling"],
+                        maximum_time_separations=configuration["maximum_time_separations"],
+                        sigmoid_segments=configuration["sigmoid_segments"],
+                        verbose=False)
+        pac.preload_stay_points(stay_points)
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            pac.start_main_loop()
+
+        outcome = batch_runner.outcome_of(job, pac, read_seconds, perf_counter() - start - read_seconds)
+        outcome["preloaded_stay_points"] = True
+        return outcome
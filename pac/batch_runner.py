@@ -0,0 +1,267 @@
+# This module runs many SmartPac jobs (an input file and a PAC configuration each) across a pool of processes.
+# Each job runs independently in a worker, its outcome is appended to a JSON lines file as soon as it finishes, so a
+# batch that is interrupted can be resumed, skipping the jobs that already finished.
+#
+# A manifest is a JSON file holding either a list of jobs, or an object with the list of "jobs" and the "defaults"
+# that apply to every job, for instance:
+#
+#     {"defaults": {"spd_time": 2700, "spd_distance": 500, "gf_radio_distance": 250, "gf_window_size": 3},
+#      "jobs": [{"job_id": "user-1-w3", "input_file": "user-1.csv"},
+#               {"job_id": "user-1-w5", "input_file": "user-1.csv", "gf_window_size": 5}]}
+#
+# Relative input files are resolved against the directory of the manifest. The keys of a job are the ones of
+# DEFAULT_CONFIGURATION plus "job_id" and "input_file", when "job_id" is missing it is derived from the job content.
+import argparse
+import contextlib
+import hashlib
+import json
+import os
+import signal
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from time import perf_counter
+from typing import Dict, List, Iterable
+
+from csv_readers.LogicGpsReader import LogicGpsReader
+from csv_readers.LogicGpsReaderSparse import LogicGpsReaderSparse
+from pac.SmartPac import SmartPac
+from pac.SmartPacSparseInput import SmartPacSparseInput
+from pac.mobility_analyzer.WindowedGeoFencing import WindowedGeoFencing
+from pac.stay_point_detectors.StreamedZhen import StreamedZhen
+
+LOGGER_FORMAT = 'logger'
+SMARTPHONE_FORMAT = 'smartphone'
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+DEFAULT_CONFIGURATION = {
+    "input_format": LOGGER_FORMAT,
+    "use_cache": False,
+    "spd_time": 45 * 60,
+    "spd_distance": 500,
+    "gf_radio_distance": 250,
+    "gf_window_size": 3,
+    "stay_points_dal_distance": None,  # The spd_distance when None
+    "adapt_sampling": False,
+    "base_sampling": 1,
+    "late_departure_sampling": 30,
+    "maximum_time_separations": None,
+    "sigmoid_segments": None,
+}
+
+
+def load_manifest(manifest_path: str) -> List[Dict]:
+    """
+    Reads the jobs of a manifest file, with the defaults applied and the input files resolved
+    :param manifest_path: The path of the manifest (JSON) file
+    :return: The list of jobs, each one with all of the keys of DEFAULT_CONFIGURATION, "job_id" and "input_file"
+    """
+    with open(manifest_path, encoding='utf-8') as file:
+        manifest = json.load(file)
+
+    if isinstance(manifest, list):
+        manifest = {"jobs": manifest}
+
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+    jobs = []
+    for job in manifest.get("jobs", []):
+        job = dict(manifest.get("defaults", {}), **job)
+        job["input_file"] = os.path.join(base_dir, job["input_file"])
+        jobs.append(complete_job(job))
+
+    job_ids = [job["job_id"] for job in jobs]
+    if len(set(job_ids)) != len(job_ids):
+        raise ValueError('The job ids of the manifest {} are not unique'.format(manifest_path))
+
+    return jobs
+
+
+def complete_job(job: Dict) -> Dict:
+    """
+    Fills the missing configuration of a job with DEFAULT_CONFIGURATION, and its job id if it is missing
+    :param job: The job, it must hold at least the "input_file"
+    :return: A new job with every key
+    """
+    unknown_keys = set(job) - set(DEFAULT_CONFIGURATION) - {"job_id", "input_file"}
+    if len(unknown_keys) > 0:
+        raise ValueError('Unknown job keys: {}'.format(', '.join(sorted(unknown_keys))))
+    if job.get("input_format", LOGGER_FORMAT) not in (LOGGER_FORMAT, SMARTPHONE_FORMAT):
+        raise ValueError('Unknown input format {}'.format(job["input_format"]))
+
+    completed_job = dict(DEFAULT_CONFIGURATION, **job)
+    if completed_job["adapt_sampling"] and completed_job["late_departure_sampling"] <= 0:
+        # The PAC would ask the reader for the fixes 0 or less seconds later, which never ends
+        raise ValueError('The late departure sampling must be positive when adapting the sampling')
+    if completed_job.get("job_id") is None:
+        content = json.dumps({key: value for key, value in completed_job.items() if key != "job_id"}, sort_keys=True)
+        completed_job["job_id"] = hashlib.sha1(content.encode('utf-8')).hexdigest()[:16]
+
+    return completed_job
+
+
+def run_job(job: Dict) -> Dict:
+    """
+    Runs the PAC of a single job, the progress printed by the PAC is discarded
+    :param job: The job to run, as complete_job returns it
+    :return: The serializable outcome of the job, see outcome_of
+    """
+    start = perf_counter()
+    if job["input_format"] == SMARTPHONE_FORMAT:
+        reader, pac_class = LogicGpsReaderSparse(job["input_file"], use_cache=job["use_cache"]), SmartPacSparseInput
+    else:
+        reader, pac_class = LogicGpsReader(job["input_file"], use_cache=job["use_cache"]), SmartPac
+    read_seconds = perf_counter() - start
+
+    stay_points_dal_distance = job["stay_points_dal_distance"]
+    if stay_points_dal_distance is None:
+        stay_points_dal_distance = job["spd_distance"]
+
+    pac = pac_class(StreamedZhen(job["spd_time"], job["spd_distance"]),
+                    WindowedGeoFencing(job["gf_radio_distance"], job["gf_window_size"]),
+                    reader, stay_points_dal_distance,
+                    adapt_sampling=job["adapt_sampling"],
+                    base_sampling=job["base_sampling"],
+                    late_departure_sampling=job["late_departure_sampling"],
+                    maximum_time_separations=job["maximum_time_separations"],
+                    sigmoid_segments=job["sigmoid_segments"],
+                    verbose=False)
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        pac.start_main_loop()
+
+    return outcome_of(job, pac, read_seconds, perf_counter() - start - read_seconds)
+
+
+def outcome_of(job: Dict, pac: SmartPac, read_seconds: float, pac_seconds: float) -> Dict:
+    """
+    Builds the compact, serializable outcome of a finished job. Stay points are lists of
+    [id_stay_point, latitude, longitude, visit_count] and visits are lists of [id_visit, id_stay_point,
+    pivot arrival time, pivot departure time, detection arrival time, detection departure time, stay time]
+    :param job: The job
+    :param pac: The PAC that ran the job
+    :param read_seconds: The seconds spent reading the input file
+    :param pac_seconds: The seconds spent by the PAC main loop
+    :return: The outcome, as a dictionary of JSON types
+    """
+    return {
+        "job_id": job["job_id"],
+        "input_file": job["input_file"],
+        "fixes_read": pac.fixes_read,
+        "read_seconds": round(read_seconds, 3),
+        "pac_seconds": round(pac_seconds, 3),
+        "stay_points": [[sp.id_stay_point, sp.latitude, sp.longitude, sp.visit_count]
+                        for sp in pac.get_obtained_stay_points()],
+        "visits": [[v.id_visit, v.id_stay_point,
+                    v.pivot_arrival_fix.timestamp.strftime(DATE_FORMAT),
+                    v.pivot_departure_fix.timestamp.strftime(DATE_FORMAT),
+                    v.detection_arrival_fix.timestamp.strftime(DATE_FORMAT),
+                    v.detection_departure_fix.timestamp.strftime(DATE_FORMAT),
+                    v.stay_time] for v in pac.get_obtained_visits()],
+    }
+
+
+def load_outcomes(output_path: str) -> Dict[str, Dict]:
+    """
+    Reads the outcomes of the jobs that finished in a (maybe interrupted) batch. The last line is ignored when it was
+    not completely written, and failed jobs are not considered finished
+    :param output_path: The path of the JSON lines file of the batch
+    :return: The outcomes of the finished jobs, keyed by job id
+    """
+    outcomes = {}
+    if not os.path.exists(output_path):
+        return outcomes
+
+    with open(output_path, encoding='utf-8') as file:
+        for line in file:
+            try:
+                outcome = json.loads(line)
+            except ValueError:
+                continue
+            if "error" not in outcome:
+                outcomes[outcome["job_id"]] = outcome
+
+    return outcomes
+
+
+def run_batch(jobs: Iterable[Dict], output_path: str, workers=None, verbose=False, job_timeout=None) -> List[Dict]:
+    """
+    Runs the jobs that are not finished in the output file yet, appending their outcomes to it as they finish.
+    A job that fails is recorded with its "error" and retried by the next run of the batch
+    :param jobs: The jobs to run, as complete_job returns them
+    :param output_path: The path of the JSON lines file of the batch
+    :param workers: The amount of processes to employ (the amount of cpus when None), 1 runs in current process
+    :param verbose: Whether to print each finished job
+    :param job_timeout: The seconds a job may run before it is recorded as failed, no limit when None (the limit is
+    enforced with SIGALRM, so it is ignored where the signal is not available)
+    :return: The outcomes of every job (including the ones finished in previous runs), in the order of jobs
+    """
+    jobs = list(jobs)
+    outcomes = load_outcomes(output_path)
+    pending_jobs = [job for job in jobs if job["job_id"] not in outcomes]
+
+    with open(output_path, 'a', encoding='utf-8') as output:
+        _drop_partial_line(output_path, output)
+        for outcome in _run_jobs(pending_jobs, workers, job_timeout):
+            output.write(json.dumps(outcome) + '\n')
+            output.flush()
+            os.fsync(output.fileno())
+            if "error" not in outcome:
+                outcomes[outcome["job_id"]] = outcome
+            if verbose:
+                print('{} {}'.format(outcome["job_id"], outcome.get("error", 'done')))
+
+    return [outcomes.get(job["job_id"]) for job in jobs]
+
+
+def _run_jobs(jobs: List[Dict], workers, job_timeout):
+    if workers == 1:
+        for job in jobs:
+            yield _run_job_safely(job, job_timeout)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_run_job_safely, job, job_timeout) for job in jobs]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def _run_job_safely(job: Dict, job_timeout=None) -> Dict:
+    use_alarm = job_timeout is not None and hasattr(signal, 'SIGALRM')
+    if use_alarm:
+        previous_handler = signal.signal(signal.SIGALRM, _raise_job_timeout)
+        signal.setitimer(signal.ITIMER_REAL, job_timeout)
+    try:
+        return run_job(job)
+    except Exception as e:
+        return {"job_id": job["job_id"], "input_file": job["input_file"], "error": '{}: {}'.format(type(e).__name__, e)}
+    finally:
+        if use_alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous_handler)
+
+
+def _raise_job_timeout(signum, frame):
+    raise TimeoutError('The job did not finish in time')
+
+
+def _drop_partial_line(output_path: str, output):
+    """
+    Ends the last line of the output file if an interrupted batch left it incomplete, so it is not joined to the
+    next outcome
+    """
+    if output.tell() > 0:
+        with open(output_path, 'rb') as file:
+            file.seek(-1, os.SEEK_END)
+            if file.read(1) != b'\n':
+                output.write('\n')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Runs the SmartPac jobs of a manifest across a pool of processes')
+    parser.add_argument('manifest', help='The manifest (JSON) file with the jobs')
+    parser.add_argument('output', help='The JSON lines file for the outcomes, an existing one is resumed')
+    parser.add_argument('--workers', type=int, default=None, help='The amount of processes, the cpus by default')
+    parser.add_argument('--timeout', type=float, default=None, help='The seconds each job may run, no limit by default')
+    args = parser.parse_args()
+
+    batch_outcomes = run_batch(load_manifest(args.manifest), args.output, workers=args.workers, verbose=True,
+                               job_timeout=args.timeout)
+    sys.exit(0 if all(outcome is not None for outcome in batch_outcomes) else 1)
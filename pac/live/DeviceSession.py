@@ -0,0 +1,88 @@
+import pickle
+from typing import Dict, List
+
+from entities.GpsFix import GpsFix
+from file_utils import write_atomically
+from pac.PacEngine import PacEngine
+from pac.PacEvent import PacEvent
+from pac.mobility_analyzer.WindowedGeoFencing import WindowedGeoFencing
+from pac.stay_point_detectors.StreamedZhen import StreamedZhen
+
+
+class DeviceSession(object):
+    """
+    The PAC state of a single live device: its StreamedZhen, WindowedGeoFencing, stay points and visits, kept in a
+    PacEngine that processes the fixes of the device as they arrive. No fixes are retained, not even by StreamedZhen
+    during a stay, so the state of a device only grows with its stay points and visits. Sessions are pickled as they
+    are, which is how idle devices are evicted from memory.
+
+    Attributes:
+        device_id: The id of the device
+        engine: The PAC engine of the device
+        fixes_processed: The amount of fixes processed
+        last_timestamp: The timestamp of the latest processed fix
+    """
+
+    def __init__(self, device_id: str, configuration: Dict):
+        """
+        Basic constructor
+        :param device_id: The id of the device
+        :param configuration: The PAC configuration, with the keys of LiveIngestionService.DEFAULT_CONFIGURATION
+        """
+        stay_points_dal_distance = configuration["stay_points_dal_distance"]
+        if stay_points_dal_distance is None:
+            stay_points_dal_distance = configuration["spd_distance"]
+
+        self.device_id = device_id
+        self.engine = PacEngine(StreamedZhen(configuration["spd_time"], configuration["spd_distance"],
+                                             keep_fixes=False),
+                                WindowedGeoFencing(configuration["gf_radio_distance"],
+                                                   configuration["gf_window_size"]),
+                                None, stay_points_dal_distance,
+                                adapt_sampling=configuration["adapt_sampling"],
+                                base_sampling=configuration["base_sampling"],
+                                late_departure_sampling=configuration["late_departure_sampling"],
+                                maximum_time_separations=configuration["maximum_time_separations"],
+                                sigmoid_segments=configuration["sigmoid_segments"],
+                                retention=PacEngine.RETAIN_NONE)
+        self.fixes_processed = 0
+        self.last_timestamp = None
+
+    def process_fix(self, fix: GpsFix) -> List[PacEvent]:
+        """
+        Processes a fix of the device, then next_sampling holds the seconds to wait for the next one. Fixes that are
+        not newer than the latest processed fix are ignored, as the PAC only moves forward in time
+        :param fix: The fix to process
+        :return: The events found with the fix
+        """
+        if self.last_timestamp is not None and fix.timestamp <= self.last_timestamp:
+            return []
+
+        events = self.engine.process_fix(fix)
+        self.fixes_processed += 1
+        self.last_timestamp = fix.timestamp
+        return events
+
+    @property
+    def next_sampling(self) -> int:
+        """
+        The seconds the device should wait before sending the next fix
+        """
+        return self.engine.next_sampling
+
+    def save(self, file_path: str):
+        """
+        Pickles the session into a temporary file and then moves it into place, so a partial file is never loaded
+        :param file_path: The path of the file
+        """
+        write_atomically(file_path, lambda file: pickle.dump(self, file, protocol=pickle.HIGHEST_PROTOCOL))
+
+    @staticmethod
+    def load(file_path: str) -> 'DeviceSession':
+        """
+        Unpickles a session saved with save
+        :param file_path: The path of the file
+        :return: The session
+        """
+        with open(file_path, 'rb') as file:
+            return pickle.load(file)
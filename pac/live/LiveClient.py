@@ -0,0 +1,90 @@
+import asyncio
+from typing import Dict, Tuple
+
+from entities.GpsFix import GpsFix
+from pac.live import wire_format
+
+
+class LiveClient(object):
+    """
+    A connection to a LiveIngestionService, for sending the fixes of one or many devices and waiting for the reply
+    of each of them. Fixes are numbered, so replies are matched to their fix whatever the order they arrive in.
+
+    Attributes:
+        replies_received: The amount of replies received
+    """
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """
+        Basic constructor, see connect_tcp and connect_unix
+        :param reader: The reader of the connection
+        :param writer: The writer of the connection
+        """
+        self.replies_received = 0
+        self._reader = reader
+        self._writer = writer
+        self._next_seq = 0
+        self._waiting = {}  # type: Dict[Tuple[str, int], asyncio.Future]
+        self._dispatcher = asyncio.ensure_future(self._dispatch_replies())
+
+    @staticmethod
+    async def connect_tcp(host='127.0.0.1', port=7878) -> 'LiveClient':
+        """
+        Connects to a service listening on TCP
+        :param host: The host of the service
+        :param port: The port of the service
+        :return: The client
+        """
+        reader, writer = await asyncio.open_connection(host, port)
+        return LiveClient(reader, writer)
+
+    @staticmethod
+    async def connect_unix(path: str) -> 'LiveClient':
+        """
+        Connects to a service listening on a Unix socket
+        :param path: The path of the socket
+        :return: The client
+        """
+        reader, writer = await asyncio.open_unix_connection(path)
+        return LiveClient(reader, writer)
+
+    async def send_fix(self, device_id: str, fix: GpsFix) -> Dict:
+        """
+        Sends a fix of a device and waits for its reply
+        :param device_id: The id of the device
+        :param fix: The fix
+        :return: The reply, with the "next_sampling" and the "events" found, or the "error" found
+        """
+        seq = self._next_seq
+        self._next_seq += 1
+        reply = asyncio.get_running_loop().create_future()
+        self._waiting[(device_id, seq)] = reply
+        self._writer.write(wire_format.encode_fix(device_id, fix, seq))
+        await self._writer.drain()
+        return await reply
+
+    async def close(self):
+        """
+        Closes the connection, the fixes waiting for their reply get a ConnectionError
+        """
+        self._writer.close()
+        await asyncio.gather(self._dispatcher, return_exceptions=True)
+        await self._writer.wait_closed()
+
+    async def _dispatch_replies(self):
+        try:
+            while True:
+                line = await self._reader.readline()
+                if len(line) == 0:
+                    break
+                reply = wire_format.decode_reply(line)
+                waiting = self._waiting.pop((reply.get("device"), reply.get("seq")), None)
+                if waiting is not None:
+                    self.replies_received += 1
+                    waiting.set_result(reply)
+        except ConnectionError:
+            pass
+        finally:
+            for waiting in self._waiting.values():
+                waiting.set_exception(ConnectionError('The connection to the service is closed'))
+            self._waiting.clear()
@@ -0,0 +1,264 @@
+import asyncio
+import hashlib
+import os
+from time import monotonic
+from typing import Dict, List, Set
+
+from pac.live import wire_format
+from pac.live.DeviceSession import DeviceSession
+
+DEFAULT_CONFIGURATION = {
+    "spd_time": 45 * 60,
+    "spd_distance": 500,
+    "stay_points_dal_distance": None,  # The spd_distance when None
+    "gf_radio_distance": 250,
+    "gf_window_size": 3,
+    "adapt_sampling": True,
+    "base_sampling": 30,
+    "late_departure_sampling": 30,
+    "maximum_time_separations": [300],
+    "sigmoid_segments": [[-5, 0], [0, 5]],
+}
+
+SESSION_SUFFIX = '.session.pickle'
+
+
+class LiveIngestionService(object):
+    """
+    Runs the PAC over the fixes of many live devices, received as newline-delimited JSON over TCP or Unix sockets
+    (see wire_format). Each device has its own DeviceSession, the fixes of a device are processed in order by its own
+    task, and each fix is answered, through the connection it came from, with the seconds the device should wait for
+    the next fix and the events found (geo-fencing outcomes and new stay points).
+
+    Fixes wait for their device in a queue of queue_size fixes, once it is full the connection stops being read until
+    there is room again, so a device sending faster than it is processed slows down its own connection instead of
+    growing the memory of the service. A connection is not read either while the replies written to it are waiting to
+    be sent, so a device that does not read its replies stops being read too.
+
+    With a state_dir, the sessions of devices that send nothing for idle_seconds are pickled there and dropped from
+    memory, and loaded again with the next fix of the device. Closing the service also saves every session, so the
+    service can be restarted without losing them.
+
+    Attributes:
+        configuration: The PAC configuration of every device, with the keys of DEFAULT_CONFIGURATION
+        state_dir: The directory for the sessions of idle devices, None keeps every session in memory
+        queue_size: The maximum amount of fixes waiting per device
+        idle_seconds: The seconds without fixes after which a device is evicted to state_dir
+        fixes_processed: The amount of fixes processed, for every device
+        evictions: The amount of sessions evicted to state_dir
+        restorations: The amount of sessions loaded from state_dir
+    """
+
+    def __init__(self, configuration: Dict = None, state_dir=None, queue_size=64, idle_seconds=300):
+        """
+        Basic constructor
+        :param configuration: The PAC configuration, missing keys take the value of DEFAULT_CONFIGURATION
+        :param state_dir: The directory for the sessions of idle devices, None keeps every session in memory
+        :param queue_size: The maximum amount of fixes waiting per device
+        :param idle_seconds: The seconds without fixes after which a device is evicted to state_dir
+        """
+        configuration = {} if configuration is None else configuration
+        unknown_keys = set(configuration) - set(DEFAULT_CONFIGURATION)
+        if len(unknown_keys) > 0:
+            raise ValueError('Unknown configuration keys: {}'.format(', '.join(sorted(unknown_keys))))
+
+        self.configuration = dict(DEFAULT_CONFIGURATION, **configuration)
+        self.state_dir = state_dir
+        self.queue_size = queue_size
+        self.idle_seconds = idle_seconds
+        self.fixes_processed = 0
+        self.evictions = 0
+        self.restorations = 0
+        self._sessions = {}  # type: Dict[str, DeviceSession]
+        self._queues = {}  # type: Dict[str, asyncio.Queue]
+        self._workers = {}  # type: Dict[str, asyncio.Task]
+        self._last_activity = {}  # type: Dict[str, float]
+        self._servers = []  # type: List[asyncio.AbstractServer]
+        self._connections = set()  # type: Set[asyncio.Task]
+        self._pending_replies = {}  # type: Dict[asyncio.StreamWriter, List]
+        self._eviction_task = None  # type: asyncio.Task
+
+        if state_dir is not None:
+            os.makedirs(state_dir, exist_ok=True)
+
+    @property
+    def devices_in_memory(self) -> int:
+        """
+        The amount of device sessions currently in memory
+        """
+        return len(self._sessions)
+
+    async def start_tcp(self, host='127.0.0.1', port=0) -> int:
+        """
+        Starts accepting devices on a TCP socket
+        :param host: The host to listen on
+        :param port: The port to listen on, 0 for any free port
+        :return: The port listened on
+        """
+        server = await asyncio.start_server(self._handle_connection, host, port)
+        self._start(server)
+        return server.sockets[0].getsockname()[1]
+
+    async def start_unix(self, path: str):
+        """
+        Starts accepting devices on a Unix socket
+        :param path: The path of the socket
+        """
+        server = await asyncio.start_unix_server(self._handle_connection, path)
+        self._start(server)
+
+    async def close(self):
+        """
+        Stops accepting devices, closes the connections and, with a state_dir, saves every session
+        """
+        for server in self._servers:
+            server.close()
+        for connection in list(self._connections):
+            connection.cancel()
+        await asyncio.gather(*self._connections, return_exceptions=True)
+        if self._eviction_task is not None:
+            self._eviction_task.cancel()
+            await asyncio.gather(self._eviction_task, return_exceptions=True)
+
+        workers = list(self._workers.values())
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        for server in self._servers:
+            await server.wait_closed()
+        self._servers = []
+
+        if self.state_dir is not None:
+            for device_id in list(self._sessions):
+                self._evict(device_id)
+
+    def _start(self, server):
+        self._servers.append(server)
+        if self.state_dir is not None and self._eviction_task is None:
+            self._eviction_task = asyncio.ensure_future(self._evict_idle_devices())
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """
+        Reads the fixes of a connection into the queues of their devices. The connection is only read while the
+        replies written to it are being sent, so the replies waiting are bounded by the fixes waiting. Once the
+        device closes its side, the connection stays open until every pending fix is answered
+        """
+        self._connections.add(asyncio.current_task())
+        self._pending_replies[writer] = [0, None]
+        try:
+            while True:
+                await writer.drain()
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    writer.write(wire_format.encode_error(None, None, 'The line is too long'))
+                    break
+                if len(line) == 0:
+                    break
+                if len(line.strip()) == 0:
+                    continue
+
+                try:
+                    message = wire_format.decode_message(line)
+                except ValueError as e:
+                    writer.write(wire_format.encode_error(None, None, str(e)))
+                    continue
+                try:
+                    device_id, seq, fix = wire_format.fix_from_message(message)
+                except ValueError as e:
+                    writer.write(wire_format.encode_error(message.get("device"), message.get("seq"), str(e)))
+                    continue
+
+                self._pending_replies[writer][0] += 1
+                await self._get_queue(device_id).put((seq, fix, writer))
+
+            if self._pending_replies[writer][0] > 0:
+                self._pending_replies[writer][1] = asyncio.get_running_loop().create_future()
+                await self._pending_replies[writer][1]
+            await writer.drain()
+        except ConnectionError:
+            pass  # The device is gone, the replies of its pending fixes are dropped
+        finally:
+            del self._pending_replies[writer]
+            writer.close()
+            self._connections.discard(asyncio.current_task())
+
+    def _get_queue(self, device_id: str) -> asyncio.Queue:
+        self._last_activity[device_id] = monotonic()
+        queue = self._queues.get(device_id)
+        if queue is None:
+            queue = asyncio.Queue(self.queue_size)
+            self._queues[device_id] = queue
+            self._workers[device_id] = asyncio.ensure_future(self._process_device(device_id, queue))
+        return queue
+
+    async def _process_device(self, device_id: str, queue: asyncio.Queue):
+        """
+        Processes the fixes of a device, one after the other. The session of the device is only loaded once a fix is
+        taken and processing a fix never awaits, so a worker can always be cancelled between fixes without losing any
+        state
+        """
+        while True:
+            seq, fix, writer = await queue.get()
+            try:
+                session = self._get_session(device_id)
+                events = session.process_fix(fix)
+                self.fixes_processed += 1
+                reply = wire_format.encode_reply(device_id, seq, session.next_sampling, events)
+            except Exception as e:
+                reply = wire_format.encode_error(device_id, seq, 'The fix could not be processed: {}'.format(e))
+
+            self._last_activity[device_id] = monotonic()
+            queue.task_done()
+            pending_replies = self._pending_replies.get(writer)
+            if pending_replies is None:
+                continue  # The connection is over, the reply is dropped
+
+            if not writer.is_closing():
+                writer.write(reply)
+            pending_replies[0] -= 1
+            if pending_replies[0] == 0 and pending_replies[1] is not None and not pending_replies[1].done():
+                pending_replies[1].set_result(None)
+
+    def _get_session(self, device_id: str) -> DeviceSession:
+        session = self._sessions.get(device_id)
+        if session is not None:
+            return session
+
+        if self.state_dir is not None:
+            path = self._get_path(device_id)
+            if os.path.exists(path):
+                session = DeviceSession.load(path)
+                os.remove(path)
+                self.restorations += 1
+        if session is None:
+            session = DeviceSession(device_id, self.configuration)
+
+        self._sessions[device_id] = session
+        return session
+
+    async def _evict_idle_devices(self):
+        while True:
+            await asyncio.sleep(max(self.idle_seconds / 4, 0.01))
+            limit = monotonic() - self.idle_seconds
+            for device_id, last_activity in list(self._last_activity.items()):
+                if last_activity > limit:
+                    continue
+                queue = self._queues.get(device_id)
+                if queue is not None and not queue.empty():
+                    continue
+
+                if queue is not None:
+                    self._workers.pop(device_id).cancel()
+                    del self._queues[device_id]
+                del self._last_activity[device_id]
+                if device_id in self._sessions:
+                    self._evict(device_id)
+
+    def _evict(self, device_id: str):
+        self._sessions.pop(device_id).save(self._get_path(device_id))
+        self.evictions += 1
+
+    def _get_path(self, device_id: str) -> str:
+        file_name = hashlib.sha1(device_id.encode('utf-8')).hexdigest() + SESSION_SUFFIX
+        return os.path.join(self.state_dir, file_name)
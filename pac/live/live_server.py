@@ -0,0 +1,55 @@
+# This module runs a LiveIngestionService until it is interrupted, listening on TCP or on a Unix socket. Devices
+# send one JSON fix per line and get the reply of each fix (see wire_format), replay_client is a local client that
+# replays a logger file as a device would.
+import argparse
+import asyncio
+import json
+
+from pac.live.LiveIngestionService import LiveIngestionService
+
+
+async def serve(service: LiveIngestionService, host='127.0.0.1', port=7878, unix_path=None):
+    """
+    Runs the service until the task is cancelled, then closes it
+    :param service: The service to run
+    :param host: The host to listen on, for TCP
+    :param port: The port to listen on, for TCP
+    :param unix_path: The path of the Unix socket to listen on, instead of TCP
+    """
+    if unix_path is not None:
+        await service.start_unix(unix_path)
+        print('Listening on {}'.format(unix_path))
+    else:
+        port = await service.start_tcp(host, port)
+        print('Listening on {}:{}'.format(host, port))
+
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await service.close()
+        print('{} fixes processed, {} sessions evicted, {} restored'
+              .format(service.fixes_processed, service.evictions, service.restorations))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Runs the PAC over the fixes of live devices')
+    parser.add_argument('--host', default='127.0.0.1', help='The host to listen on')
+    parser.add_argument('--port', type=int, default=7878, help='The TCP port to listen on')
+    parser.add_argument('--unix', default=None, help='The path of a Unix socket to listen on, instead of TCP')
+    parser.add_argument('--configuration', default=None, help='A JSON file with the PAC configuration')
+    parser.add_argument('--state-dir', default=None, help='The directory for the sessions of idle devices')
+    parser.add_argument('--queue-size', type=int, default=64, help='The maximum fixes waiting per device')
+    parser.add_argument('--idle-seconds', type=float, default=300, help='The seconds before evicting a device')
+    args = parser.parse_args()
+
+    configuration = None
+    if args.configuration is not None:
+        with open(args.configuration, encoding='utf-8') as file:
+            configuration = json.load(file)
+
+    live_service = LiveIngestionService(configuration, state_dir=args.state_dir, queue_size=args.queue_size,
+                                        idle_seconds=args.idle_seconds)
+    try:
+        asyncio.run(serve(live_service, args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,57 @@
+# This module replays a logger file as a live device would: it sends a fix, waits for the reply of the service and
+# sends the fix found after the seconds the reply asks for, printing the events the service finds.
+import argparse
+import asyncio
+from typing import Dict, List
+
+from csv_readers.LogicGpsReader import LogicGpsReader
+from pac.live.LiveClient import LiveClient
+
+
+async def replay(client: LiveClient, device_id: str, reader: LogicGpsReader, verbose=False) -> List[Dict]:
+    """
+    Sends the fixes of a reader as a device, following the sampling decided by the service
+    :param client: The client connected to the service
+    :param device_id: The id of the device
+    :param reader: The reader of the fixes of the device
+    :param verbose: Whether to print the events of each reply
+    :return: The replies that hold events or errors
+    """
+    replies = []
+    fix = reader.get_fix_in_n_seconds(0)
+    while fix is not None:
+        reply = await client.send_fix(device_id, fix)
+        if "error" in reply:
+            raise RuntimeError('The service could not process the fix {}: {}'.format(fix, reply["error"]))
+        if len(reply["events"]) > 0:
+            replies.append(reply)
+            if verbose:
+                for event in reply["events"]:
+                    print('{} {}'.format(fix.timestamp, event))
+        fix = reader.get_fix_in_n_seconds(reply["next_sampling"])
+
+    return replies
+
+
+async def main(input_file: str, device_id: str, host: str, port: int, unix_path=None):
+    if unix_path is not None:
+        client = await LiveClient.connect_unix(unix_path)
+    else:
+        client = await LiveClient.connect_tcp(host, port)
+    try:
+        await replay(client, device_id, LogicGpsReader(input_file), verbose=True)
+    finally:
+        await client.close()
+    print('{} fixes sent'.format(client.replies_received))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Replays a logger file as a live device')
+    parser.add_argument('input_file', help='The logger (CSV) file to replay')
+    parser.add_argument('--device', default='replay', help='The id of the device')
+    parser.add_argument('--host', default='127.0.0.1', help='The host of the service')
+    parser.add_argument('--port', type=int, default=7878, help='The TCP port of the service')
+    parser.add_argument('--unix', default=None, help='The path of the Unix socket of the service, instead of TCP')
+    args = parser.parse_args()
+
+    asyncio.run(main(args.input_file, args.device, args.host, args.port, args.unix))
@@ -0,0 +1,162 @@
+# This module holds the wire format of the live ingestion service: newline-delimited JSON objects, one per line.
+#
+# A device sends a fix per line, with its id, an optional sequence number that is echoed back, and the fields of the
+# fix (the timestamp as DATE_FORMAT, accuracy, speed and altitude are optional), for instance:
+#
+#     {"device": "phone-1", "seq": 7, "timestamp": "2017-03-22 10:01:30", "latitude": 40.4, "longitude": -3.7}
+#
+# The service answers each fix with a line holding the seconds the device should wait before sending the next fix and
+# the events found with it, or with the error found in the line:
+#
+#     {"device": "phone-1", "seq": 7, "next_sampling": 30, "events": [{"type": "arriving", ...}]}
+#     {"device": "phone-1", "seq": 7, "error": "..."}
+import json
+from datetime import datetime
+from typing import Dict, Tuple, Union
+
+from entities.GpsFix import GpsFix
+from entities.StayPoint import StayPoint
+from pac.PacEvent import PacEvent
+from pac.mobility_analyzer.GeoFencingOutcome import GeoFencingOutcome
+
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+OUTCOME_TYPES = {
+    GeoFencingOutcome.TYPE_NO_CHANGE: 'no_change',
+    GeoFencingOutcome.TYPE_LEAVING_STAY_POINT: 'leaving',
+    GeoFencingOutcome.TYPE_ARRIVING_STAY_POINT: 'arriving',
+    GeoFencingOutcome.TYPE_LEAVING_AND_ARRIVING: 'leaving_and_arriving',
+}
+
+
+def encode_fix(device_id: str, fix: GpsFix, seq: int = None) -> bytes:
+    """
+    Builds the line a device sends for a fix
+    :param device_id: The id of the device
+    :param fix: The fix
+    :param seq: The sequence number to be echoed back, if any
+    :return: The line, newline included
+    """
+    message = {
+        "device": device_id,
+        "timestamp": fix.timestamp.strftime(DATE_FORMAT),
+        "latitude": fix.latitude,
+        "longitude": fix.longitude,
+        "accuracy": fix.accuracy,
+        "speed": fix.speed,
+        "altitude": fix.altitude,
+    }
+    if seq is not None:
+        message["seq"] = seq
+    return _encode(message)
+
+
+def decode_message(line: bytes) -> Dict:
+    """
+    Reads the JSON object of a line
+    :param line: The line
+    :return: The message, as a dictionary
+    :raise ValueError: If the line is not a JSON object
+    """
+    try:
+        message = json.loads(line)
+    except ValueError:
+        raise ValueError('The line is not a JSON object')
+    if not isinstance(message, dict):
+        raise ValueError('The line is not a JSON object')
+    return message
+
+
+def fix_from_message(message: Dict) -> Tuple[str, Union[int, None], GpsFix]:
+    """
+    Reads the message a device sent for a fix
+    :param message: The message, as decode_message returns it
+    :return: The id of the device, the sequence number (None if missing) and the fix
+    :raise ValueError: If the message is not a fix message, the message of the error is meant for the device
+    """
+    device_id = message.get("device")
+    if not isinstance(device_id, str) or len(device_id) == 0:
+        raise ValueError('The device is missing')
+
+    try:
+        fix = GpsFix(float(message["latitude"]), float(message["longitude"]),
+                     datetime.strptime(message["timestamp"], DATE_FORMAT),
+                     altitude=float(message.get("altitude", 0)),
+                     accuracy=float(message.get("accuracy", 0)),
+                     speed=float(message.get("speed", 0)))
+    except KeyError as e:
+        raise ValueError('The field {} is missing'.format(e.args[0]))
+    except (TypeError, ValueError):
+        raise ValueError('The fields of the fix are not valid')
+
+    return device_id, message.get("seq"), fix
+
+
+def encode_reply(device_id: str, seq: Union[int, None], next_sampling: int, events) -> bytes:
+    """
+    Builds the line the service sends back for a processed fix
+    :param device_id: The id of the device
+    :param seq: The sequence number of the fix, if any
+    :param next_sampling: The seconds the device should wait before sending the next fix
+    :param events: The PacEvent found with the fix
+    :return: The line, newline included
+    """
+    message = {"device": device_id, "next_sampling": next_sampling, "events": [event_to_dict(e) for e in events]}
+    if seq is not None:
+        message["seq"] = seq
+    return _encode(message)
+
+
+def encode_error(device_id: Union[str, None], seq: Union[int, None], error: str) -> bytes:
+    """
+    Builds the line the service sends back for a fix that could not be processed
+    :param device_id: The id of the device, if known
+    :param seq: The sequence number of the fix, if any
+    :param error: The description of the error
+    :return: The line, newline included
+    """
+    message = {"device": device_id, "error": error}
+    if seq is not None:
+        message["seq"] = seq
+    return _encode(message)
+
+
+def decode_reply(line: bytes) -> Dict:
+    """
+    Reads a line the service sent back
+    :param line: The line
+    :return: The message, as a dictionary
+    """
+    return json.loads(line)
+
+
+def event_to_dict(event: PacEvent) -> Dict:
+    """
+    Converts an event into JSON types. Stay points are lists of [id_stay_point, latitude, longitude]
+    :param event: The event
+    :return: The event as a dictionary
+    """
+    if event.event_type == PacEvent.TYPE_STAY_POINT_DETECTED:
+        return {"type": "stay_point_detected", "stay_point": _stay_point_to_list(event.stay_point)}
+
+    outcome = event.outcome
+    result = {
+        "type": OUTCOME_TYPES[outcome.event_type],
+        "stay_point": _stay_point_to_list(outcome.stay_point),
+        "event_time": outcome.event_fix.timestamp.strftime(DATE_FORMAT),
+    }
+    if outcome.stay_point_2 is not None:
+        result["stay_point_2"] = _stay_point_to_list(outcome.stay_point_2)
+    if outcome.detection_fix is not None:
+        result["detection_time"] = outcome.detection_fix.timestamp.strftime(DATE_FORMAT)
+    return result
+
+
+def _stay_point_to_list(stay_point: StayPoint):
+    if stay_point is None:
+        return None
+    return [stay_point.id_stay_point, stay_point.latitude, stay_point.longitude]
+
+
+def _encode(message: Dict) -> bytes:
+    return (json.dumps(message) + '\n').encode('utf-8')
@@ -0,0 +1,221 @@
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Dict, List, Union
+
+import numpy as np
+
+from entities import geodesic
+from entities.FixArray import FixArray, epochs_to_microseconds
+from pac.mobility_analyzer.Trajectory import Trajectory
+
+
+class GroundTruthIndex(object):
+    """
+    The time and position columns of a ground truth trajectory (timestamps as whole microseconds), built once to
+    compare any amount of candidate (sub-sampled) trajectories with it, the way TrajectoryComparator does. The ground
+    truth fix of each candidate fix is found with a searchsorted, so aligning a candidate costs its own size, and the
+    interpolated comparison only visits the ground truth fixes within the time span of the candidate.
+    Candidates can be scored across a pool of processes, where the columns of the index are shared memory instead
+    of a copy per process.
+
+    Attributes:
+        time: int64 array of the timestamps of the ground truth, as microseconds since the epoch
+        latitude: float64 array of the latitudes of the ground truth
+        longitude: float64 array of the longitudes of the ground truth
+    """
+
+    PERCENTILES = (50, 90, 95, 99)
+
+    # The index a worker process attached to, see score_all
+    _worker_index = None  # type: GroundTruthIndex
+    _worker_memory = None  # type: shared_memory.SharedMemory
+
+    def __init__(self, ground_truth_trajectory: Union[Trajectory, FixArray]):
+        """
+        Basic constructor
+        :param ground_truth_trajectory: The ground truth trajectory, in chronological order
+        """
+        ground_truth = GroundTruthIndex.as_fix_array(ground_truth_trajectory)
+        self.time = epochs_to_microseconds(ground_truth.timestamp)
+        self.latitude = np.asarray(ground_truth.latitude, dtype=np.float64)
+        self.longitude = np.asarray(ground_truth.longitude, dtype=np.float64)
+
+    @staticmethod
+    def as_fix_array(trajectory: Union[Trajectory, FixArray]) -> FixArray:
+        if isinstance(trajectory, FixArray):
+            return trajectory
+        return trajectory.get_fix_array()
+
+    def __len__(self):
+        return len(self.time)
+
+    def get_time_closest_fix_indices(self, timestamp: np.ndarray) -> np.ndarray:
+        """
+        Finds the ground truth fix of each candidate fix, as Trajectory.get_time_closest_fix_index does: the one
+        before or the one after its time, whichever is closer (the one after on ties)
+        :param timestamp: The timestamps of the candidate fixes, as seconds since the epoch, in chronological order
+        :return: The index of the ground truth fix of each candidate fix. It is -1 (the last fix, as in Trajectory)
+        for fixes closer to the last fix than to the first one while being before the first one
+        """
+        candidate_time = epochs_to_microseconds(timestamp)
+        next_index = np.minimum(np.searchsorted(self.time, candidate_time, side='right'), len(self.time) - 1)
+        previous_index = next_index - 1
+        previous_gap = candidate_time - self.time[previous_index]
+        next_gap = self.time[next_index] - candidate_time
+        return np.where(previous_gap < next_gap, previous_index, next_index)
+
+    def compare_synchronized(self, candidate: Union[Trajectory, FixArray], with_errors=False):
+        """
+        Compares a candidate as TrajectoryComparator.compare_synchronized does: each ground truth fix between two
+        consecutive candidate fixes is compared with the position interpolated (by time) between them, and the
+        ground truth fixes of the candidate fixes are compared with them
+        :param candidate: The candidate trajectory, with at least one fix and not starting before the ground truth
+        :param with_errors: Whether to return the distance of each compared ground truth fix too
+        :return: The sum of distances and the amount of interpolated fixes. With with_errors, also an array with every
+        distance summed, in the order of the ground truth fixes (for percentiles)
+        """
+        candidate = GroundTruthIndex.as_fix_array(candidate)
+        closest = self.get_time_closest_fix_indices(candidate.timestamp)
+        if len(closest) > 1 and closest[0] < 0:
+            raise ValueError('The candidate trajectory starts before the ground truth')
+        left, right = closest[:-1], closest[1:]
+
+        anchor_errors = geodesic.distances(self.latitude[left], self.longitude[left], candidate.latitude[:-1],
+                                           candidate.longitude[:-1])
+
+        # The ground truth fixes strictly between the ones of each pair of candidate fixes, pair by pair
+        inner_amounts = np.maximum(right - left - 1, 0)
+        pair = np.repeat(np.arange(len(left)), inner_amounts)
+        inner_offsets = np.arange(len(pair)) - np.repeat(np.cumsum(inner_amounts) - inner_amounts, inner_amounts)
+        inner = left[pair] + 1 + inner_offsets
+
+        k1 = (self.time[inner] - self.time[left[pair]]) / 1000000
+        k2 = (self.time[right[pair]] - self.time[left[pair]]) / 1000000 - k1
+        latitude = self._interpolate(candidate.latitude[pair], candidate.latitude[pair + 1], k1, k2)
+        longitude = self._interpolate(candidate.longitude[pair], candidate.longitude[pair + 1], k1, k2)
+        inner_errors = geodesic.distances(latitude, longitude, self.latitude[inner], self.longitude[inner])
+
+        last_error = geodesic.distances(candidate.latitude[-1:], candidate.longitude[-1:],
+                                        self.latitude[closest[-1:]], self.longitude[closest[-1:]])
+
+        errors = np.concatenate((anchor_errors, inner_errors, last_error))
+        errors = errors[np.argsort(np.concatenate((left, inner, closest[-1:])), kind='stable')]
+        if with_errors:
+            return float(errors.sum()), len(inner), errors
+        return float(errors.sum()), len(inner)
+
+    @staticmethod
+    def _interpolate(start: np.ndarray, end: np.ndarray, k1: np.ndarray, k2: np.ndarray) -> np.ndarray:
+        """
+        Splits the segments in the proportions k1 and k2, as TrajectoryComparator.build_synthetic_fix does
+        """
+        with np.errstate(divide='ignore', invalid='ignore'):
+            split = ((k1 * end) + (k2 * start)) / (k1 + k2)
+        return np.where((k1 == 0.0) & (k2 == 0.0), end, split)
+
+    def compare_synchronized_no_interpolation(self, candidate: Union[Trajectory, FixArray], with_errors=False):
+        """
+        Compares a candidate as TrajectoryComparator.compare_synchronized_no_interpolation does: each candidate fix
+        is compared with its ground truth fix. Unlike it, distances over 200 meters are not printed
+        :param candidate: The candidate trajectory, with at least one fix
+        :param with_errors: Whether to return the distance of each candidate fix too
+        :return: The sum of distances and the amount of candidate fixes. With with_errors, also an array with the
+        distance of each candidate fix
+        """
+        candidate = GroundTruthIndex.as_fix_array(candidate)
+        closest = self.get_time_closest_fix_indices(candidate.timestamp)
+        errors = geodesic.distances(candidate.latitude, candidate.longitude, self.latitude[closest],
+                                    self.longitude[closest])
+        if with_errors:
+            return float(errors.sum()), len(candidate), errors
+        return float(errors.sum()), len(candidate)
+
+    def score(self, name: str, candidate: Union[Trajectory, FixArray]) -> Dict:
+        """
+        Obtains the error metrics of a candidate, with both comparisons
+        :param name: The name of the candidate
+        :param candidate: The candidate trajectory
+        :return: A row of the table score_all returns
+        """
+        distance_sum, mapped_fixes, errors = self.compare_synchronized(candidate, with_errors=True)
+        sampled_distance_sum, fixes, sampled_errors = self.compare_synchronized_no_interpolation(candidate,
+                                                                                                 with_errors=True)
+        row = {
+            "candidate": name,
+            "fixes": fixes,
+            "mapped_fixes": mapped_fixes,
+            "distance_sum": distance_sum,
+            "mean_error": float(errors.mean()),
+            "max_error": float(errors.max()),
+        }
+        for percentile, value in zip(GroundTruthIndex.PERCENTILES, np.percentile(errors, GroundTruthIndex.PERCENTILES)):
+            row["p{}_error".format(percentile)] = float(value)
+        row["sampled_distance_sum"] = sampled_distance_sum
+        row["sampled_mean_error"] = float(sampled_errors.mean())
+        return row
+
+    def score_all(self, candidates: Dict[str, Union[Trajectory, FixArray]], workers=1) -> List[Dict]:
+        """
+        Obtains the error metrics of many candidates, see score
+        :param candidates: The candidate trajectories, keyed by name
+        :param workers: The amount of processes to employ (the amount of cpus when None), 1 runs in current process.
+        The processes attach to the columns of the index in shared memory, only the candidates are sent to them
+        :return: A row of metrics per candidate, in the order of candidates
+        """
+        if workers == 1:
+            return [self.score(name, candidate) for name, candidate in candidates.items()]
+
+        memory = self.to_shared_memory()
+        try:
+            with ProcessPoolExecutor(max_workers=workers, initializer=GroundTruthIndex._attach_worker,
+                                     initargs=(memory.name, len(self))) as executor:
+                futures = []
+                for name, candidate in candidates.items():
+                    candidate = GroundTruthIndex.as_fix_array(candidate)
+                    futures.append(executor.submit(GroundTruthIndex._score_in_worker, name, candidate.timestamp,
+                                                   candidate.latitude, candidate.longitude))
+                return [future.result() for future in futures]
+        finally:
+            memory.close()
+            memory.unlink()
+
+    def to_shared_memory(self) -> shared_memory.SharedMemory:
+        """
+        Copies the columns into a new block of shared memory, the caller must close and unlink it
+        :return: The block, attach to it with from_shared_memory
+        """
+        memory = shared_memory.SharedMemory(create=True, size=max(3 * 8 * len(self), 1))
+        time, latitude, longitude = GroundTruthIndex._columns_of(memory, len(self))
+        time[:] = self.time
+        latitude[:] = self.latitude
+        longitude[:] = self.longitude
+        return memory
+
+    @staticmethod
+    def from_shared_memory(memory: shared_memory.SharedMemory, size: int) -> 'GroundTruthIndex':
+        """
+        Builds an index whose columns are the ones in a block of shared memory, without copying them
+        :param memory: The block, as to_shared_memory creates it. It must be kept open while the index is used
+        :param size: The amount of fixes of the index
+        :return: The index
+        """
+        index = GroundTruthIndex.__new__(GroundTruthIndex)
+        index.time, index.latitude, index.longitude = GroundTruthIndex._columns_of(memory, size)
+        return index
+
+    @staticmethod
+    def _columns_of(memory: shared_memory.SharedMemory, size: int):
+        return (np.ndarray(size, dtype=np.int64, buffer=memory.buf),
+                np.ndarray(size, dtype=np.float64, buffer=memory.buf, offset=8 * size),
+                np.ndarray(size, dtype=np.float64, buffer=memory.buf, offset=16 * size))
+
+    @staticmethod
+    def _attach_worker(name: str, size: int):
+        # The workers share the resource tracker of the process that created the block, which unlinks it at the end
+        memory = shared_memory.SharedMemory(name=name)
+        GroundTruthIndex._worker_memory = memory
+        GroundTruthIndex._worker_index = GroundTruthIndex.from_shared_memory(memory, size)
+
+    @staticmethod
+    def _score_in_worker(name: str, timestamp: np.ndarray, latitude: np.ndarray, longitude: np.ndarray) -> Dict:
+        return GroundTruthIndex._worker_index.score(name, FixArray(latitude, longitude, timestamp))
@@ -1,10 +1,16 @@
-from typing import List
+from typing import List, Union
 
+from entities import geodesic
+from entities.FixArray import FixArray
 from entities.GpsFix import GpsFix
 
 
 class Trajectory(object):
-    def __init__(self, fixes: List[GpsFix]):
+    """
+    A sequence of fixes. It can be backed by a list of GpsFix or by a FixArray, in the latter case the
+    sub-trajectories share the columns of the original one.
+    """
+    def __init__(self, fixes: Union[List[GpsFix], FixArray]):
         self._fixes = fixes
 
     def get_fix(self, index):
@@ -57,10 +63,19 @@ class Trajectory(object):
         # Risky
         return Trajectory(portion_of_fixes)
 
-    def get_internal_distance(self):
+    def get_internal_distance(self, batched=False):
+        if batched:
+            fix_array = self.get_fix_array()
+            return float(geodesic.distances_along(fix_array.latitude, fix_array.longitude).sum())
+
         distance_sum = 0
         size = self.get_size()
         for i in range(0, size - 1):
             distance_sum += self._fixes[i].distance_to(self._fixes[i + 1])
 
         return distance_sum
+
+    def get_fix_array(self) -> FixArray:
+        if isinstance(self._fixes, FixArray):
+            return self._fixes
+        return FixArray.from_fixes(self._fixes)
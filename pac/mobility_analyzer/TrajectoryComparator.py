@@ -1,13 +1,16 @@
 from datetime import timedelta, datetime
 
+from entities import geodesic
 from entities.GpsFix import GpsFix
 from pac.mobility_analyzer.Trajectory import Trajectory
 
 
 class TrajectoryComparator(object):
-    def __init__(self, ground_truth_trajectory: Trajectory, sub_sampled_trajectory: Trajectory):
+    def __init__(self, ground_truth_trajectory: Trajectory, sub_sampled_trajectory: Trajectory,
+                 batch_distances=False):
         self._gt_trajectory = ground_truth_trajectory
         self._ss_trajectory = sub_sampled_trajectory
+        self._batch_distances = batch_distances
 
     def compare_synchronized(self):
         global_start_time = datetime.now()
@@ -46,13 +49,16 @@ class TrajectoryComparator(object):
             # start_time = datetime.now()
             internal_mapped_fixes = self.project_fixes_synchronously(sub_trajectory, left_fix, right_fix)
             # 3. Get distance for all mapped internal fixes
-            inner_distance = 0
-            index_in_gt = 1
-
-            for synthetic_fix in internal_mapped_fixes:
-                current_gt_fix = sub_trajectory.get_fix(index_in_gt)
-                inner_distance += synthetic_fix.distance_to(current_gt_fix)
-                index_in_gt += 1
+            if self._batch_distances:
+                inner_distance = self._batched_inner_distance(internal_mapped_fixes, sub_trajectory)
+            else:
+                inner_distance = 0
+                index_in_gt = 1
+
+                for synthetic_fix in internal_mapped_fixes:
+                    current_gt_fix = sub_trajectory.get_fix(index_in_gt)
+                    inner_distance += synthetic_fix.distance_to(current_gt_fix)
+                    index_in_gt += 1
             distance_sum += inner_distance
             total_mapped_fixes += len(internal_mapped_fixes)
             # end_time = datetime.now()
@@ -72,6 +78,23 @@ class TrajectoryComparator(object):
         #     global_end_time - global_start_time).total_seconds()))
         return distance_sum, total_mapped_fixes
 
+    @staticmethod
+    def _batched_inner_distance(internal_mapped_fixes, sub_trajectory: Trajectory) -> float:
+        """
+        Sums the distances between the synthetic fixes and their ground truth fixes in a single batch
+        :param internal_mapped_fixes: The synthetic fixes, one per internal fix of the sub trajectory
+        :param sub_trajectory: The ground truth sub trajectory
+        :return: The sum of distances, in meters
+        """
+        if len(internal_mapped_fixes) == 0:
+            return 0
+        gt_fixes = [sub_trajectory.get_fix(i) for i in range(1, len(internal_mapped_fixes) + 1)]
+        distances = geodesic.distances([fix.latitude for fix in internal_mapped_fixes],
+                                       [fix.longitude for fix in internal_mapped_fixes],
+                                       [fix.latitude for fix in gt_fixes],
+                                       [fix.longitude for fix in gt_fixes])
+        return float(distances.sum())
+
     def project_fixes_synchronously(self, sub_trj: Trajectory, left_fix: GpsFix, right_fix: GpsFix):
         mapped_fixes = []
         size_ss = sub_trj.get_size()
@@ -0,0 +1,56 @@
+from typing import Union
+
+import numpy as np
+
+from entities.FixArray import FixArray
+from pac.mobility_analyzer.GroundTruthIndex import GroundTruthIndex
+from pac.mobility_analyzer.Trajectory import Trajectory
+
+
+class VectorizedTrajectoryComparator(object):
+    """
+    Compares a sub-sampled trajectory with its ground truth as TrajectoryComparator does, but over the columns of both
+    trajectories: the ground truth fix of every sub-sampled fix is found with a single searchsorted, the synthetic
+    fixes of all of the sub-sampled pairs are interpolated at once and every distance is computed in one batch. The
+    distance sums are the ones of TrajectoryComparator up to floating point rounding (the batched distances differ from
+    the scalar ones in the nanometers), the amounts of fixes are exactly the same.
+    The sub-sampled trajectory must have at least one fix and, as TrajectoryComparator requires, it must not start
+    before the ground truth. To compare many sub-sampled trajectories with the same ground truth, use a
+    GroundTruthIndex directly.
+
+    Attributes:
+        ground_truth: The index of the ground truth trajectory
+        sub_sampled: The sub-sampled trajectory, as columns
+    """
+
+    def __init__(self, ground_truth_trajectory: Union[Trajectory, FixArray, GroundTruthIndex],
+                 sub_sampled_trajectory: Union[Trajectory, FixArray]):
+        """
+        Basic constructor
+        :param ground_truth_trajectory: The ground truth trajectory, in chronological order, or its index
+        :param sub_sampled_trajectory: The sub-sampled trajectory, in chronological order
+        """
+        if not isinstance(ground_truth_trajectory, GroundTruthIndex):
+            ground_truth_trajectory = GroundTruthIndex(ground_truth_trajectory)
+        self.ground_truth = ground_truth_trajectory
+        self.sub_sampled = GroundTruthIndex.as_fix_array(sub_sampled_trajectory)
+
+    def get_time_closest_fix_indices(self) -> np.ndarray:
+        """
+        Finds the ground truth fix of each sub-sampled fix, see GroundTruthIndex.get_time_closest_fix_indices
+        """
+        return self.ground_truth.get_time_closest_fix_indices(self.sub_sampled.timestamp)
+
+    def compare_synchronized(self, with_errors=False):
+        """
+        Compares the trajectories as TrajectoryComparator.compare_synchronized does, see
+        GroundTruthIndex.compare_synchronized
+        """
+        return self.ground_truth.compare_synchronized(self.sub_sampled, with_errors)
+
+    def compare_synchronized_no_interpolation(self, with_errors=False):
+        """
+        Compares the trajectories as TrajectoryComparator.compare_synchronized_no_interpolation does, see
+        GroundTruthIndex.compare_synchronized_no_interpolation
+        """
+        return self.ground_truth.compare_synchronized_no_interpolation(self.sub_sampled, with_errors)
@@ -1,39 +1,93 @@
-from math import floor
-from typing import Union, Tuple
+from collections import deque
+from math import floor, inf
+from typing import Union, Tuple, Dict, List
 from datetime import datetime
+
+import numpy as np
+
+from entities import geodesic
 from entities.GpsFix import GpsFix
 from pac.mobility_analyzer.GeoFencingOutcome import GeoFencingOutcome as gfo
+from pac.persistence.StayPointsGridIndex import StayPointsGridIndex
 
 
 class WindowedGeoFencing(object):
     """
     Analyzes windows of the GpsFixes stream for finding mobility changes.
-    The window holds a pivot (centroid-medoid) that aids to determine what happened before and after it and determine 
+    The window holds a pivot (centroid-medoid) that aids to determine what happened before and after it and determine
     the mobility changes using several fixes instead of a single one as the BinaryGeoFencing does.
     The pivot is dynamic, it could be in other position than center.
 
+    The distances of the window to each stay point are kept in ring buffers (one row per stay point, one slot per
+    fix of the window), along with rolling counts of the fixes inside each stay point for the whole window and for
+    the old sub-window of the default pivot. So each fix updates every stay point in O(1).
+
+    When the stay points are prefiltered, only the stay points that could be within radio_distance of the fix (found
+    in a grid index), the ones with fixes inside the window and the current one are updated, the others are recorded
+    as outside (at an infinite distance) lazily, the next time they are updated. As a stay point without fixes inside
+    the window can't vote, the cost per fix depends on the nearby stay points instead of all of them.
+
     Attributes:
         radio_distance: The distance for considering a fix inside a stay point
         window_size: The size of the window to employ
-        distances: The calculated distances to each stay point
         stay_points: The stay points considered during calculation of visits.
+        batch_distances: Whether distances from each fix to all of the stay points are computed in a single batch
+        prefilter_stay_points: Whether the distances are computed only for the stay points near each fix
     """
 
-    def __init__(self, radio_distance, window_size):
+    def __init__(self, radio_distance, window_size, batch_distances=False, prefilter_stay_points=True):
         """
         Basic constructor
-        :param radio_distance: The distance for considering when a fix is inside a stay point 
+        :param radio_distance: The distance for considering when a fix is inside a stay point
         :param window_size: The size of the window to employ
+        :param batch_distances: Compute the distances to all of the stay points with the vectorized kernel
+        :param prefilter_stay_points: Skip the distances to the stay points that can't be within radio_distance
         """
         self.radio_distance = radio_distance
         self.window_size = window_size
-        self.fixes_window = []
-        self.distances = {}
-        self.distances_as_boolean = {}
+        self.fixes_window = deque()
         self.stay_points = []
         self.pivot = floor(window_size / 2.0)  # Ok, validated
         self.trimmed_once = False
         self.current_sp = None
+        self.batch_distances = batch_distances
+        self.prefilter_stay_points = prefilter_stay_points
+        self._grid_index = StayPointsGridIndex(radio_distance)
+        self._stay_points_latitudes = np.empty(0)
+        self._stay_points_longitudes = np.empty(0)
+
+        # Ring buffers, the slot of the k-th fix of the window is (self._head + k) % self._slots
+        self._slots = window_size + 1  # The window holds one extra fix between appending and trimming
+        self._head = 0
+        self._window_distances = []  # type: List[List[float]]
+        self._window_inside = []  # type: List[List[bool]]
+        self._inside_counts = []  # type: List[int]
+        self._old_window_inside_counts = []  # type: List[int]
+        self._rows_by_id = {}  # type: Dict[int, int]
+
+        # Fixes are numbered from 0, each row is up to date until its sequence, the fixes after it are outside
+        self._sequence = -1
+        self._row_sequences = []  # type: List[int]
+        self._updated_rows = []  # type: List[int]
+        self._active_rows = []  # type: List[int]  # The prefiltered rows with fixes inside the window, sorted
+
+    @property
+    def distances(self) -> Dict[int, List[float]]:
+        """
+        The calculated distances of the window fixes to each stay point, keyed by stay point id
+        """
+        self._skip_all_rows()
+        return {id_stay_point: [self._window_distances[row][slot] for slot in self._window_slots()]
+                for id_stay_point, row in self._rows_by_id.items()}
+
+    @property
+    def distances_as_boolean(self) -> Dict[int, List[bool]]:
+        """
+        Whether each fix of the window is inside each stay point, keyed by stay point id
+        """
+        self._skip_all_rows()
+        return {id_stay_point: [self._window_inside[row][slot] for slot in self._window_slots()]
+                for id_stay_point, row in self._rows_by_id.items()}
 
     def analyze_location(self, gps_fix: GpsFix, pivot=-1):
         self.fixes_window.append(gps_fix)
@@ -42,23 +96,92 @@ class WindowedGeoFencing(object):
         return self.check_mobility_changes(gps_fix, self.pivot if pivot < 0 else pivot)
 
     def update_distances(self, gps_fix):
-        for stay_point in self.stay_points:
-            distance = stay_point.distance_to(gps_fix)
+        self._sequence += 1
+        if self.prefilter_stay_points:
+            rows, distances = self._prefiltered_distances(gps_fix)
+        else:
+            rows = range(0, len(self.stay_points))
+            distances = self._distances_to(gps_fix, rows)
+        self._updated_rows = rows
+
+        position = len(self.fixes_window) - 1
+        slot = self._slot_of(position)
+        is_old_window_position = position < self.pivot
+        for row, distance in zip(rows, distances):
+            if self.prefilter_stay_points:
+                self._skip_row_to(row, self._sequence - 1)
+                self._row_sequences[row] = self._sequence
             distance_as_boolean = self.radio_distance > distance
-            stay_point_distances = self.distances[stay_point.id_stay_point]
-            stay_point_distances.append(distance)
-            stay_point_distances_as_boolean = self.distances_as_boolean[stay_point.id_stay_point]
-            stay_point_distances_as_boolean.append(distance_as_boolean)
+            self._window_distances[row][slot] = distance
+            self._window_inside[row][slot] = distance_as_boolean
+            if distance_as_boolean:
+                self._inside_counts[row] += 1
+                if is_old_window_position:
+                    self._old_window_inside_counts[row] += 1
 
     def trim_window_if_needed(self):
         if len(self.fixes_window) > self.window_size:
             self.trimmed_once = True
-            self.fixes_window.pop(0)
-            for stay_point in self.stay_points:
-                stay_point_distances = self.distances[stay_point.id_stay_point]
-                del stay_point_distances[0]
-                stay_point_distances_as_boolean = self.distances_as_boolean[stay_point.id_stay_point]
-                del stay_point_distances_as_boolean[0]
+            self.fixes_window.popleft()
+
+            oldest_slot = self._head
+            pivot_slot = self._slot_of(self.pivot)
+            for row in self._updated_rows:
+                window_inside = self._window_inside[row]
+                oldest_inside = window_inside[oldest_slot]
+                self._inside_counts[row] -= oldest_inside
+                if self.pivot > 0:
+                    # The oldest fix leaves the old sub-window, and the one at the pivot moves into it
+                    self._old_window_inside_counts[row] += window_inside[pivot_slot] - oldest_inside
+            self._head = (self._head + 1) % self._slots
+
+        if self.prefilter_stay_points:
+            self._active_rows = sorted(row for row in self._updated_rows if self._inside_counts[row] > 0)
+
+    def _prefiltered_distances(self, gps_fix) -> Tuple[List[int], List[float]]:
+        """
+        Computes the distances to the stay points that could be within radio_distance of a fix, the stay points with
+        fixes inside the window and the current one are also updated, as outside
+        :param gps_fix: The fix
+        :return: The rows to update and their distances
+        """
+        candidate_rows = self._grid_index.get_candidate_positions(gps_fix.latitude, gps_fix.longitude,
+                                                                   self.radio_distance)
+        distances_by_row = dict(zip(candidate_rows, self._distances_to(gps_fix, candidate_rows)))
+        for row in self._active_rows:
+            distances_by_row.setdefault(row, inf)
+        if self.current_sp is not None:
+            distances_by_row.setdefault(self._rows_by_id[self.current_sp.id_stay_point], inf)
+        return list(distances_by_row.keys()), list(distances_by_row.values())
+
+    def _distances_to(self, gps_fix, rows) -> List[float]:
+        if self.batch_distances and len(rows) > 0:
+            if len(rows) == len(self.stay_points):
+                latitudes, longitudes = self._stay_points_latitudes, self._stay_points_longitudes
+            else:
+                latitudes, longitudes = self._stay_points_latitudes[rows], self._stay_points_longitudes[rows]
+            return geodesic.distances_to_point(gps_fix.latitude, gps_fix.longitude, latitudes, longitudes).tolist()
+        return [self.stay_points[row].distance_to(gps_fix) for row in rows]
+
+    def _skip_row_to(self, row, sequence):
+        """
+        Records as outside the fixes a row was not updated with, until the specified fix. The row had no fixes
+        inside the window when it was last updated, so its counts remain 0
+        :param row: The row of the stay point
+        :param sequence: The number of the last fix to record
+        """
+        row_sequence = self._row_sequences[row]
+        if row_sequence < sequence:
+            window_distances, window_inside = self._window_distances[row], self._window_inside[row]
+            for skipped_sequence in range(max(row_sequence + 1, sequence - self._slots + 1), sequence + 1):
+                window_distances[skipped_sequence % self._slots] = inf
+                window_inside[skipped_sequence % self._slots] = False
+            self._row_sequences[row] = sequence
+
+    def _skip_all_rows(self):
+        if self.prefilter_stay_points:
+            for row in range(0, len(self.stay_points)):
+                self._skip_row_to(row, self._sequence)
 
     def check_mobility_changes(self, gps_fix, pivot):
         decision = None
@@ -71,20 +194,13 @@ class WindowedGeoFencing(object):
         Identifies the mobility change
         :type pivot: int
         :type gps_fix: GpsFix
-        :param gps_fix: The latest received fix 
+        :param gps_fix: The latest received fix
         :param pivot: The index of pivot in window
         :return: A GFO object or None if no changes are identified
         """
-        # Count fixes inside stay point in oldest-newer sub-windows
-        results = {}
-        for sp in self.stay_points:
-            distances_as_boolean = self.distances_as_boolean[sp.id_stay_point]
-            results[sp.id_stay_point] = {
-                # oldest stuff. Structure is: count of fixes inside, sub-window length
-                "old_window": (sum(distances_as_boolean[:pivot]), pivot),
-                # newer stuff
-                "new_window": (sum(distances_as_boolean[(pivot + 1):]), len(distances_as_boolean[(pivot + 1):])),
-                "pivot": (distances_as_boolean[pivot], 1)}
+        # Count fixes inside stay point in oldest-newer sub-windows. Structure is: count of fixes inside old
+        # sub-window, whether pivot is inside, count of fixes inside new sub-window
+        results = [(self.stay_points[row], self._count_votes(row, pivot)) for row in self._voting_rows()]
 
         is_user_arriving, metadata_arrival = self._check_for_arrival(gps_fix, results, pivot)
         is_user_leaving, metadata_departure = self._check_for_departure(gps_fix, results, pivot)
@@ -113,6 +229,37 @@ class WindowedGeoFencing(object):
 
         return outcome
 
+    def _voting_rows(self) -> List[int]:
+        """
+        Obtains the rows of the stay points that could vote for a mobility change, in the order of the stay points.
+        With the voting threshold in 1 or more, a stay point needs some fix inside the window to vote.
+        :return: The rows of the voting stay points
+        """
+        if not self.prefilter_stay_points:
+            return list(range(0, len(self.stay_points)))
+        if floor(self.window_size / 2.0) > 0:
+            return self._active_rows
+        self._skip_all_rows()
+        return list(range(0, len(self.stay_points)))
+
+    def _count_votes(self, row, pivot) -> Tuple[int, bool, int]:
+        """
+        Counts the fixes inside a stay point in the old and new sub-windows, and whether the pivot is inside it.
+        The default pivot uses the rolling counts, other pivots are counted over the window.
+        :param row: The row of the stay point
+        :param pivot: The index of pivot in window
+        :return: The count of fixes inside old sub-window, whether pivot is inside, count of fixes inside new sub-window
+        """
+        window_inside = self._window_inside[row]
+        pivot_inside = window_inside[self._slot_of(pivot)]
+        if pivot == self.pivot:
+            old_inside = self._old_window_inside_counts[row]
+            return old_inside, pivot_inside, self._inside_counts[row] - old_inside - pivot_inside
+
+        slots = self._window_slots()
+        return (sum(window_inside[slot] for slot in slots[:pivot]), pivot_inside,
+                sum(window_inside[slot] for slot in slots[(pivot + 1):]))
+
     def it_is_the_same_current_stay_point(self, stay_point) -> bool:
         """
         Finds out whether the specified stay point is the same current stay point where user is
@@ -123,27 +270,32 @@ class WindowedGeoFencing(object):
 
     def introduce_new_stay_point(self, stay_point):
         self.stay_points.append(stay_point)
-        distances_new_stay_point = []
-        distances_as_boolean_new_stay_point = []
-        for fix in self.fixes_window:
+        self._stay_points_latitudes = np.append(self._stay_points_latitudes, stay_point.latitude)
+        self._stay_points_longitudes = np.append(self._stay_points_longitudes, stay_point.longitude)
+        distances_new_stay_point = [0.0] * self._slots
+        distances_as_boolean_new_stay_point = [False] * self._slots
+        for slot, fix in zip(self._window_slots(), self.fixes_window):
             distance = stay_point.distance_to(fix)
-            distances_new_stay_point.append(distance)
+            distances_new_stay_point[slot] = distance
 
             distance_as_boolean = self.radio_distance > distance
-            distances_as_boolean_new_stay_point.append(distance_as_boolean)
+            distances_as_boolean_new_stay_point[slot] = distance_as_boolean
 
-        self.distances[stay_point.id_stay_point] = distances_new_stay_point
-        self.distances_as_boolean[stay_point.id_stay_point] = distances_as_boolean_new_stay_point
+        self._rows_by_id[stay_point.id_stay_point] = len(self._window_distances)
+        self._window_distances.append(distances_new_stay_point)
+        self._window_inside.append(distances_as_boolean_new_stay_point)
+        window_inside = [distances_as_boolean_new_stay_point[slot] for slot in self._window_slots()]
+        self._inside_counts.append(sum(window_inside))
+        self._old_window_inside_counts.append(sum(window_inside[:self.pivot]))
+        self._row_sequences.append(self._sequence)
+        self._grid_index.add(stay_point)
+        if self.prefilter_stay_points and self._inside_counts[-1] > 0:
+            self._active_rows.append(len(self.stay_points) - 1)
 
     def _check_for_arrival(self, fix, results, pivot) -> Tuple[bool, gfo]:
-        for sp in self.stay_points:
-            vote_value = results[sp.id_stay_point]
-            inside_fixes_old_window, total_old_fixes = vote_value["old_window"]
-            inside_fixes_new_window, total_new_fixes = vote_value["new_window"]
-            pivot_inside, count = vote_value["pivot"]
-
-            outside_fixes_old_window = total_old_fixes - inside_fixes_old_window
-            voting_threshold = floor(self.window_size / 2.0)
+        voting_threshold = floor(self.window_size / 2.0)
+        for sp, (inside_fixes_old_window, pivot_inside, inside_fixes_new_window) in results:
+            outside_fixes_old_window = pivot - inside_fixes_old_window
 
             if pivot_inside:
                 if outside_fixes_old_window >= voting_threshold and inside_fixes_new_window >= voting_threshold:
@@ -166,14 +318,10 @@ class WindowedGeoFencing(object):
         return False, None
 
     def _check_for_departure(self, fix, results, pivot) -> Tuple[bool, gfo]:
-        for sp in self.stay_points:
-            vote_value = results[sp.id_stay_point]
-            inside_fixes_old_window, total_old_fixes = vote_value["old_window"]
-            inside_fixes_new_window, total_new_fixes = vote_value["new_window"]
-            pivot_inside, count = vote_value["pivot"]
-
+        voting_threshold = floor(self.window_size / 2.0)  # in winSize=5, 1 means a 50% of error tolerance
+        total_new_fixes = max(len(self.fixes_window) - pivot - 1, 0)
+        for sp, (inside_fixes_old_window, pivot_inside, inside_fixes_new_window) in results:
             outside_fixes_new_window = total_new_fixes - inside_fixes_new_window
-            voting_threshold = floor(self.window_size / 2.0)  # in winSize=5, 1 means a 50% of error tolerance
 
             if pivot_inside is False:
                 if inside_fixes_old_window >= voting_threshold and outside_fixes_new_window >= voting_threshold:
@@ -187,12 +335,18 @@ class WindowedGeoFencing(object):
         return False, None
 
     def distance_watchdog_barks(self, pivot):
-        distances_as_boolean = self.distances_as_boolean[self.current_sp.id_stay_point]
-        if not distances_as_boolean[pivot]:
-            votes, length = (sum(distances_as_boolean[(pivot + 1):]), len(distances_as_boolean[(pivot + 1):]))
-            if votes == 0:
-                if self.distances[self.current_sp.id_stay_point][-1] > self.radio_distance:
+        row = self._rows_by_id[self.current_sp.id_stay_point]
+        inside_fixes_old_window, pivot_inside, inside_fixes_new_window = self._count_votes(row, pivot)
+        if not pivot_inside:
+            if inside_fixes_new_window == 0:
+                if self._window_distances[row][self._slot_of(len(self.fixes_window) - 1)] > self.radio_distance:
                     # Bark!
                     return True
 
         return False
+
+    def _slot_of(self, position: int) -> int:
+        return (self._head + position) % self._slots
+
+    def _window_slots(self) -> List[int]:
+        return [(self._head + position) % self._slots for position in range(0, len(self.fixes_window))]
@@ -0,0 +1,158 @@
+import glob
+import hashlib
+import json
+import os
+import pickle
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Tuple
+
+from file_utils import write_atomically
+
+CACHE_SUFFIX = '.stage.pickle'
+
+
+class StageCache(object):
+    """
+    Keeps the outputs of the stages of a pipeline, keyed by the stage name and a dictionary of the (JSON
+    serializable) values the output depends on. Outputs are kept in memory and, optionally, pickled on disk, both
+    of them are evicted least recently used first.
+
+    Attributes:
+        cache_dir: The directory for the pickled outputs, None keeps them only in memory
+        memory_entries: The maximum amount of outputs kept in memory
+        disk_entries: The maximum amount of outputs kept on disk
+        hits: The amount of outputs found in cache, per stage
+        misses: The amount of outputs computed, per stage
+    """
+
+    def __init__(self, cache_dir=None, memory_entries=16, disk_entries=256):
+        """
+        Basic constructor
+        :param cache_dir: The directory for the pickled outputs, None keeps them only in memory
+        :param memory_entries: The maximum amount of outputs kept in memory
+        :param disk_entries: The maximum amount of outputs kept on disk
+        """
+        self.cache_dir = cache_dir
+        self.memory_entries = memory_entries
+        self.disk_entries = disk_entries
+        self.hits = {}  # type: Dict[str, int]
+        self.misses = {}  # type: Dict[str, int]
+        self._memory = OrderedDict()  # type: OrderedDict[Tuple[str, str], Any]
+
+    @staticmethod
+    def get_key(stage: str, dependencies: Dict) -> str:
+        """
+        Obtains the key of an output, a digest of the stage name and the values it depends on
+        :param stage: The name of the stage
+        :param dependencies: The values the output depends on, they must be JSON serializable
+        :return: The key of the output
+        """
+        content = json.dumps([stage, dependencies], sort_keys=True)
+        return hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+    def get_or_compute(self, stage: str, dependencies: Dict, compute: Callable[[], Any]) -> Any:
+        """
+        Obtains the output of a stage from the cache, computing (and caching) it when it is not there
+        :param stage: The name of the stage
+        :param dependencies: The values the output depends on, they must be JSON serializable
+        :param compute: The function that computes the output
+        :return: The output
+        """
+        key = self.get_key(stage, dependencies)
+        found, value = self._get(stage, key)
+        if found:
+            self.hits[stage] = self.hits.get(stage, 0) + 1
+            return value
+
+        self.misses[stage] = self.misses.get(stage, 0) + 1
+        value = compute()
+        self._put_in_memory(stage, key, value)
+        self._put_on_disk(stage, key, value)
+        return value
+
+    def clear(self):
+        """
+        Removes every output, from memory and disk
+        """
+        self._memory.clear()
+        if self.cache_dir is not None:
+            for path in glob.glob(os.path.join(glob.escape(self.cache_dir), '*' + CACHE_SUFFIX)):
+                _remove_quietly(path)
+
+    def _get(self, stage: str, key: str) -> Tuple[bool, Any]:
+        if (stage, key) in self._memory:
+            self._memory.move_to_end((stage, key))
+            if self.cache_dir is not None:
+                _touch_quietly(self._get_path(stage, key))
+            return True, self._memory[(stage, key)]
+
+        if self.cache_dir is None:
+            return False, None
+
+        path = self._get_path(stage, key)
+        try:
+            with open(path, 'rb') as file:
+                value = pickle.load(file)
+        except FileNotFoundError:
+            return False, None
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+            _remove_quietly(path)
+            return False, None
+
+        _touch_quietly(path)  # The modification time tracks the use of the file
+        self._put_in_memory(stage, key, value)
+        return True, value
+
+    def _put_in_memory(self, stage: str, key: str, value):
+        self._memory[(stage, key)] = value
+        self._memory.move_to_end((stage, key))
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _put_on_disk(self, stage: str, key: str, value):
+        """
+        Pickles the output into a temporary file and then moves it into place, so that readers never load a partial
+        file. Failing to write the output is not an error, it just stays in memory.
+        """
+        if self.cache_dir is None:
+            return
+
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            write_atomically(self._get_path(stage, key),
+                             lambda file: pickle.dump(value, file, protocol=pickle.HIGHEST_PROTOCOL))
+        except (OSError, pickle.PicklingError):
+            return
+
+        self._evict_from_disk()
+
+    def _evict_from_disk(self):
+        paths = glob.glob(os.path.join(glob.escape(self.cache_dir), '*' + CACHE_SUFFIX))
+        if len(paths) <= self.disk_entries:
+            return
+
+        modification_times = {}
+        for path in paths:
+            try:
+                modification_times[path] = os.stat(path).st_mtime_ns
+            except OSError:
+                pass
+        for path in sorted(modification_times, key=modification_times.get)[:len(paths) - self.disk_entries]:
+            _remove_quietly(path)
+
+    def _get_path(self, stage: str, key: str) -> str:
+        return os.path.join(self.cache_dir, stage + '.' + key + CACHE_SUFFIX)
+
+
+def _touch_quietly(path: str):
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+
+def _remove_quietly(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
@@ -1,6 +1,8 @@
-from typing import List
+from typing import List, Tuple, Union
 
+from entities import geodesic
 from entities.StayPoint import StayPoint
+from pac.persistence.StayPointsGridIndex import StayPointsGridIndex
 
 
 class StayPointsDal(object):
@@ -10,15 +12,21 @@ class StayPointsDal(object):
     Attributes:
         stay_points: The global list of stay points learned by the engine
         distance_radio: The distance in meters for considering two stay points as equivalent
+        batch_distances: Whether distances to the candidate stay points are computed in a single batch
+    Known stay points are kept in a grid index with cells of distance_radio, so looking for an equivalent stay point
+    only measures the distance to those in the neighbouring cells.
     """
 
-    def __init__(self, distance_radio):
+    def __init__(self, distance_radio, batch_distances=False):
         """
         Basic constructor
         :param distance_radio: The distance radio for considering two stay points equivalent
+        :param batch_distances: Compute the distances to the candidate stay points with the vectorized kernel
         """
         self.stay_points = []  # type List[StayPoint]
         self.distance_radio = distance_radio
+        self.batch_distances = batch_distances
+        self._grid_index = StayPointsGridIndex(distance_radio)
 
     def add(self, stay_point: StayPoint) -> StayPoint:
         """
@@ -31,26 +39,65 @@ class StayPointsDal(object):
 
         self.stay_points.append(stay_point)
         self.stay_points[-1].id_stay_point = len(self.stay_points)
+        self._grid_index.add(stay_point)
         return self.stay_points[-1]
 
+    def add_all(self, stay_points: List[StayPoint]) -> List[StayPoint]:
+        """
+        Adds several stay points to repository, e.g. when merging the stay points of several users
+        :param stay_points: The stay points to add, in order
+        :return: The stay points that could be added
+        """
+        added_stay_points = [self.add(stay_point) for stay_point in stay_points]
+        return [stay_point for stay_point in added_stay_points if stay_point is not None]
+
     def stay_point_already_exists(self, stay_point) -> bool:
         """
         Determines whether the specified stay point already exists in the repository
         :param stay_point: The stay point to check for.
         :return: True if the stay point already exists, False otherwise
         """
-        distances = list(map(lambda x: stay_point.distance_to(x), self.stay_points))
+        closest_stay_point, min_distance = self.get_closest_stay_point(stay_point, self.distance_radio)
+        return closest_stay_point is not None and min_distance < self.distance_radio
+
+    def get_closest_stay_point(self, stay_point: StayPoint,
+                               max_distance=None) -> Tuple[Union[StayPoint, None], Union[float, None]]:
+        """
+        Obtains the closest stay point of the repository to the specified one (the first one added on ties)
+        :param stay_point: The stay point to look around
+        :param max_distance: Only stay points within this distance (in meters) are looked for, None for any distance
+        :return: The closest stay point and its distance, (None, None) if there is none within max_distance
+        """
+        self._sync_grid_index()
+        if max_distance is None:
+            candidates = self.stay_points
+        else:
+            candidates = self._grid_index.get_candidates(stay_point.latitude, stay_point.longitude, max_distance)
+
+        if len(candidates) == 0:
+            return None, None
+
+        if self.batch_distances:
+            distances = geodesic.distances_to_point(stay_point.latitude, stay_point.longitude,
+                                                    [x.latitude for x in candidates],
+                                                    [x.longitude for x in candidates]).tolist()
+        else:
+            distances = list(map(lambda x: stay_point.distance_to(x), candidates))
 
-        if len(distances) > 0:
-            min_distance = min(distances)
+        min_distance = min(distances)
+        if max_distance is not None and min_distance > max_distance:
+            return None, None
 
-            if min_distance < self.distance_radio:
-                # index_of_min = distances.index(min_distance)
-                # closest_stay_point = self.stay_points[index_of_min]
-                # return closest_stay_point
-                return True
+        return candidates[distances.index(min_distance)], min_distance
 
-        return False
+    def _sync_grid_index(self):
+        """
+        Rebuilds the grid index if the list of stay points was modified directly
+        """
+        if len(self._grid_index) != len(self.stay_points):
+            self._grid_index = StayPointsGridIndex(self.distance_radio)
+            for stay_point in self.stay_points:
+                self._grid_index.add(stay_point)
 
     def get_all(self) -> List[StayPoint]:
         """
@@ -0,0 +1,106 @@
+import math
+from typing import Dict, List, Tuple
+
+from entities.StayPoint import StayPoint
+
+# Lower bound of the length of a degree of latitude (it is ~110574 m at the equator)
+METERS_PER_LATITUDE_DEGREE = 110000.0
+# Lower bound of the length of a degree of longitude at the equator, scaled by cos(latitude) elsewhere.
+# The extra 0.99 covers the sin(x) / x factor of the haversine bound for windows up to MAX_LONGITUDE_WINDOW
+METERS_PER_LONGITUDE_DEGREE = 111000.0 * 0.99
+MAX_LONGITUDE_WINDOW = 20.0
+MAX_INDEXED_LATITUDE = 89.0
+
+
+class StayPointsGridIndex(object):
+    """
+    A uniform latitude/longitude grid over stay points, with cells of (about) cell_distance meters of latitude.
+    Cells wrap around the antimeridian, the longitude size of cells is adjusted to divide 360 degrees.
+    It answers which stay points could be within a distance of a coordinate, every stay point that is actually
+    within that distance is reported (the search windows are conservative), so exact distances only need to be
+    computed for those candidates.
+    Near the poles, or for very large search windows, all of the stay points are reported.
+
+    Attributes:
+        cell_degrees: The latitude size of the cells, in degrees
+        cell_longitude_degrees: The longitude size of the cells, in degrees
+    """
+
+    def __init__(self, cell_distance: float):
+        """
+        Basic constructor
+        :param cell_distance: The size of the cells, in meters, usually the search distance
+        """
+        self.cell_degrees = max(cell_distance, 1.0) / METERS_PER_LATITUDE_DEGREE
+        self._longitude_cells = max(int(360.0 / self.cell_degrees), 1)
+        self.cell_longitude_degrees = 360.0 / self._longitude_cells
+        self._cells = {}  # type: Dict[Tuple[int, int], List[int]]
+        self._stay_points = []  # type: List[StayPoint]
+
+    def add(self, stay_point: StayPoint):
+        """
+        Registers a stay point in the grid, stay points are reported in the order they were added
+        :param stay_point: The stay point to register
+        """
+        self._cells.setdefault(self._cell_of(stay_point.latitude, stay_point.longitude), []).append(
+            len(self._stay_points))
+        self._stay_points.append(stay_point)
+
+    def get_candidates(self, latitude: float, longitude: float, distance: float) -> List[StayPoint]:
+        """
+        Obtains the stay points that could be within the specified distance of a coordinate
+        :param latitude: The latitude of the coordinate
+        :param longitude: The longitude of the coordinate
+        :param distance: The distance, in meters
+        :return: The candidate stay points, in the order they were added
+        """
+        return [self._stay_points[position] for position in
+                self.get_candidate_positions(latitude, longitude, distance)]
+
+    def get_candidate_positions(self, latitude: float, longitude: float, distance: float) -> List[int]:
+        """
+        Obtains the positions (order of addition, from 0) of the stay points that could be within the specified
+        distance of a coordinate
+        :param latitude: The latitude of the coordinate
+        :param longitude: The longitude of the coordinate
+        :param distance: The distance, in meters
+        :return: The sorted positions of the candidate stay points
+        """
+        latitude_window = distance / METERS_PER_LATITUDE_DEGREE
+        max_latitude = min(abs(latitude) + latitude_window, 90.0)
+        if max_latitude >= MAX_INDEXED_LATITUDE:
+            return list(range(0, len(self._stay_points)))
+
+        longitude_window = distance / (METERS_PER_LONGITUDE_DEGREE * math.cos(math.radians(max_latitude)))
+        if longitude_window >= MAX_LONGITUDE_WINDOW:
+            return list(range(0, len(self._stay_points)))
+
+        first_row, last_row = self._row_of(latitude - latitude_window), self._row_of(latitude + latitude_window)
+        first_column = self._unwrapped_column_of(longitude - longitude_window)
+        last_column = self._unwrapped_column_of(longitude + longitude_window)
+        positions = []
+        if (last_row - first_row + 1) * (last_column - first_column + 1) > len(self._cells):
+            # Fewer occupied cells than cells in the window, it's cheaper to go through the occupied ones
+            columns_span = last_column - first_column
+            for (row, column), cell_positions in self._cells.items():
+                if first_row <= row <= last_row and (column - first_column) % self._longitude_cells <= columns_span:
+                    positions.extend(cell_positions)
+        else:
+            columns = {column % self._longitude_cells for column in range(first_column, last_column + 1)}
+            for row in range(first_row, last_row + 1):
+                for column in columns:
+                    positions.extend(self._cells.get((row, column), []))
+
+        return sorted(positions)
+
+    def __len__(self):
+        return len(self._stay_points)
+
+    def _cell_of(self, latitude: float, longitude: float) -> Tuple[int, int]:
+        return self._row_of(latitude), self._unwrapped_column_of(longitude) % self._longitude_cells
+
+    def _row_of(self, latitude: float) -> int:
+        return int(math.floor(latitude / self.cell_degrees))
+
+    def _unwrapped_column_of(self, longitude: float) -> int:
+        return int(math.floor((longitude + 180.0) / self.cell_longitude_degrees))
@@ -1,19 +1,32 @@
-from typing import List
+from bisect import bisect_left, insort
+from typing import Dict, List, Union
 
 from entities.GpsFix import GpsFix
 from entities.Visit import Visit
 
 
+def _to_microseconds(seconds: float) -> int:
+    return int(round(seconds * 1000000))
+
+
 class VisitsDal(object):
     """
     Holds visits information to each stay point
 
     Attributes:
         visits: The list of visits performed
+    Visits are indexed by stay point: the positions of the visits of each stay point, and their stay times sorted, are
+    kept as visits are added and updated through the dal, so the first and last visits and the stay time aggregates of
+    a stay point are obtained without scanning the visits.
     """
 
     def __init__(self):
         self.visits = []  # type: List[Visit]
+        self._positions_by_stay_point = {}  # type: Dict[int, List[int]]
+        self._stay_times_by_stay_point = {}  # type: Dict[int, List[float]]
+        # Totals are kept in microseconds, so adding and removing stay times does not accumulate rounding errors
+        self._total_stay_microseconds_by_stay_point = {}  # type: Dict[int, int]
+        self._indexed_stay_times = []  # type: List[float]
 
     def add(self, visit: Visit) -> Visit:
         """
@@ -21,21 +34,117 @@ class VisitsDal(object):
         :param visit: The visit to add
         :return: The visit with updated id
         """
+        self._sync_index()
         self.visits.append(visit)
         self.visits[-1].id_visit = len(self.visits)
+        self._index_visit(len(self.visits) - 1)
         return self.visits[-1]
 
     def get_all(self) -> List[Visit]:
         return self.visits
 
     def update_last(self, pivot_departure_fix: GpsFix, detection_departure_fix: GpsFix):
-        last_visit = self.visits[-1]  # type: Visit
-        last_visit.pivot_departure_fix = pivot_departure_fix
-        last_visit.detection_departure_fix = detection_departure_fix
-        last_visit.update_stay_time()
+        self.update_visit(len(self.visits) - 1, pivot_departure_fix, detection_departure_fix)
 
     def update_visit(self, idx, pivot_departure_fix: GpsFix, detection_departure_fix: GpsFix):
+        self._sync_index()
+        idx = idx % len(self.visits)
         visit = self.visits[idx]
         visit.pivot_departure_fix = pivot_departure_fix
         visit.detection_departure_fix = detection_departure_fix
         visit.update_stay_time()
+        self._update_stay_time(idx)
+
+    def get_visit_positions(self, id_stay_point: int) -> List[int]:
+        """
+        Obtains the positions in visits of the visits of a stay point
+        :param id_stay_point: The id of the stay point
+        :return: The positions, in order (an empty list if the stay point has no visits)
+        """
+        self._sync_index()
+        return list(self._positions_by_stay_point.get(id_stay_point, []))
+
+    def get_first_visit(self, id_stay_point: int) -> Union[Visit, None]:
+        """
+        Obtains the first visit added for a stay point
+        :param id_stay_point: The id of the stay point
+        :return: The visit, None if the stay point has no visits
+        """
+        self._sync_index()
+        positions = self._positions_by_stay_point.get(id_stay_point)
+        return None if positions is None else self.visits[positions[0]]
+
+    def get_last_visit_position(self, id_stay_point: int) -> Union[int, None]:
+        """
+        Obtains the position of the last visit added for a stay point, the one still open if the user is there
+        :param id_stay_point: The id of the stay point
+        :return: The position of the visit in visits, None if the stay point has no visits
+        """
+        self._sync_index()
+        positions = self._positions_by_stay_point.get(id_stay_point)
+        return None if positions is None else positions[-1]
+
+    def get_visit_count(self, id_stay_point: int) -> int:
+        self._sync_index()
+        return len(self._positions_by_stay_point.get(id_stay_point, []))
+
+    def get_total_stay_time(self, id_stay_point: int) -> float:
+        """
+        Obtains the sum of the stay times (in seconds) of the visits of a stay point, 0 when it has no visits
+        """
+        self._sync_index()
+        return self._total_stay_microseconds_by_stay_point.get(id_stay_point, 0) / 1000000
+
+    def get_mean_stay_time(self, id_stay_point: int) -> Union[float, None]:
+        """
+        Obtains the mean stay time (in seconds) of the visits of a stay point, None when it has no visits
+        """
+        count = self.get_visit_count(id_stay_point)
+        return None if count == 0 else self._total_stay_microseconds_by_stay_point[id_stay_point] / 1000000 / count
+
+    def get_median_stay_time(self, id_stay_point: int) -> Union[float, None]:
+        """
+        Obtains the median stay time (in seconds) of the visits of a stay point, None when it has no visits
+        """
+        self._sync_index()
+        stay_times = self._stay_times_by_stay_point.get(id_stay_point)
+        if stay_times is None:
+            return None
+        middle = len(stay_times) // 2
+        return stay_times[middle] if len(stay_times) % 2 == 1 else (stay_times[middle - 1] + stay_times[middle]) / 2
+
+    def _index_visit(self, position: int):
+        """
+        Registers the visit at a position in the indexes, it must follow the ones already indexed
+        """
+        visit = self.visits[position]
+        self._positions_by_stay_point.setdefault(visit.id_stay_point, []).append(position)
+        insort(self._stay_times_by_stay_point.setdefault(visit.id_stay_point, []), visit.stay_time)
+        self._total_stay_microseconds_by_stay_point[visit.id_stay_point] = \
+            self._total_stay_microseconds_by_stay_point.get(visit.id_stay_point, 0) + _to_microseconds(visit.stay_time)
+        self._indexed_stay_times.append(visit.stay_time)
+
+    def _update_stay_time(self, position: int):
+        """
+        Replaces the stay time indexed for the visit at a position with its current one
+        """
+        visit = self.visits[position]
+        previous_stay_time = self._indexed_stay_times[position]
+        stay_times = self._stay_times_by_stay_point[visit.id_stay_point]
+        del stay_times[bisect_left(stay_times, previous_stay_time)]
+        insort(stay_times, visit.stay_time)
+        self._total_stay_microseconds_by_stay_point[visit.id_stay_point] += \
+            _to_microseconds(visit.stay_time) - _to_microseconds(previous_stay_time)
+        self._indexed_stay_times[position] = visit.stay_time
+
+    def _sync_index(self):
+        """
+        Rebuilds the indexes if the list of visits was modified directly
+        """
+        if len(self._indexed_stay_times) != len(self.visits):
+            self._positions_by_stay_point = {}
+            self._stay_times_by_stay_point = {}
+            self._total_stay_microseconds_by_stay_point = {}
+            self._indexed_stay_times = []
+            for position in range(0, len(self.visits)):
+                self._index_visit(position)
@@ -0,0 +1,115 @@
+from typing import List, Tuple
+
+import numpy as np
+
+from entities import geodesic
+from entities.FixArray import FixArray, epoch_to_datetime
+from entities.LiveStayPoint import LiveStayPoint
+
+
+class OfflineZhen(object):
+    """
+    Zhen algorithm for stay points detection over a whole trajectory, given as columns of coordinates and timestamps.
+    It finds the same segments than feeding StreamedZhen with every fix and then calling analyze_last_part, but the
+    fix leaving each candidate is searched with vectorized distances over windows of fixes that double their size
+    (galloping), so each fix is measured about once instead of one Python call per fix.
+
+    Attributes:
+        time_threshold: time threshold parameter (value is kept in milliseconds)
+        distance_threshold: distance threshold parameter
+        initial_window: the amount of fixes of the first window searched for each candidate
+    """
+
+    def __init__(self, time_threshold, distance_threshold, initial_window=256):
+        """
+        Basic constructor
+        :param time_threshold: Time threshold to employ (in seconds)
+        :param distance_threshold: Distance threshold to employ
+        :param initial_window: The amount of fixes of the first window searched for each candidate
+        """
+        self.time_threshold = time_threshold * 1000
+        self.distance_threshold = distance_threshold
+        self.initial_window = initial_window
+
+    def find_segments(self, latitude, longitude, timestamp) -> List[Tuple[int, int]]:
+        """
+        Finds the segments of the trajectory that are stay points
+        :param latitude: The latitudes of the fixes, in chronological order
+        :param longitude: The longitudes of the fixes
+        :param timestamp: The timestamps of the fixes, as seconds since the epoch
+        :return: The (first, last) indices of the fixes of each stay point, both included
+        """
+        latitude = np.asarray(latitude, dtype=np.float64)
+        longitude = np.asarray(longitude, dtype=np.float64)
+        timestamp = np.asarray(timestamp, dtype=np.float64)
+        size = len(latitude)
+
+        segments = []
+        anchor = 0
+        while size - anchor > 1:
+            leaving = self._find_leaving_fix(latitude, longitude, anchor)
+            if leaving is None:
+                # The last part is a stay point with any length, as StreamedZhen.analyze_last_part does
+                segments.append((anchor, size - 1))
+                break
+
+            if abs(timestamp[leaving] - timestamp[anchor]) * 1000 > self.time_threshold:
+                segments.append((anchor, leaving))
+            anchor = leaving
+
+        return segments
+
+    def analyze_locations(self, latitude, longitude, timestamp) -> List[LiveStayPoint]:
+        """
+        Detects the stay points of a trajectory
+        :param latitude: The latitudes of the fixes, in chronological order
+        :param longitude: The longitudes of the fixes
+        :param timestamp: The timestamps of the fixes, as seconds since the epoch
+        :return: The stay points found, the same StreamedZhen finds
+        """
+        latitude = np.asarray(latitude, dtype=np.float64)
+        longitude = np.asarray(longitude, dtype=np.float64)
+        timestamp = np.asarray(timestamp, dtype=np.float64)
+        return [self._create_stay_point(latitude, longitude, timestamp, first, last)
+                for first, last in self.find_segments(latitude, longitude, timestamp)]
+
+    def analyze_fix_array(self, fixes: FixArray) -> List[LiveStayPoint]:
+        """
+        Detects the stay points of a columnar trajectory, every row is considered (see FixArray.get_valid_mask)
+        :param fixes: The trajectory
+        :return: The stay points found, the same StreamedZhen finds
+        """
+        return self.analyze_locations(fixes.latitude, fixes.longitude, fixes.timestamp)
+
+    def _find_leaving_fix(self, latitude: np.ndarray, longitude: np.ndarray, anchor: int):
+        """
+        Finds the first fix after the anchor that is farther than the distance threshold from it
+        :return: Its index, None if every fix until the end is within the distance threshold
+        """
+        start = anchor + 1
+        window = self.initial_window
+        while start < len(latitude):
+            end = min(start + window, len(latitude))
+            distances = geodesic.distances_to_point(latitude[anchor], longitude[anchor],
+                                                    latitude[start:end], longitude[start:end])
+            leaving = np.flatnonzero(distances > self.distance_threshold)
+            if len(leaving) > 0:
+                return start + int(leaving[0])
+            start = end
+            window *= 2
+
+        return None
+
+    @staticmethod
+    def _create_stay_point(latitude: np.ndarray, longitude: np.ndarray, timestamp: np.ndarray, first: int,
+                           last: int) -> LiveStayPoint:
+        """
+        Creates the stay point of a segment. The coordinates are summed one after the other (cumulative sums), as
+        LiveStayPoint.create_from_sublist does, so the mean is exactly the same
+        """
+        amount_of_fixes = last - first + 1
+        sum_latitude = np.cumsum(latitude[first:last + 1])[-1]
+        sum_longitude = np.cumsum(longitude[first:last + 1])[-1]
+        return LiveStayPoint(float(sum_latitude) / amount_of_fixes, float(sum_longitude) / amount_of_fixes,
+                             epoch_to_datetime(timestamp[first]), epoch_to_datetime(timestamp[last]), 0,
+                             amount_of_fixes)
@@ -1,44 +1,122 @@
-from typing import List
+from typing import List, Tuple
 
+from entities import geodesic
 from entities.GpsFix import GpsFix
 from entities.LiveStayPoint import LiveStayPoint
 
 
 class StreamedZhen(object):
     """
-    Zhen live algorithm for stay points detection. It works buffering fixes,
-    as the accumulation of coordinates might lead to overflow of values.
+    Zhen live algorithm for stay points detection. By default it works buffering the fixes of the current candidate
+    stay point. Without keep_fixes, it only keeps the amount of fixes of the candidate, its first and last fixes and
+    running sums of their coordinates, compensated (Neumaier summation) so that accumulating the coordinates of a long
+    stay does not lose precision, then memory does not grow with the length of stays and no list of fixes is returned.
 
     Attributes:
         time_threshold: time threshold parameter (value is kept in milliseconds)
         distance_threshold: distance threshold parameter
         verbose: print internal states-task details
+        keep_fixes: whether the fixes of the candidate are buffered (and returned along with each stay point)
+        initial_window: the amount of fixes analyze_locations checks one by one for each candidate before batching
     """
 
-    def __init__(self, time_threshold, distance_threshold, verbose=False):
+    def __init__(self, time_threshold, distance_threshold, verbose=False, keep_fixes=True, initial_window=64):
         """
         Basic constructor
         :param time_threshold: Time threshold to employ (in seconds)
         :param distance_threshold:  Distance threshold to employ
         :param verbose: print task details
+        :param keep_fixes: Whether to buffer the fixes of the candidate, or just keep running sums of them
+        :param initial_window: The amount of fixes analyze_locations checks one by one for each candidate before batching
         """
         self.list_of_fixes = []  # type List[StayPointInAlgorithm]
         self.time_threshold = time_threshold * 1000
         self.distance_threshold = distance_threshold
         self.verbose = verbose
+        self.keep_fixes = keep_fixes
+        self.initial_window = initial_window
+        self._amount_of_fixes = 0
+        self._first_fix = None  # type: GpsFix
+        self._last_fix = None  # type: GpsFix
+        self._sum_latitude = 0.0
+        self._sum_longitude = 0.0
+        self._compensation_latitude = 0.0
+        self._compensation_longitude = 0.0
 
     def analyze_location(self, gps_fix: GpsFix) -> (LiveStayPoint, List[GpsFix]):
         """
         Process the given GpsFix
         :param gps_fix: The fix to analyze
-        :return: A StayPoint if found with the current GpsFix, and the list of involved fixes
+        :return: A StayPoint if found with the current GpsFix, and the list of involved fixes (None without keep_fixes)
         """
+        if not self.keep_fixes:
+            return self._analyze_location_with_sums(gps_fix)
+
         self.list_of_fixes.append(gps_fix)
         if len(self.list_of_fixes) == 1:
             return None, None
         else:
             return self._process_live()
 
+    def analyze_locations(self, gps_fixes: List[GpsFix]) -> List[Tuple[LiveStayPoint, List[GpsFix]]]:
+        """
+        Process the given GpsFixes as analyze_location would do one by one, but computing in batches the distances
+        of the fixes to the fix that anchors the current candidate stay point
+        :param gps_fixes: The fixes to analyze, in chronological order
+        :return: A list with a (StayPoint, involved fixes) tuple per stay point found
+        """
+        if not self.keep_fixes:
+            return self._analyze_locations_with_sums(gps_fixes)
+
+        results = []
+        start = 0
+        if len(self.list_of_fixes) == 0 and len(gps_fixes) > 0:
+            self.list_of_fixes.append(gps_fixes[0])
+            start = 1
+
+        while start < len(gps_fixes):
+            pi = self.list_of_fixes[0]
+            end = self._find_leaving_fix(pi, gps_fixes, start)
+            if end is None:
+                self.list_of_fixes.extend(gps_fixes[start:])
+                break
+
+            self.list_of_fixes.extend(gps_fixes[start:end + 1])
+            stay_point, list_of_fixes = self._close_candidate(pi, gps_fixes[end])
+            if stay_point is not None:
+                results.append((stay_point, list_of_fixes))
+            start = end + 1
+
+        return results
+
+    def _find_leaving_fix(self, pi: GpsFix, gps_fixes: List[GpsFix], start: int):
+        """
+        Finds the first fix from start on that is farther than the distance threshold from pi. The first initial_window
+        fixes are checked one by one (a moving trajectory leaves right away, and a batch costs as much as dozens of
+        single distances), then the distances are computed in batches over windows that double in size, so that at
+        most about twice the fixes until the leaving one are measured
+        :return: Its index, None if every fix until the end is within the distance threshold
+        """
+        for index in range(start, min(start + self.initial_window, len(gps_fixes))):
+            if pi.distance_to(gps_fixes[index]) > self.distance_threshold:
+                return index
+
+        start += self.initial_window
+        window = 4 * self.initial_window
+        while start < len(gps_fixes):
+            end = min(start + window, len(gps_fixes))
+            window_fixes = gps_fixes[start:end]
+            distances = geodesic.distances_to_point(pi.latitude, pi.longitude,
+                                                    [fix.latitude for fix in window_fixes],
+                                                    [fix.longitude for fix in window_fixes])
+            leaving = (distances > self.distance_threshold).nonzero()[0]
+            if len(leaving) > 0:
+                return start + int(leaving[0])
+            start = end
+            window *= 2
+
+        return None
+
     def _process_live(self) -> (LiveStayPoint, List[GpsFix]):
         """
         Live processing of specified fix
@@ -50,20 +128,30 @@ class StreamedZhen(object):
         distance = pi.distance_to(pj)
 
         if distance > self.distance_threshold:
-            time_difference = pi.time_difference(pj)
-
-            if time_difference > self.time_threshold:
-                stay_point = LiveStayPoint.create_from_list(self.list_of_fixes)
-                if self.verbose:
-                    print('Stay point {} created, involved fixes are'.format(stay_point))
-                    for x in self.list_of_fixes:
-                        print(x)
-                copy_of_list = self.list_of_fixes
-                self.clean_list(pj)
-                return stay_point, copy_of_list
+            return self._close_candidate(pi, pj)
+
+        return None, None
+
+    def _close_candidate(self, pi: GpsFix, pj: GpsFix) -> (LiveStayPoint, List[GpsFix]):
+        """
+        Closes the current candidate once pj went farther than the distance threshold from pi
+        :param pi: The fix anchoring the candidate
+        :param pj: The fix leaving the candidate (already appended to the list of fixes)
+        :return: A StayPointInAlgorithm object and its fixes if the time threshold is met, (None, None) otherwise
+        """
+        time_difference = pi.time_difference(pj)
 
+        if time_difference > self.time_threshold:
+            stay_point = LiveStayPoint.create_from_list(self.list_of_fixes)
+            if self.verbose:
+                print('Stay point {} created, involved fixes are'.format(stay_point))
+                for x in self.list_of_fixes:
+                    print(x)
+            copy_of_list = self.list_of_fixes
             self.clean_list(pj)
+            return stay_point, copy_of_list
 
+        self.clean_list(pj)
         return None, None
 
     def analyze_last_part(self) -> (LiveStayPoint, List[GpsFix]):
@@ -72,6 +160,9 @@ class StreamedZhen(object):
         Should be called when there are not going to be more fixes anymore
         :return: A StayPointInAlgorithm object if found
         """
+        if not self.keep_fixes:
+            return self._analyze_last_part_with_sums()
+
         if len(self.list_of_fixes) == 0 or len(self.list_of_fixes) == 1:
             return None, None
 
@@ -92,3 +183,102 @@ class StreamedZhen(object):
         self.list_of_fixes.append(gps_fix)
         if self.verbose:
             print("Cleaning the list and adding", gps_fix)
+
+    def _analyze_location_with_sums(self, gps_fix: GpsFix) -> (LiveStayPoint, None):
+        if self._amount_of_fixes == 0:
+            self._restart_sums(gps_fix)
+            return None, None
+
+        self._add_to_sums(gps_fix)
+        if self._first_fix.distance_to(gps_fix) > self.distance_threshold:
+            return self._close_candidate_with_sums(gps_fix)
+
+        return None, None
+
+    def _analyze_locations_with_sums(self, gps_fixes: List[GpsFix]) -> List[Tuple[LiveStayPoint, None]]:
+        results = []
+        start = 0
+        if self._amount_of_fixes == 0 and len(gps_fixes) > 0:
+            self._restart_sums(gps_fixes[0])
+            start = 1
+
+        while start < len(gps_fixes):
+            end = self._find_leaving_fix(self._first_fix, gps_fixes, start)
+            for fix in gps_fixes[start:] if end is None else gps_fixes[start:end + 1]:
+                self._add_to_sums(fix)
+            if end is None:
+                break
+
+            stay_point, _ = self._close_candidate_with_sums(gps_fixes[end])
+            if stay_point is not None:
+                results.append((stay_point, None))
+            start = end + 1
+
+        return results
+
+    def _close_candidate_with_sums(self, pj: GpsFix) -> (LiveStayPoint, None):
+        """
+        Closes the current candidate once pj (already added to the sums) went farther than the distance threshold
+        from its first fix, as _close_candidate does with the buffered fixes
+        """
+        stay_point = None
+        if self._first_fix.time_difference(pj) > self.time_threshold:
+            stay_point = self._create_stay_point_from_sums()
+            if self.verbose:
+                print('Stay point {} created'.format(stay_point))
+
+        self._restart_sums(pj)
+        if self.verbose:
+            print("Cleaning the list and adding", pj)
+        return stay_point, None
+
+    def _analyze_last_part_with_sums(self) -> (LiveStayPoint, None):
+        if self._amount_of_fixes <= 1:
+            return None, None
+
+        if self.verbose:
+            print('Building a stay point in last part with ', self._amount_of_fixes, ' fixes.')
+
+        stay_point = self._create_stay_point_from_sums()
+        self._amount_of_fixes = 0
+        self._first_fix = None
+        self._last_fix = None
+        return stay_point, None
+
+    def _create_stay_point_from_sums(self) -> LiveStayPoint:
+        return LiveStayPoint.create_from_sums(self._sum_latitude + self._compensation_latitude,
+                                              self._sum_longitude + self._compensation_longitude,
+                                              self._amount_of_fixes, self._first_fix, self._last_fix)
+
+    def _restart_sums(self, gps_fix: GpsFix):
+        self._amount_of_fixes = 1
+        self._first_fix = gps_fix
+        self._last_fix = gps_fix
+        self._sum_latitude = gps_fix.latitude
+        self._sum_longitude = gps_fix.longitude
+        self._compensation_latitude = 0.0
+        self._compensation_longitude = 0.0
+
+    def _add_to_sums(self, gps_fix: GpsFix):
+        """
+        Adds a fix to the candidate, with Neumaier summation: the low order bits lost by each addition are kept in a
+        compensation term, added to the sum once the stay point is created
+        """
+        self._amount_of_fixes += 1
+        self._last_fix = gps_fix
+
+        value = gps_fix.latitude
+        total = self._sum_latitude + value
+        if abs(self._sum_latitude) >= abs(value):
+            self._compensation_latitude += (self._sum_latitude - total) + value
+        else:
+            self._compensation_latitude += (value - total) + self._sum_latitude
+        self._sum_latitude = total
+
+        value = gps_fix.longitude
+        total = self._sum_longitude + value
+        if abs(self._sum_longitude) >= abs(value):
+            self._compensation_longitude += (self._sum_longitude - total) + value
+        else:
+            self._compensation_longitude += (value - total) + self._sum_longitude
+        self._sum_longitude = total
@@ -0,0 +1,50 @@
+from stm import spatial_time_model_file
+from stm.SpatialTimeModelNode import SpatialTimeModelNode
+
+
+class LazySpatialTimeModelNode(SpatialTimeModelNode):
+    """
+    A node of a SpatialTimeModelStore. Its attributes are read from the store the first time they are accessed and
+    then kept as plain attributes, so the node can be modified (fused, given children...) as any other node: the
+    parent and the children are built when they are first reached, and so are the lists of times of day.
+    """
+
+    def __init__(self, store, row: int):
+        """
+        Basic constructor, no attribute is read yet
+        :param store: The SpatialTimeModelStore of the node
+        :param row: The position of the node in the store
+        """
+        # The constructor of SpatialTimeModelNode is not called, every attribute is read on demand
+        self._store = store
+        self._row = row
+
+    def __getattr__(self, name):
+        # Only called for attributes that were not read yet
+        if name.startswith('_'):
+            raise AttributeError(name)
+
+        if name == 'children':
+            self.children = [self._store.get_node(row) for row in self._store.get_children_rows(self._row)]
+        elif name in spatial_time_model_file.TODS_FIELDS:
+            for field, tods in zip(spatial_time_model_file.TODS_FIELDS, self._store.get_tods(self._row)):
+                self.__dict__.setdefault(field, tods)
+        elif name in spatial_time_model_file.NODE_FIELDS:
+            self._read_fields()
+        else:
+            raise AttributeError(name)
+
+        return self.__dict__[name]
+
+    def _read_fields(self):
+        """
+        Reads the parent, the ids, the consolidated times of day and the use counter, the ones already read (and maybe
+        modified) are kept
+        """
+        values = dict(zip(spatial_time_model_file.NODE_FIELDS, self._store.get_row(self._row)))
+        parent_row = values['parent']
+        values['parent'] = None if parent_row < 0 else self._store.get_node(parent_row)
+        for field in ('parent', 'id_sp_origin', 'id_sp_destination', 'use_counter'):
+            self.__dict__.setdefault(field, values[field])
+        for field in spatial_time_model_file.TIME_FIELDS:
+            self.__dict__.setdefault(field, spatial_time_model_file.microseconds_to_time(values[field]))
@@ -0,0 +1,39 @@
+from datetime import time
+
+from stm.SpatialTimeModelNode import SpatialTimeModelNode
+
+
+class NextPlace(object):
+    """
+    A destination the user may go to next from a stay point, as answered by SpatialTimeModelQueryIndex
+
+    Attributes:
+        id_sp_destination: The id of the destination stay point
+        use_counter: The sum of the use counters of the nodes going to the destination within the queried horizon
+        probability: The share of use_counter among all of the destinations within the queried horizon
+        node: The node of the first departure to the destination after the queried time of day
+    """
+
+    def __init__(self, id_sp_destination: int, use_counter: int, probability: float, node: SpatialTimeModelNode):
+        self.id_sp_destination = id_sp_destination
+        self.use_counter = use_counter
+        self.probability = probability
+        self.node = node
+
+    @property
+    def departure_time(self) -> time:
+        """
+        The expected departure from the origin stay point
+        """
+        return self.node.consolidated_t_out_origin
+
+    @property
+    def arrival_time(self) -> time:
+        """
+        The expected arrival at the destination stay point
+        """
+        return self.node.consolidated_t_in_dest
+
+    def __str__(self):
+        return '{} at {} ({} uses, {:.2f})'.format(self.id_sp_destination, self.departure_time, self.use_counter,
+                                                   self.probability)
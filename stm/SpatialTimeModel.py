@@ -1,4 +1,5 @@
-from typing import List
+from collections import deque
+from typing import Iterator
 
 from stm.SpatialTimeModelNode import SpatialTimeModelNode
 
@@ -9,21 +10,37 @@ class SpatialTimeModel(object):
         self._traverse_result = []
 
     def bread_first_traversal_recursive(self):
-        spatial_time_model_nodes = [self.root_node]
-        self._traverse_result = []
-        self._do_bfs_recursive(spatial_time_model_nodes)
+        self._traverse_result = list(self.breadth_first_traversal())
         return self._traverse_result
 
-    def _do_bfs_recursive(self, nodes: List[SpatialTimeModelNode]):
-        if nodes is not None and len(nodes) > 0:
-            children = []
-            for node in nodes:
-                self._traverse_result.append(node)
-                children_current_node = node.children
-                if children_current_node is not None and len(children_current_node) > 0:
-                    children.extend(children_current_node)
+    def breadth_first_traversal(self) -> Iterator[SpatialTimeModelNode]:
+        """
+        Traverses the tree level by level, without recursion, so the depth of the tree is not limited
+        :return: A generator of the nodes, in breadth first order (the order of bread_first_traversal_recursive)
+        """
+        if self.root_node is None:
+            return
+        pending_nodes = deque([self.root_node])
+        while len(pending_nodes) > 0:
+            node = pending_nodes.popleft()
+            yield node
+            if node.children is not None:
+                pending_nodes.extend(node.children)
 
-            self._do_bfs_recursive(children)
+    def depth_first_traversal(self) -> Iterator[SpatialTimeModelNode]:
+        """
+        Traverses the tree branch by branch, without recursion, so the depth of the tree is not limited
+        :return: A generator of the nodes, in depth first pre-order (each node before its children, which are visited
+        in the order of the children list)
+        """
+        if self.root_node is None:
+            return
+        pending_nodes = [self.root_node]
+        while len(pending_nodes) > 0:
+            node = pending_nodes.pop()
+            yield node
+            if node.children is not None:
+                pending_nodes.extend(reversed(node.children))
 
     def __str__(self):
         self.bread_first_traversal_recursive()
@@ -1,12 +1,15 @@
-from typing import List
+from bisect import bisect_left, bisect_right, insort
+from datetime import time
+from typing import List, Dict, Tuple
 
 import Utils
-from stm.PossibleParentNode import PossibleParentNode
 from stm.SpatialTimeModel import SpatialTimeModel
 from stm.SpatialTimeModelNode import SpatialTimeModelNode
 from stm.TransitionMatrix import TransitionMatrix
 from stm.TransitionMatrixEntry import TransitionMatrixEntry
 
+MINUTES_PER_DAY = 1440
+
 
 def build_flat_list_of_visits(transition_matrices: List[TransitionMatrix]) -> List[TransitionMatrixEntry]:
     flat_visits = []
@@ -21,32 +24,104 @@ def build_flat_list_of_visits(transition_matrices: List[TransitionMatrix]) -> Li
     return flat_visits
 
 
+def _minutes_of_day(tod: time) -> float:
+    """
+    Converts a time of day into minutes elapsed since midnight
+    :param tod: The time of day to convert
+    :return: The minutes since midnight, seconds and microseconds as fractions
+    """
+    return tod.hour * 60 + tod.minute + tod.second / 60.0 + tod.microsecond / 60000000.0
+
+
 class SpatialTimeModelBuilder(object):
-    def __init__(self, transition_matrices: List[TransitionMatrix], delta_time_minutes, t_fusion_mode):
+    """
+    Builds a spatial time model by allocating each transition into a growing tree.
+
+    Besides the tree itself, the builder keeps two incremental indexes so that allocating a node does not require
+    traversing the whole tree:
+        - nodes keyed by (id_sp_origin, id_sp_destination), sorted by consolidated departure from origin
+        - nodes keyed by id_sp_destination, sorted by consolidated departure from destination
+    Each index entry carries the breadth first position of the node, so ties are resolved exactly as a BFS
+    traversal of the tree would resolve them.
+
+    The builder can also start from an existing model (built before, or loaded with spatial_time_model_file) and
+    allocate only the transitions of new matrices into it, see update_spatial_time_model. Allocating the new
+    transitions into the model built from the previous ones gives the same tree as building it again from all of
+    them, as transitions are allocated one after the other in the order of the matrices.
+    """
+
+    def __init__(self, transition_matrices: List[TransitionMatrix], delta_time_minutes, t_fusion_mode,
+                 spatial_time_model: SpatialTimeModel = None):
         """
         Basic constructor
         :param transition_matrices: The transition matrices representing all of the mobility data windows.
         :param delta_time_minutes: The time interval used for considering similarities of nodes during.
         :param t_fusion_mode: The time fusion mode to employ when consolidating different dates.
+        :param spatial_time_model: An existing model, built with the same delta_time_minutes and t_fusion_mode from
+        the matrices preceding these ones. Its nodes are modified in place as transitions are allocated into it.
         """
         self._delta_t_minutes = delta_time_minutes
         self._t_fusion_mode = t_fusion_mode
         self._transition_matrices = transition_matrices
         self._all_transitions = build_flat_list_of_visits(transition_matrices)
         self._root_node = None
+        self._bfs_keys = {}  # type: Dict[SpatialTimeModelNode, Tuple]
+        self._indexed_minutes = {}  # type: Dict[SpatialTimeModelNode, Tuple[float, float]]
+        self._nodes_by_transition = {}  # type: Dict[Tuple[int, int], List[Tuple[float, Tuple, SpatialTimeModelNode]]]
+        self._nodes_by_destination = {}  # type: Dict[int, List[Tuple[float, Tuple, SpatialTimeModelNode]]]
+        if spatial_time_model is not None and spatial_time_model.root_node is not None:
+            self._index_tree(spatial_time_model.root_node)
 
     def build_expanded_spatial_time_model(self) -> SpatialTimeModel:
         """
         Builds an expanded spatial time model from the transition matrices and deltaTimeMinutes specified in constructor call.
+        When the builder was given an existing model, the transitions are allocated into it.
         :return: An expanded spatial time model object reference.
         """
-        for transition in self._all_transitions:
+        self._allocate_transitions(self._all_transitions)
+        return SpatialTimeModel(self._root_node)
+
+    def update_spatial_time_model(self, transition_matrices: List[TransitionMatrix]) -> SpatialTimeModel:
+        """
+        Allocates the transitions of new matrices into the model, which must already hold the transitions of the
+        matrices preceding them. Only the new transitions are processed, so the builder can be kept and updated with
+        each new window of data.
+        :param transition_matrices: The transition matrices following the ones already in the model.
+        :return: The updated model, its nodes are the ones of the previous model.
+        """
+        self._transition_matrices = self._transition_matrices + transition_matrices
+        self._allocate_transitions(build_flat_list_of_visits(transition_matrices))
+        return SpatialTimeModel(self._root_node)
+
+    def _allocate_transitions(self, transitions: List[TransitionMatrixEntry]):
+        """
+        Allocates each transition into the tree, the first one becomes the root of an empty tree
+        :param transitions: The transitions, in allocation order
+        """
+        for transition in transitions:
             baby_node = SpatialTimeModelNode.build_from_transition_entry(self._root_node, transition)
             if self._root_node is None:
                 self._root_node = baby_node
+                self._index_node(baby_node, (0, ()))
             else:
                 self._allocate_node_in_tree(baby_node)
-        return SpatialTimeModel(self._root_node)
+
+    def _index_tree(self, root_node: SpatialTimeModelNode):
+        """
+        Registers every node of an existing tree in the lookup indexes, level by level
+        :param root_node: The root of the tree
+        """
+        self._root_node = root_node
+        self._index_node(root_node, (0, ()))
+        level = [root_node]
+        while len(level) > 0:
+            next_level = []
+            for node in level:
+                depth, path = self._bfs_keys[node]
+                for position, child in enumerate(node.children):
+                    self._index_node(child, (depth + 1, path + (position,)))
+                    next_level.append(child)
+            level = next_level
 
     def _allocate_node_in_tree(self, new_node: SpatialTimeModelNode):
         """
@@ -56,44 +131,49 @@ class SpatialTimeModelBuilder(object):
         """
         target_node = self._search_target_node(new_node)  # type: SpatialTimeModelNode
         if target_node is None:
-            possible_parents = self._find_possible_parents(new_node)
-            parent = possible_parents[0] if len(possible_parents) > 0 else None  # type: SpatialTimeModelNode
+            parent = self._find_closest_parent(new_node)  # type: SpatialTimeModelNode
 
             if parent is None:
                 print('The new node might represent a new root!, not implemented yet! ' + str(new_node))
             else:
                 new_node.parent = parent
                 parent.add_child(new_node)
+                depth, path = self._bfs_keys[parent]
+                self._index_node(new_node, (depth + 1, path + (len(parent.children) - 1,)))
         else:
+            self._unindex_node(target_node)
             target_node.fuse_with_node(new_node, self._t_fusion_mode)
+            self._index_node(target_node, self._bfs_keys[target_node])
 
-    def _find_possible_parents(self, node: SpatialTimeModelNode) -> List[SpatialTimeModelNode]:
+    def _find_closest_parent(self, node: SpatialTimeModelNode) -> SpatialTimeModelNode:
         """
-        Finds a list of possible parent nodes for the specified node.
-        Parents are ordered by increasing time difference.
-        :param node: The node for which to find a parent is needed
-        :return: The list of possible parent nodes for the specified node.
+        Obtains the node arriving at the origin of the specified one with the closest departure time, ties are kept
+        in BFS order, without sorting the whole bucket.
+        Only the entries around the closest departure times (straight and across midnight) are evaluated.
+        :param node: The node for which a parent is needed
+        :return: The closest parent node or None if there is no node arriving at the origin of the specified one
         """
-        nodes_in_model = self._get_entries_in_tree()  # type: List[SpatialTimeModelNode]
-
-        # Try to sort in order of time closeness to the argument node
-        possible_parents = []  # type:  List[PossibleParentNode]
+        bucket = self._nodes_by_destination.get(node.id_sp_origin)
+        if not bucket:
+            return None
 
-        for node_in_tree in nodes_in_model:
-            if node_in_tree.id_sp_destination == node.id_sp_origin:
-                abs_time_diff = Utils.minutes_difference(node_in_tree.consolidated_t_out_dest,
-                                                         node.consolidated_t_out_origin)
-                # This works as
-                # abs_time_diff = node_in_tree.getConsolidatedDepartureFromDestinationToD().minutesDifferenceWith(node.getConsolidatedDepartureFromOriginToD());
-                possible_parents.append(PossibleParentNode(abs_time_diff, node_in_tree))
+        query = _minutes_of_day(node.consolidated_t_out_origin)
+        position = bisect_left(bucket, (query,))
+        neighbours = [bucket[i][0] for i in (position - 1, position, 0, len(bucket) - 1) if 0 <= i < len(bucket)]
 
-        possible_parents.sort(key=lambda x: x.absolute_time_difference)
-        ordered_parent_nodes = []  # type:  List[SpatialTimeModelNode]
+        linear_gap = min(abs(minutes - query) for minutes in neighbours)
+        circular_gap = min(min(abs(minutes - query), MINUTES_PER_DAY - abs(minutes - query))
+                           for minutes in neighbours)
 
-        for parent in possible_parents:
-            ordered_parent_nodes.append(parent.spatial_time_model_node)
+        # Two extra minutes on each band: when the seconds are dropped, a node whose difference ties with the closest
+        # one (and which may come first in BFS order) can be up to two minutes farther than it
+        candidates = self._entries_around(bucket, query, linear_gap + 2)
+        candidates.extend(self._entries_around(bucket, query, circular_gap + 2))
 
-        return ordered_parent_nodes
+        best_entry = min(candidates,
+                         key=lambda entry: (Utils.minutes_difference(entry[2].consolidated_t_out_dest,
+                                                                     node.consolidated_t_out_origin), entry[1]))
+        return best_entry[2]
 
     def _search_target_node(self, node: SpatialTimeModelNode) -> SpatialTimeModelNode:
         """
@@ -101,19 +181,64 @@ class SpatialTimeModelBuilder(object):
         :param node: The node to whom a similar node will be obtained.
         :return: A similar node or null if none is found.
         """
-        entries_in_tree = self._get_entries_in_tree()  # type: List[SpatialTimeModelNode]
+        bucket = self._nodes_by_transition.get((node.id_sp_origin, node.id_sp_destination))
+        if not bucket:
+            return None
 
-        for currentNode in entries_in_tree:
-            if node.is_equivalent_to(currentNode, self._delta_t_minutes):
-                return currentNode
+        query = _minutes_of_day(node.consolidated_t_out_origin)
+        candidates = self._entries_around(bucket, query, self._delta_t_minutes + 1)
 
-        return None
+        equivalent_entries = [entry for entry in candidates if node.is_equivalent_to(entry[2], self._delta_t_minutes)]
+        if len(equivalent_entries) == 0:
+            return None
 
-    def _get_entries_in_tree(self):
+        return min(equivalent_entries, key=lambda entry: entry[1])[2]
+
+    @staticmethod
+    def _entries_around(bucket, query: float, radius: float) -> List[Tuple[float, Tuple, SpatialTimeModelNode]]:
+        """
+        Obtains the entries of a sorted bucket whose minutes are within radius of the query, wrapping midnight
+        :param bucket: The sorted bucket to look into
+        :param query: The time of day (in minutes) to look around
+        :param radius: The maximum distance in minutes
+        :return: The list of entries within the radius (duplicates are possible when ranges overlap)
         """
-        Gets the nodes inside the current tree
-        :return: The list of nodes of the trees, in a BFS fashion
+        if 2 * radius >= MINUTES_PER_DAY:
+            return list(bucket)
+
+        entries = []
+        for shift in (-MINUTES_PER_DAY, 0, MINUTES_PER_DAY):
+            low = bisect_left(bucket, (query - radius + shift,))
+            high = bisect_right(bucket, (query + radius + shift, (float('inf'),)))
+            entries.extend(bucket[low:high])
+
+        return entries
+
+    def _index_node(self, node: SpatialTimeModelNode, bfs_key: Tuple):
         """
-        stm = SpatialTimeModel(self._root_node)
-        nodes_in_model = stm.bread_first_traversal_recursive()
-        return nodes_in_model
+        Registers the node in the lookup indexes
+        :param node: The node to register
+        :param bfs_key: The breadth first position of the node as (depth, path of children positions from root)
+        """
+        self._bfs_keys[node] = bfs_key
+        minutes_out_origin = _minutes_of_day(node.consolidated_t_out_origin)
+        minutes_out_dest = _minutes_of_day(node.consolidated_t_out_dest)
+        self._indexed_minutes[node] = (minutes_out_origin, minutes_out_dest)
+
+        insort(self._nodes_by_transition.setdefault((node.id_sp_origin, node.id_sp_destination), []),
+               (minutes_out_origin, bfs_key, node))
+        insort(self._nodes_by_destination.setdefault(node.id_sp_destination, []),
+               (minutes_out_dest, bfs_key, node))
+
+    def _unindex_node(self, node: SpatialTimeModelNode):
+        """
+        Removes the node from the lookup indexes (its BFS position is kept), needed before its times change
+        :param node: The node to remove
+        """
+        bfs_key = self._bfs_keys[node]
+        minutes_out_origin, minutes_out_dest = self._indexed_minutes.pop(node)
+
+        transition_bucket = self._nodes_by_transition[(node.id_sp_origin, node.id_sp_destination)]
+        del transition_bucket[bisect_left(transition_bucket, (minutes_out_origin, bfs_key))]
+        destination_bucket = self._nodes_by_destination[node.id_sp_destination]
+        del destination_bucket[bisect_left(destination_bucket, (minutes_out_dest, bfs_key))]
@@ -0,0 +1,122 @@
+from datetime import time
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+from stm.NextPlace import NextPlace
+from stm.SpatialTimeModel import SpatialTimeModel
+from stm.SpatialTimeModelNode import SpatialTimeModelNode
+from stm.spatial_time_model_file import time_to_microseconds
+
+MICROSECONDS_PER_DAY = 24 * 60 * 60 * 1000000
+
+
+class SpatialTimeModelQueryIndex(object):
+    """
+    Answers where a user goes next from a stay point, and when, out of the nodes of a spatial time model.
+
+    The nodes are grouped by origin stay point and sorted by consolidated departure from it. For each origin, two
+    tables with a column per destination are kept: the running sum of the use counters along the departures, and the
+    position of the next departure to each destination from each position. A query is then a binary search of the
+    time of day plus a lookup in those tables, the cost does not depend on the amount of nodes of the origin. Times of
+    day are handled as microseconds since midnight, departures after midnight follow the ones before it.
+    The index is built once, it does not follow later changes of the model.
+    """
+
+    def __init__(self, model: SpatialTimeModel):
+        """
+        Basic constructor, indexes every node of the model
+        :param model: The spatial time model
+        """
+        nodes_by_origin = {}  # type: Dict[int, List[SpatialTimeModelNode]]
+        for node in model.breadth_first_traversal():
+            nodes_by_origin.setdefault(node.id_sp_origin, []).append(node)
+        self._origins = {id_sp_origin: self._index_origin(nodes) for id_sp_origin, nodes in nodes_by_origin.items()}
+
+    @staticmethod
+    def _index_origin(nodes: List[SpatialTimeModelNode]) -> Tuple:
+        """
+        Builds the tables of the nodes of an origin
+        :param nodes: The nodes leaving the origin, in breadth first order
+        :return: The departures (sorted, ties in breadth first order), the nodes in that order, the destination ids,
+        the running use counters (a row per departure plus a leading row of zeros, a column per destination) and the
+        position of the next departure to each destination (a row per departure, a column per destination)
+        """
+        departures = np.array([time_to_microseconds(node.consolidated_t_out_origin) for node in nodes], dtype=np.int64)
+        order = np.argsort(departures, kind='stable')
+        departures = departures[order]
+        nodes = [nodes[i] for i in order]
+
+        destinations, columns = np.unique([node.id_sp_destination for node in nodes], return_inverse=True)
+        uses = np.zeros((len(nodes) + 1, len(destinations)), dtype=np.int64)
+        uses[np.arange(1, len(nodes) + 1), columns] = [node.use_counter for node in nodes]
+        np.cumsum(uses, axis=0, out=uses)
+
+        next_departures = np.empty((len(nodes), len(destinations)), dtype=np.int64)
+        for column in range(0, len(destinations)):
+            positions = np.flatnonzero(columns == column)
+            # Past the last departure to the destination, the first one of the next day follows
+            following = np.searchsorted(positions, np.arange(0, len(nodes)))
+            next_departures[:, column] = positions[following % len(positions)]
+
+        return departures, nodes, destinations, uses, next_departures
+
+    def get_next_places(self, id_sp_origin: int, tod: time, k: int = 3,
+                        horizon_minutes: float = None) -> List[NextPlace]:
+        """
+        Obtains the most likely destinations from a stay point at a time of day
+        :param id_sp_origin: The id of the stay point the user is at
+        :param tod: The time of day
+        :param k: The maximum amount of destinations
+        :param horizon_minutes: Only departures within this amount of minutes after tod are considered, all of them
+        when None
+        :return: Up to k destinations, by decreasing use counter (ties by closest departure). Empty when there is no
+        departure from the stay point within the horizon
+        """
+        return self.get_next_places_many([(id_sp_origin, tod)], k, horizon_minutes)[0]
+
+    def get_next_places_many(self, queries: Iterable[Tuple[int, time]], k: int = 3,
+                             horizon_minutes: float = None) -> List[List[NextPlace]]:
+        """
+        Obtains the most likely destinations of many (stay point, time of day) pairs, the queries of each stay point
+        are answered together
+        :param queries: The (id of the stay point, time of day) pairs
+        :param k: The maximum amount of destinations of each query
+        :param horizon_minutes: Only departures within this amount of minutes after the time of day are considered,
+        all of them when None
+        :return: The destinations of each query, as get_next_places returns them, in the order of the queries
+        """
+        queries = list(queries)
+        horizon = MICROSECONDS_PER_DAY if horizon_minutes is None else int(round(horizon_minutes * 60000000))
+        results = [[] for _ in queries]  # type: List[List[NextPlace]]
+
+        queries_by_origin = {}  # type: Dict[int, List[int]]
+        for i, (id_sp_origin, _) in enumerate(queries):
+            queries_by_origin.setdefault(id_sp_origin, []).append(i)
+
+        for id_sp_origin, query_positions in queries_by_origin.items():
+            if id_sp_origin not in self._origins:
+                continue
+            departures, nodes, destinations, uses, next_departures = self._origins[id_sp_origin]
+            tods = np.array([time_to_microseconds(queries[i][1]) for i in query_positions], dtype=np.int64)
+
+            first = np.searchsorted(departures, tods)
+            if horizon >= MICROSECONDS_PER_DAY:
+                weights = np.broadcast_to(uses[-1], (len(tods), len(destinations)))
+            else:
+                ends = tods + horizon
+                wraps = ends > MICROSECONDS_PER_DAY
+                last = np.searchsorted(departures, np.where(wraps, ends - MICROSECONDS_PER_DAY, ends))
+                weights = uses[last] - uses[first] + wraps[:, None] * uses[-1]
+
+            next_positions = next_departures[first % len(nodes)]
+            gaps = (departures[next_positions] - tods[:, None]) % MICROSECONDS_PER_DAY
+            rankings = np.lexsort((gaps, -weights), axis=-1)[:, :k]
+            totals = weights.sum(axis=1)
+
+            for row, i in enumerate(query_positions):
+                results[i] = [NextPlace(int(destinations[column]), int(weights[row, column]),
+                                        float(weights[row, column] / totals[row]), nodes[next_positions[row, column]])
+                              for column in rankings[row].tolist() if weights[row, column] > 0]
+
+        return results
@@ -0,0 +1,97 @@
+from typing import List
+
+import numpy as np
+
+from stm import spatial_time_model_file
+from stm.LazySpatialTimeModelNode import LazySpatialTimeModelNode
+from stm.SpatialTimeModel import SpatialTimeModel
+
+
+class SpatialTimeModelStore(object):
+    """
+    A spatial time model mapped from its file (see spatial_time_model_file). Nodes are only built when they are
+    reached, by traversing the tree from the root or by querying the store, and each one is built once, so the
+    parents and children of the nodes are the same objects as the ones the store returns.
+
+    Attributes:
+        file_path: The path of the file
+        nodes: The mapped rows of the nodes, in breadth first order, columns as spatial_time_model_file.NODE_FIELDS
+        tods: The mapped times of day of the lists of the nodes, as microseconds since midnight
+    """
+
+    def __init__(self, file_path: str):
+        """
+        Maps the file of a model, no node is built
+        :param file_path: The path of the file
+        """
+        self.file_path = file_path
+        self.nodes, self.tods = spatial_time_model_file.read_sections(file_path)
+        fields = spatial_time_model_file.NODE_FIELDS
+        self._columns = {field: self.nodes[:, i] for i, field in enumerate(fields)}
+
+        tods_counts = self.nodes[:, fields.index(spatial_time_model_file.TODS_FIELDS[0]):]
+        self._tods_offsets = np.concatenate(([0], np.cumsum(tods_counts.ravel())))
+
+        # Breadth first order keeps the children of each node together, in the order of the parents
+        parents = self._columns['parent'][1:]
+        if len(parents) > 0 and (np.any(np.diff(parents) < 0) or np.any(parents >= np.arange(1, len(self.nodes)))):
+            raise ValueError('The nodes of {} are not in breadth first order'.format(file_path))
+        self._children_counts = np.bincount(parents, minlength=len(self.nodes))
+        self._first_children = 1 + np.cumsum(self._children_counts) - self._children_counts
+        self._built_nodes = [None] * len(self.nodes)  # type: List[LazySpatialTimeModelNode]
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def get_model(self) -> SpatialTimeModel:
+        """
+        Obtains the model, only its root is built
+        :return: The model (its root is None when the model has no nodes)
+        """
+        return SpatialTimeModel(self.get_node(0) if len(self) > 0 else None)
+
+    def get_node(self, row: int) -> LazySpatialTimeModelNode:
+        """
+        Obtains a node, it is built the first time it is requested
+        :param row: The position of the node in breadth first order
+        :return: The node
+        """
+        node = self._built_nodes[row]
+        if node is None:
+            node = LazySpatialTimeModelNode(self, row)
+            self._built_nodes[row] = node
+        return node
+
+    def find_nodes(self, id_sp_origin: int, id_sp_destination: int) -> List[LazySpatialTimeModelNode]:
+        """
+        Obtains the nodes of a transition, without building the rest of them
+        :param id_sp_origin: The id of the origin stay point
+        :param id_sp_destination: The id of the destination stay point
+        :return: The nodes from the origin to the destination, in breadth first order
+        """
+        rows = np.flatnonzero((self._columns['id_sp_origin'] == id_sp_origin) &
+                              (self._columns['id_sp_destination'] == id_sp_destination))
+        return [self.get_node(int(row)) for row in rows]
+
+    def get_row(self, row: int) -> List[int]:
+        """
+        Reads the fields of a node, see spatial_time_model_file.NODE_FIELDS
+        """
+        return self.nodes[row].tolist()
+
+    def get_children_rows(self, row: int) -> range:
+        """
+        Obtains the positions of the children of a node, in the order of its children list
+        """
+        first_child = int(self._first_children[row])
+        return range(first_child, first_child + int(self._children_counts[row]))
+
+    def get_tods(self, row: int) -> List[List]:
+        """
+        Reads the lists of times of day of a node
+        :return: The times of day of each list of spatial_time_model_file.TODS_FIELDS
+        """
+        first = row * len(spatial_time_model_file.TODS_FIELDS)
+        offsets = self._tods_offsets[first:first + len(spatial_time_model_file.TODS_FIELDS) + 1].tolist()
+        tods = [spatial_time_model_file.microseconds_to_time(tod) for tod in self.tods[offsets[0]:offsets[-1]].tolist()]
+        return [tods[start - offsets[0]:end - offsets[0]] for start, end in zip(offsets[:-1], offsets[1:])]
@@ -1,22 +1,76 @@
-from typing import List
+from typing import Dict, List, Tuple
+
+import numpy as np
 
 from stm.TransitionMatrixEntry import TransitionMatrixEntry
 
 
 class TransitionMatrix(object):
-    def __init__(self, visit_entries: List[List[TransitionMatrixEntry]], ordered_stay_points: List[int]):
+    """
+    The transitions between stay points, as a sparse matrix: only the (origin, destination) pairs with transitions
+    are kept, keyed by the ids of the stay points. Rows and columns follow ordered_stay_points, positions maps each
+    stay point id to its row (and column).
+
+    Attributes:
+        transitions: The entries of each (origin, destination) pair of stay point ids, in chronological order
+        ordered_stay_points: The ids of the stay points, in the order of the rows and columns
+        positions: The position of each stay point id in ordered_stay_points
+    """
+
+    def __init__(self, transitions: Dict[Tuple[int, int], List[TransitionMatrixEntry]], ordered_stay_points: List[int]):
         super().__init__()
-        self.visit_entries = visit_entries
+        self.transitions = transitions
         self.ordered_stay_points = ordered_stay_points
+        self.positions = {id_stay_point: position for position, id_stay_point in enumerate(ordered_stay_points)}
+
+    def get_entries(self, id_sp_origin: int, id_sp_destination: int) -> List[TransitionMatrixEntry]:
+        """
+        Obtains the transitions from a stay point to another one
+        :param id_sp_origin: The id of the origin stay point
+        :param id_sp_destination: The id of the destination stay point
+        :return: The entries of the transitions, in chronological order (an empty list when there are none)
+        """
+        return self.transitions.get((id_sp_origin, id_sp_destination), [])
+
+    @property
+    def visit_entries(self) -> List[List[List[TransitionMatrixEntry]]]:
+        """
+        The dense form of the matrix, a list of rows holding the list of entries of each cell (None for empty cells)
+        """
+        length = len(self.ordered_stay_points)
+        matrix = [[None] * length for _ in range(0, length)]
+        for (id_sp_origin, id_sp_destination), entries in self.transitions.items():
+            matrix[self.positions[id_sp_origin]][self.positions[id_sp_destination]] = entries
+        return matrix
 
     def flat_visits(self) -> List[TransitionMatrixEntry]:
+        """
+        Obtains every entry, row by row and column by column (as the dense matrix is traversed), and in chronological
+        order within each cell
+        """
         flatten_visits = []
+        for pair in sorted(self.transitions, key=lambda p: (self.positions[p[0]], self.positions[p[1]])):
+            flatten_visits.extend(self.transitions[pair])
+
+        return flatten_visits
 
+    def count_matrix(self) -> np.ndarray:
+        """
+        Obtains the amount of transitions between stay points
+        :return: A square int64 array, with a row and a column per stay point (see ordered_stay_points)
+        """
         length = len(self.ordered_stay_points)
-        for row in range(0, length):
-            for col in range(0, length):
-                if self.visit_entries[row][col] is not None and len(self.visit_entries[row][col]) > 0:
-                    for visit_entry in self.visit_entries[row][col]:
-                        flatten_visits.append(visit_entry)
+        counts = np.zeros((length, length), dtype=np.int64)
+        for (id_sp_origin, id_sp_destination), entries in self.transitions.items():
+            counts[self.positions[id_sp_origin], self.positions[id_sp_destination]] = len(entries)
+        return counts
 
-        return flatten_visits
+    def probability_matrix(self) -> np.ndarray:
+        """
+        Obtains the probability of going from each stay point to each other one, the amounts of transitions normalized
+        by row. Rows of stay points without transitions from them are all zeros
+        :return: A square float64 array, with a row and a column per stay point (see ordered_stay_points)
+        """
+        counts = self.count_matrix()
+        totals = counts.sum(axis=1, keepdims=True)
+        return np.divide(counts, totals, out=np.zeros(counts.shape, dtype=np.float64), where=totals > 0)
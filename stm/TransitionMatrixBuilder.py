@@ -1,4 +1,4 @@
-from typing import List
+from typing import Dict, List, Tuple
 
 from Utils import obtain_ordered_stay_points_from_visit_list
 from entities.SimpleVisit import SimpleVisit
@@ -19,38 +19,23 @@ class TransitionMatrixBuilder(object):
             print('No chance for building a visits matrix: the list of visits is empty')
             return None
 
-        entries_visits_matrix = self.initialize_empty_matrix()
+        known_stay_points = set(self.ordered_stay_points)
+        transitions = {}  # type: Dict[Tuple[int, int], List[TransitionMatrixEntry]]
 
         for i in range(0, size - 1):
             origin = self.visits[i]
             dest = self.visits[i + 1]
-
-            position_from = self.ordered_stay_points.index(origin.id_stay_point)
-            position_to = self.ordered_stay_points.index(dest.id_stay_point)
+            if origin.id_stay_point not in known_stay_points or dest.id_stay_point not in known_stay_points:
+                raise ValueError('The stay point of a visit is not in the ordered stay points')
 
             entry = TransitionMatrixEntry(origin.id_stay_point, dest.id_stay_point, origin.arrival_time,
                                           origin.departure_time, dest.arrival_time, dest.departure_time)
-            current_cell = entries_visits_matrix[position_from][position_to]
+            current_cell = transitions.get((origin.id_stay_point, dest.id_stay_point))
 
             if current_cell is None:
-                visits_list = [entry]
-                entries_visits_matrix[position_from][position_to] = visits_list
+                transitions[(origin.id_stay_point, dest.id_stay_point)] = [entry]
             else:
                 current_cell.append(entry)
 
-        transition_matrix = TransitionMatrix(entries_visits_matrix, self.ordered_stay_points)
+        transition_matrix = TransitionMatrix(transitions, self.ordered_stay_points)
         return transition_matrix
-
-    def initialize_empty_matrix(self):
-        matrix_entries = []
-        size = len(self.visits)
-
-        for row in range(0, size):
-            this_row_cells = []
-
-            for col in range(0, size):
-                this_row_cells.append(None)
-
-            matrix_entries.append(this_row_cells)
-
-        return matrix_entries
@@ -0,0 +1,108 @@
+from bisect import bisect_right
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+import Utils
+from entities.FixArray import datetime_to_epoch
+from entities.SimpleVisit import SimpleVisit
+
+SECONDS_IN_A_WEEK = 7 * 24 * 60 * 60
+
+
+class VisitsWindowCube(object):
+    """
+    Splits a stream of visits for many (start_hour, end_hour, day) windows at once, each of them as a
+    VisitsStreamSplitter with those parameters does: a window ends at end_hour:59:59 of the day of the week (of the
+    next day when the hours trespass midnight), and a visit arriving after the end of the current window starts the
+    next one, whose end is one week later.
+    The arrival times are converted into epoch seconds once for all of the windows, and the visit closing each
+    window is found with a binary search, so splitting costs the amount of windows found instead of a walk over the
+    visits per (start_hour, end_hour, day). Visits must be in chronological order.
+
+    Attributes:
+        windows: The (start_hour, end_hour, day) of every window, days as datetime.weekday (monday is 0)
+    """
+
+    def __init__(self, hour_bands: Iterable[Tuple[int, int]], days: Iterable[int] = range(0, 7)):
+        """
+        Basic constructor, a window is split for every day and hour band
+        :param hour_bands: The (start_hour, end_hour) of each hour band
+        :param days: The days of the week, as datetime.weekday (monday is 0)
+        """
+        hour_bands = list(hour_bands)
+        self.windows = [(start_hour, end_hour, day) for day in days
+                        for start_hour, end_hour in hour_bands]  # type: List[Tuple[int, int, int]]
+
+    def _first_window_end(self, window: Tuple[int, int, int], first_visit: SimpleVisit) -> float:
+        """
+        Projects the end of the first window, as VisitsStreamSplitter does, from the departure of the first visit
+        :return: The end, as epoch seconds
+        """
+        start_hour, end_hour, day = window
+        departure_calendar = first_visit.departure_time
+        departure_day = departure_calendar.weekday()
+        days_to_go_back = 0 if departure_day == day else Utils.calculate_days_difference(day, departure_day)
+
+        end_projection = datetime(departure_calendar.year, departure_calendar.month, departure_calendar.day,
+                                  end_hour, 59, 59) - timedelta(days=days_to_go_back)
+        if Utils.trespassing_day(start_hour, end_hour):
+            end_projection += timedelta(days=1)
+        return datetime_to_epoch(end_projection)
+
+    def split_visits(self, visits: List[SimpleVisit]) -> Dict[Tuple[int, int, int], List[List[SimpleVisit]]]:
+        """
+        Splits the visits for every window
+        :param visits: The visits, in chronological order
+        :return: The visits of each window, as VisitsStreamSplitter.split_visits returns them (None when there are no
+        visits), keyed by its (start_hour, end_hour, day)
+        """
+        if visits is None or len(visits) == 0:
+            return {window: None for window in self.windows}
+
+        arrivals = [datetime_to_epoch(visit.arrival_time) for visit in visits]
+        if any(arrivals[i] > arrivals[i + 1] for i in range(0, len(arrivals) - 1)):
+            raise ValueError('The visits are not in chronological order')
+        return {window: self._split(visits, arrivals, self._first_window_end(window, visits[0]))
+                for window in self.windows}
+
+    @staticmethod
+    def _split(visits: List[SimpleVisit], arrivals: List[float], window_end: float) -> List[List[SimpleVisit]]:
+        visit_windows_list = []
+        first = 0
+        while True:
+            # The first visit after the current one that arrives after the end of the window starts the next one
+            last = bisect_right(arrivals, window_end, first + 1)
+            visit_windows_list.append(visits[first:last])
+            if last >= len(visits):
+                return visit_windows_list
+            first = last
+            window_end += SECONDS_IN_A_WEEK
+
+    def stream_visits(self, visits: Iterable[SimpleVisit]) -> Iterator[Tuple[Tuple[int, int, int], List[SimpleVisit]]]:
+        """
+        Splits the visits for every window as they arrive, each list of visits is yielded as soon as the visit that
+        starts the next one arrives (the last ones once the visits are exhausted)
+        :param visits: The visits, in chronological order. Any iterable is accepted
+        :return: A generator of (window, visits of the window) tuples. The lists yielded for a window, in order, are
+        the ones split_visits returns for it
+        """
+        window_ends = None  # type: List[float]
+        current_visits = None  # type: List[List[SimpleVisit]]
+        for visit in visits:
+            if window_ends is None:
+                window_ends = [self._first_window_end(window, visit) for window in self.windows]
+                current_visits = [[visit] for _ in self.windows]
+                continue
+
+            arrival = datetime_to_epoch(visit.arrival_time)
+            for i in range(0, len(self.windows)):
+                if arrival > window_ends[i]:
+                    yield self.windows[i], current_visits[i]
+                    current_visits[i] = [visit]
+                    window_ends[i] += SECONDS_IN_A_WEEK
+                else:
+                    current_visits[i].append(visit)
+
+        if current_visits is not None:
+            for window, window_visits in zip(self.windows, current_visits):
+                yield window, window_visits
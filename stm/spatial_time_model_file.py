@@ -0,0 +1,116 @@
+# This module holds the on-disk format of a spatial time model: a single .npy file of int64 values, so it can be
+# memory mapped, with these sections one after the other:
+#
+#     header: FORMAT_VERSION, the amount of nodes and the amount of times of day of the lists of the nodes
+#     nodes:  a row of NODE_FIELDS values per node, in breadth first order (the root first)
+#     tods:   the tods_in_origin, tods_out_origin, tods_in_dest and tods_out_dest of every node, one after the other
+#
+# The parent of a node is its row in the file (-1 for the root). Times of day are kept as microseconds since
+# midnight, so they are loaded exactly as they were. Breadth first order keeps the children of each node together and
+# after their parent, in the order of the children lists, so the tree is rebuilt from the parents alone.
+from datetime import time
+from typing import List
+
+import numpy as np
+
+from file_utils import write_atomically
+from stm.SpatialTimeModel import SpatialTimeModel
+from stm.SpatialTimeModelNode import SpatialTimeModelNode
+
+FORMAT_VERSION = 1
+HEADER_SIZE = 3
+NODE_FIELDS = ('parent', 'id_sp_origin', 'id_sp_destination', 'consolidated_t_in_origin',
+               'consolidated_t_out_origin', 'consolidated_t_in_dest', 'consolidated_t_out_dest', 'use_counter',
+               'tods_in_origin', 'tods_out_origin', 'tods_in_dest', 'tods_out_dest')
+TIME_FIELDS = ('consolidated_t_in_origin', 'consolidated_t_out_origin', 'consolidated_t_in_dest',
+               'consolidated_t_out_dest')
+# The fields holding the amount of times of day of each list, in the order of the tods section
+TODS_FIELDS = ('tods_in_origin', 'tods_out_origin', 'tods_in_dest', 'tods_out_dest')
+FILE_SUFFIX = '.stm.npy'
+
+
+def time_to_microseconds(tod: time) -> int:
+    """
+    Converts a time of day into microseconds since midnight
+    :param tod: The time of day
+    :return: The microseconds elapsed since midnight
+    """
+    return ((tod.hour * 60 + tod.minute) * 60 + tod.second) * 1000000 + tod.microsecond
+
+
+def microseconds_to_time(microseconds: int) -> time:
+    """
+    Converts microseconds since midnight into a time of day
+    :param microseconds: The microseconds elapsed since midnight
+    :return: The time of day
+    """
+    seconds, microsecond = divmod(int(microseconds), 1000000)
+    minutes, second = divmod(seconds, 60)
+    hour, minute = divmod(minutes, 60)
+    return time(hour, minute, second, microsecond)
+
+
+def save(model: SpatialTimeModel, file_path: str):
+    """
+    Writes a spatial time model into a file. It is written into a temporary file and then moved into place, so a
+    partial file is never loaded
+    :param model: The model to write
+    :param file_path: The path of the file
+    """
+    nodes = [] if model.root_node is None else model.bread_first_traversal_recursive()
+    content = to_array(nodes)
+    write_atomically(file_path, lambda file: np.save(file, content))
+
+
+def to_array(nodes: List[SpatialTimeModelNode]) -> np.ndarray:
+    """
+    Builds the content of the file of a tree
+    :param nodes: The nodes of the tree, in breadth first order
+    :return: The int64 array to write
+    """
+    rows = {node: row for row, node in enumerate(nodes)}
+    table = np.empty((len(nodes), len(NODE_FIELDS)), dtype=np.int64)
+    tods = []
+    for row, node in enumerate(nodes):
+        table[row] = ([-1 if node.parent is None else rows[node.parent], node.id_sp_origin, node.id_sp_destination] +
+                      [time_to_microseconds(getattr(node, field)) for field in TIME_FIELDS] +
+                      [node.use_counter] + [len(getattr(node, field)) for field in TODS_FIELDS])
+        for field in TODS_FIELDS:
+            tods.extend(time_to_microseconds(tod) for tod in getattr(node, field))
+
+    header = np.array([FORMAT_VERSION, len(nodes), len(tods)], dtype=np.int64)
+    return np.concatenate((header, table.ravel(), np.array(tods, dtype=np.int64)))
+
+
+def load(file_path: str) -> SpatialTimeModel:
+    """
+    Reads a spatial time model from a file, without reading its nodes: they are built as the tree is traversed
+    (see SpatialTimeModelStore)
+    :param file_path: The path of the file
+    :return: The model
+    """
+    from stm.SpatialTimeModelStore import SpatialTimeModelStore
+    return SpatialTimeModelStore(file_path).get_model()
+
+
+def read_sections(file_path: str):
+    """
+    Maps a file and splits it into its sections
+    :param file_path: The path of the file
+    :return: The nodes (a row per node, columns as NODE_FIELDS) and the times of day, both mapped
+    :raise ValueError: If the file is not a spatial time model file of this version
+    """
+    content = np.load(file_path, mmap_mode='r')
+    if content.ndim != 1 or content.dtype != np.int64 or len(content) < HEADER_SIZE:
+        raise ValueError('{} is not a spatial time model file'.format(file_path))
+    version, amount_of_nodes, amount_of_tods = (int(value) for value in content[:HEADER_SIZE])
+    if version != FORMAT_VERSION:
+        raise ValueError('Unsupported spatial time model file version {}'.format(version))
+    tods_start = HEADER_SIZE + amount_of_nodes * len(NODE_FIELDS)
+    if len(content) != tods_start + amount_of_tods:
+        raise ValueError('{} is truncated'.format(file_path))
+
+    # Plain views of the mapped file, indexing a memmap costs much more than indexing an array
+    content = content.view(np.ndarray)
+    return content[HEADER_SIZE:tods_start].reshape(amount_of_nodes, len(NODE_FIELDS)), content[tods_start:]
+
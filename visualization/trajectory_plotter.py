@@ -1,5 +1,5 @@
 from datetime import timedelta
-from typing import List
+from typing import List, Union
 
 import matplotlib as mpl
 import matplotlib.pyplot as plt
@@ -7,6 +7,7 @@ import numpy as np
 from matplotlib.patches import Circle
 from mpl_toolkits.mplot3d import art3d
 
+from entities.FixArray import FixArray, datetime_to_epoch, epoch_to_datetime
 from entities.GpsFix import GpsFix
 from entities.StayPoint import StayPoint
 from entities.Visit import Visit
@@ -38,29 +39,36 @@ def plot_3d_cylinder(current_axis, radius, height, elevation, resolution, color=
     art3d.pathpatch_2d_to_3d(ceiling, z=elevation + height, zdir="z")
 
 
-def plot_trajectories_per_day(ax, fixes):
-    rounded_start = fixes[0].timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
-    rounded_end = fixes[-1].timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+def filter_valid_fixes(raw_fixes: Union[List[GpsFix], FixArray]) -> Union[List[GpsFix], FixArray]:
+    if isinstance(raw_fixes, FixArray):
+        return raw_fixes[raw_fixes.get_valid_mask()]
+    return list(filter(lambda x: x.is_valid, raw_fixes))
+
+
+def plot_trajectories_per_day(ax, fixes: Union[List[GpsFix], FixArray]):
+    fix_array = fixes if isinstance(fixes, FixArray) else FixArray.from_fixes(fixes)
+    timestamps = fix_array.timestamp
+    rounded_start = fix_array.get_timestamp(0).replace(hour=0, minute=0, second=0, microsecond=0)
+    rounded_end = fix_array.get_timestamp(-1).replace(hour=0, minute=0, second=0, microsecond=0)
     days = (rounded_end - rounded_start).days
-    start_time = fixes[0].timestamp
-    pointer_start = rounded_start
-    pointer_end = rounded_start + timedelta(days=1)
-    last_fix_previous_day = None
+    start_time = timestamps[0]
+    pointer_start = datetime_to_epoch(rounded_start)
+    pointer_end = pointer_start + 86400
+    last_index_previous_day = None
     for i in range(0, days + 1):
-        fixes_this_day = list(filter(lambda fix: pointer_start < fix.timestamp < pointer_end, fixes))
+        indexes_this_day = np.nonzero((pointer_start < timestamps) & (timestamps < pointer_end))[0]
         # Try to add one from previous day, if there is any
-        if last_fix_previous_day is not None:
-            fixes_this_day.insert(0, last_fix_previous_day)
+        if last_index_previous_day is not None:
+            indexes_this_day = np.insert(indexes_this_day, 0, last_index_previous_day)
 
-        x = list(map(lambda fix: fix.longitude, fixes_this_day))
-        y = list(map(lambda fix: fix.latitude, fixes_this_day))
-        z = list(map(lambda fix: scale_time_value(fix.timestamp.timestamp() - start_time.timestamp()),
-                     fixes_this_day))
+        x = fix_array.longitude[indexes_this_day]
+        y = fix_array.latitude[indexes_this_day]
+        z = scale_time_value(timestamps[indexes_this_day] - start_time)
 
-        ax.plot(x, y, z, label='day {} ({})'.format(i + 1, pointer_start.strftime("%A")))
+        ax.plot(x, y, z, label='day {} ({})'.format(i + 1, epoch_to_datetime(pointer_start).strftime("%A")))
         pointer_start = pointer_end
-        pointer_end = pointer_start + timedelta(days=1)
-        last_fix_previous_day = fixes_this_day[-1]
+        pointer_end = pointer_start + 86400
+        last_index_previous_day = indexes_this_day[-1]
 
 
 def add_visits_cylinders_to_plot(current_axis, visits, stay_points, start_time, spd_min_distance_parameter=500):
@@ -72,13 +80,16 @@ def add_visits_cylinders_to_plot(current_axis, visits, stay_points, start_time,
     from brewer2mpl import brewer2mpl
     color_map = brewer2mpl.get_map('Set3', 'qualitative', 12)
     colors = [c for c in color_map.mpl_colors]
+    stay_points_by_id = {}
+    for stay_point in stay_points:
+        stay_points_by_id.setdefault(stay_point.id_stay_point, stay_point)
     for visit in visits:
         length_visit = (visit.pivot_departure_fix.timestamp - visit.pivot_arrival_fix.timestamp).total_seconds()
         height = scale_time_value(length_visit)
         elevation = scale_time_value(visit.pivot_arrival_fix.timestamp.timestamp() - start_time.timestamp())
 
         stay_point_id_of_visit = visit.id_stay_point
-        stay_point = list(filter(lambda x: x.id_stay_point == stay_point_id_of_visit, stay_points))[0]
+        stay_point = stay_points_by_id[stay_point_id_of_visit]
         x_center = stay_point.longitude
         y_center = stay_point.latitude
 
@@ -89,7 +100,7 @@ def add_visits_cylinders_to_plot(current_axis, visits, stay_points, start_time,
                          color=color, x_center=x_center, y_center=y_center)
 
 
-def plot_from_data(raw_fixes: List[GpsFix], raw_stay_points: List[StayPoint], raw_visits: List[Visit],
+def plot_from_data(raw_fixes: Union[List[GpsFix], FixArray], raw_stay_points: List[StayPoint], raw_visits: List[Visit],
                    path_to_save=None):
     plt.style.use('bmh')
 
@@ -110,7 +121,7 @@ def plot_from_data(raw_fixes: List[GpsFix], raw_stay_points: List[StayPoint], ra
     # fig.suptitle('Trajectory across time', fontsize=14, fontweight='bold')
     axis = fig.gca(projection='3d')
 
-    clean_fixes = list(filter(lambda x: x.is_valid, raw_fixes))
+    clean_fixes = filter_valid_fixes(raw_fixes)
     plot_trajectories_per_day(axis, clean_fixes)
 
     start_time = clean_fixes[0].timestamp
@@ -130,13 +141,13 @@ def plot_from_data(raw_fixes: List[GpsFix], raw_stay_points: List[StayPoint], ra
         plt.savefig(path_to_save, format='pdf', dpi=1000)
 
 
-def plot_trajectory_only(raw_fixes: List[GpsFix]):
+def plot_trajectory_only(raw_fixes: Union[List[GpsFix], FixArray]):
     mpl.rcParams['legend.fontsize'] = 8
     fig = plt.figure()
     fig.suptitle('Trajectory across time', fontsize=14, fontweight='bold')
     axis = fig.gca(projection='3d')
 
-    clean_fixes = list(filter(lambda x: x.is_valid, raw_fixes))
+    clean_fixes = filter_valid_fixes(raw_fixes)
     plot_trajectories_per_day(axis, clean_fixes)
 
     axis.set_xlabel('Longitude')